@@ -0,0 +1,414 @@
+"""Provide CloudListing class that lists a cloud prefix at once to answer
+the questions about the modification times and existence of the paths
+under it"""
+
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Set, Tuple
+
+from yunpath import CloudPath
+
+from .defaults import FAKE_SYMLINK_MAX_SIZE
+
+# (relative path, (mtime, size)) for files, or (relative path, None) for dirs
+_Entry = Tuple[str, "Tuple[float, int] | None"]
+
+
+def _timestamp(value: Any) -> float:
+    """Convert a datetime or an ISO string to a timestamp"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value.timestamp()
+
+
+def _list_objects(prefix: CloudPath) -> Iterator[_Entry] | None:
+    """List the objects under a prefix with their metadata
+
+    Args:
+        prefix: The prefix
+
+    Returns:
+        An iterator of the entries, or None if the client is not supported
+    """
+    from cloudpathlib import AzureBlobClient, GSClient, S3Client
+    from cloudpathlib.local import LocalClient
+
+    client = prefix.client
+    base = str(prefix).rstrip("/") + "/"
+
+    if isinstance(client, LocalClient):
+        # the stand-ins for the tests, one listing is one request
+        def _local() -> Iterator[_Entry]:
+            for path, is_dir in client._list_dir(prefix, recursive=True):
+                rel = str(path)[len(base):]
+                if is_dir:
+                    yield rel, None
+                else:
+                    stat = client._cloud_path_to_local(path).stat()
+                    yield rel, (stat.st_mtime, stat.st_size)
+
+        return _local()
+
+    if isinstance(client, GSClient):
+        # The same as GSPath.stat() from yunpath, which prefers the
+        # "updated" in the custom metadata
+        def _gs() -> Iterator[_Entry]:
+            key = prefix.blob.rstrip("/") + "/"
+            bucket = client.client.bucket(prefix.bucket)
+            for blob in bucket.list_blobs(prefix=key):
+                rel = blob.name[len(key):]
+                if rel.endswith("/"):  # placeholder of a directory
+                    yield rel, None
+                    continue
+                updated = (blob.metadata or {}).get("updated", blob.updated)
+                yield rel, (_timestamp(updated), blob.size or 0)
+
+        return _gs()
+
+    if isinstance(client, S3Client):  # pragma: no cover
+
+        def _s3() -> Iterator[_Entry]:
+            key = prefix.key.rstrip("/") + "/"
+            paginator = client.client.get_paginator("list_objects_v2")
+            for page in paginator.paginate(Bucket=prefix.bucket, Prefix=key):
+                for obj in page.get("Contents", ()):
+                    rel = obj["Key"][len(key):]
+                    if rel.endswith("/"):
+                        yield rel, None
+                    else:
+                        yield rel, (_timestamp(obj["LastModified"]), obj["Size"])
+
+        return _s3()
+
+    if isinstance(client, AzureBlobClient):  # pragma: no cover
+
+        def _azure() -> Iterator[_Entry]:
+            key = prefix.blob.rstrip("/") + "/"
+            container = client.service_client.get_container_client(
+                prefix.container
+            )
+            for blob in container.list_blobs(name_starts_with=key):
+                rel = blob.name[len(key):]
+                if rel.endswith("/"):
+                    yield rel, None
+                else:
+                    yield rel, (_timestamp(blob.last_modified), blob.size)
+
+        return _azure()
+
+    return None  # pragma: no cover
+
+
+def _listing_key(path: CloudPath) -> CloudPath | None:
+    """Get the directory to list for a cloud path, which is the directory
+    above its parent (i.e. `<outdir>/<proc>` for `<outdir>/<proc>/<index>/
+    <file>`), so that the files of the jobs are listed at once, but the
+    bucket root is never listed
+
+    Args:
+        path: The cloud path
+
+    Returns:
+        The directory, or None if the path is right under the bucket root
+    """
+    for key in (path.parent.parent, path.parent):
+        # ("gs://", "bucket") is the bucket root
+        if len(key.parts) > 2:
+            return key
+    return None
+
+
+def cloud_prefixes(paths: List[CloudPath]) -> List[CloudPath]:
+    """Get the prefixes to list for the cloud paths
+
+    The paths are grouped by the directories above their parents (see
+    `_listing_key()`), and the deepest common directory of each group with
+    more than one path is listed. A common directory of all the paths is
+    not used, since it could be the bucket root or a directory with a lot
+    more objects than the paths.
+
+    Args:
+        paths: The cloud paths
+
+    Returns:
+        The prefixes to list
+    """
+    groups: Dict[Tuple[int, str], List[CloudPath]] = {}
+    for path in paths:
+        key = _listing_key(path)
+        if key is not None:
+            groups.setdefault((id(path.client), str(key)), []).append(path)
+
+    out = []
+    for group in groups.values():
+        if len(group) < 2:
+            continue
+        for prefix in group[0].parents:
+            base = str(prefix).rstrip("/") + "/"
+            if all(str(path).startswith(base) for path in group[1:]):
+                out.append(prefix)
+                break
+
+    # Don't list the same objects twice
+    bases = {str(prefix).rstrip("/") + "/": prefix for prefix in out}
+    return [
+        prefix
+        for base, prefix in bases.items()
+        if not any(base != other and base.startswith(other) for other in bases)
+    ]
+
+
+class CloudListing:
+    """The metadata of all the objects under a cloud prefix, listed at once
+
+    The paths under the prefix (not including the prefix itself) are
+    answered from the listing, unless they are invalidated because they
+    are written.
+
+    Args:
+        prefix: The prefix to list
+        max_objects: Stop listing if there are more objects than this
+    """
+
+    def __init__(self, prefix: CloudPath, max_objects: int) -> None:
+        self.prefix = prefix
+        self.complete = False
+        self._base = str(prefix).rstrip("/") + "/"
+        # relative path => (mtime, size)
+        self._files: Dict[str, Tuple[float, int]] = {}
+        # relative path of dirs ("" for the prefix) => relative paths of
+        # the children
+        self._children: Dict[str, Set[str]] = {"": set()}
+        # relative path of the small files => whether it is a fake symlink
+        self._symlinks: Dict[str, bool] = {}
+        # The paths that are written, and their ancestors
+        self._stale: Set[str] = set()
+        self._stale_ancestors: Set[str] = set()
+
+        entries = _list_objects(prefix)
+        if entries is None:  # pragma: no cover
+            return
+        for i, (rel, meta) in enumerate(entries):
+            if i >= max_objects:
+                return
+            rel = rel.rstrip("/")
+            if not rel:
+                continue
+            if meta is not None:
+                self._files[rel] = meta
+            else:
+                self._children.setdefault(rel, set())
+            self._add_parents(rel)
+        self.complete = True
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def _add_parents(self, rel: str) -> None:
+        """Add a path to the children of its parents, recursively"""
+        while rel:
+            parent = rel.rpartition("/")[0]
+            children = self._children.setdefault(parent, set())
+            if rel in children:
+                return
+            children.add(rel)
+            rel = parent
+
+    def _rel(self, path: Any) -> str | None:
+        """Get the relative path to the prefix, None if not covered or
+        written"""
+        path = str(path).rstrip("/")
+        if not path.startswith(self._base) or "" in self._stale:
+            return None
+        rel = path[len(self._base):]
+        if rel in self._stale_ancestors:
+            return None
+        parent = rel
+        while parent:
+            if parent in self._stale:
+                return None
+            parent = parent.rpartition("/")[0]
+        return rel
+
+    def covers(self, path: Any) -> bool:
+        """Check if a path can be answered from the listing
+
+        Args:
+            path: The path
+
+        Returns:
+            True if the path is under the prefix and not written
+        """
+        return self._rel(path) is not None
+
+    def invalidate(self, path: Any) -> None:
+        """Stop answering a path that is written, its ancestors and its
+        descendants from the listing
+
+        Args:
+            path: The path
+        """
+        path = str(path).rstrip("/")
+        if self._base.startswith(path + "/"):
+            self._stale.add("")
+            return
+        if not path.startswith(self._base):
+            return
+        rel = path[len(self._base):]
+        self._stale.add(rel)
+        while rel:
+            rel = rel.rpartition("/")[0]
+            self._stale_ancestors.add(rel)
+
+    def stat(self, path: Any) -> Tuple[str, float, int] | None:
+        """Get the type, modification time and size of a path
+
+        Args:
+            path: The path
+
+        Returns:
+            ("file", mtime, size), ("dir", 0.0, 0) or ("missing", 0.0, 0),
+            None if the path is not covered by the listing
+        """
+        rel = self._rel(path)
+        if rel is None:
+            return None
+        if rel in self._files:
+            return ("file", *self._files[rel])
+        if rel in self._children:
+            return ("dir", 0.0, 0)
+        return ("missing", 0.0, 0)
+
+    def _is_candidate(self, rel: str) -> bool:
+        """Check if a listed file is small enough to be a fake symlink"""
+        meta = self._files.get(rel)
+        return meta is not None and 8 <= meta[1] <= FAKE_SYMLINK_MAX_SIZE
+
+    def resolve_symlinks(
+        self,
+        paths: Iterable[Any],
+        is_symlink: Callable[[CloudPath], bool],
+        workers: int,
+    ) -> int:
+        """Check if the paths are fake symlinks at once
+
+        The listings don't tell the fake symlinks ("symlink:<url>") from the
+        other small files, so the listed files that are small enough are
+        read, concurrently, instead of one by one when they are checked.
+
+        Args:
+            paths: The paths to check, the ones not covered or not small
+                files under the prefix are ignored
+            is_symlink: The function to check if a file is a fake symlink
+            workers: The number of the concurrent requests
+
+        Returns:
+            The number of the files read
+        """
+        rels = set()
+        for path in paths:
+            rel = self._rel(path)
+            if (
+                rel is not None
+                and rel not in self._symlinks
+                and self._is_candidate(rel)
+            ):
+                rels.add(rel)
+        if not rels:
+            return 0
+
+        rels = sorted(rels)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(
+                lambda rel: is_symlink(self.prefix / rel),
+                rels,
+            )
+            self._symlinks.update(zip(rels, results))
+        return len(rels)
+
+    def is_symlink(self, path: Any) -> bool | None:
+        """Check if a path is a fake symlink from the listing
+
+        Args:
+            path: The path
+
+        Returns:
+            Whether the path is a fake symlink, None if it can't be answered
+            from the listing (i.e. a small file that is not resolved by
+            `resolve_symlinks()`)
+        """
+        rel = self._rel(path)
+        if rel is None:
+            return None
+        if not self._is_candidate(rel):
+            return False
+        return self._symlinks.get(rel)
+
+    def get_mtime(
+        self,
+        path: Any,
+        dir_depth: int,
+        is_symlink: Callable[[CloudPath], bool],
+    ) -> float | None:
+        """Get the modification time of a path, the same as `get_mtime()`
+
+        Args:
+            path: The path
+            dir_depth: The depth of the directory to check the
+                last modification time
+            is_symlink: The function to check if a file that is small
+                enough and not resolved by `resolve_symlinks()` is a fake
+                symlink
+
+        Returns:
+            The modification time, or None if it can't be answered from the
+            listing (i.e. a directory itself is stat'ed, or there are fake
+            symlinks)
+        """
+        rel = self._rel(path)
+        if rel is None:
+            return None
+        if rel in self._files or rel not in self._children:
+            return self._file_mtime(rel, is_symlink)
+        if dir_depth == 0:
+            return None
+        return self._dir_mtime(rel, dir_depth, is_symlink)
+
+    def _file_mtime(
+        self,
+        rel: str,
+        is_symlink: Callable[[CloudPath], bool],
+    ) -> float | None:
+        """Get the modification time of a file, 0.0 if missing"""
+        if rel not in self._files:
+            return 0.0
+        if self._is_candidate(rel):
+            symlink = self._symlinks.get(rel)
+            if symlink is None:
+                symlink = self._symlinks[rel] = is_symlink(self.prefix / rel)
+            if symlink:
+                return None
+        return self._files[rel][0]
+
+    def _dir_mtime(
+        self,
+        rel: str,
+        dir_depth: int,
+        is_symlink: Callable[[CloudPath], bool],
+    ) -> float | None:
+        """Get the last modification time of the contents of a directory"""
+        mtime = 0.0
+        for child in self._children[rel]:
+            if child in self._files:
+                child_mtime = self._file_mtime(child, is_symlink)
+            elif dir_depth == 1:
+                # the directory itself is stat'ed
+                return None
+            else:
+                child_mtime = self._dir_mtime(child, dir_depth - 1, is_symlink)
+            if child_mtime is None:
+                return None
+            mtime = max(mtime, child_mtime)
+        return mtime
@@ -0,0 +1,117 @@
+"""Provide HashCache class that caches the content digests of files"""
+
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import stat as statmod
+import threading
+from os import PathLike
+from pathlib import Path
+from typing import Dict, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS digests (
+    dev INTEGER NOT NULL,
+    ino INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT NOT NULL,
+    PRIMARY KEY (dev, ino)
+);
+"""
+# The size of the chunks to read the files
+CHUNK_SIZE = 1 << 20
+
+
+def file_digest(path: str | PathLike) -> str:
+    """Compute the content digest (blake2b) of a file
+
+    Args:
+        path: The path to the file
+
+    Returns:
+        The hex digest
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as fin:
+        for chunk in iter(lambda: fin.read(CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class HashCache:
+    """Cache the content digests of local files, keyed on the device, inode,
+    size and mtime of the files, so that unchanged files are not read again
+
+    The digests are persisted in a SQLite database, and can be looked up
+    from multiple threads.
+
+    Args:
+        path: The path to the database file, None to only cache the digests
+            in memory (i.e. when the workdir is not local)
+    """
+
+    def __init__(self, path: Path | None) -> None:
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # (dev, ino) => (size, mtime_ns, digest)
+        self._digests: Dict[Tuple[int, int], Tuple[int, int, str]] = {}
+        self._conn = None
+        if path is not None:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.executescript(SCHEMA)
+            for dev, ino, size, mtime_ns, digest in self._conn.execute(
+                "SELECT dev, ino, size, mtime_ns, digest FROM digests"
+            ):
+                self._digests[(dev, ino)] = (size, mtime_ns, digest)
+
+    def digest(self, path: str | PathLike) -> str | None:
+        """Get the content digest of a local file
+
+        Args:
+            path: The path to the file
+
+        Returns:
+            The hex digest, or None if the path is not a local file
+        """
+        path = getattr(path, "path", path)
+        if not isinstance(path, Path):
+            return None
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        if not statmod.S_ISREG(stat.st_mode):
+            return None
+
+        key = (stat.st_dev, stat.st_ino)
+        with self._lock:
+            cached = self._digests.get(key)
+            if cached is not None and cached[:2] == (
+                stat.st_size,
+                stat.st_mtime_ns,
+            ):
+                self.hits += 1
+                return cached[2]
+            self.misses += 1
+
+        digest = file_digest(path)
+        with self._lock:
+            self._digests[key] = (stat.st_size, stat.st_mtime_ns, digest)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO digests VALUES (?, ?, ?, ?, ?)",
+                    (*key, stat.st_size, stat.st_mtime_ns, digest),
+                )
+        return digest
+
+    def close(self) -> None:
+        """Save the digests and close the database"""
+        if self._conn is not None:
+            with self._lock:
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,260 @@
+"""Provide RunHistory class that records the timings of runs in a database"""
+
+from __future__ import annotations
+
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Tuple
+
+from .defaults import ProcInputType
+from .utils import logger
+
+if TYPE_CHECKING:  # pragma: no cover
+    from .job import Job
+    from .pipen import Pipen
+    from .proc import Proc
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    pipeline TEXT NOT NULL,
+    profile TEXT,
+    started REAL,
+    ended REAL,
+    succeeded INTEGER
+);
+CREATE TABLE IF NOT EXISTS procs (
+    run_id TEXT NOT NULL,
+    proc TEXT NOT NULL,
+    size INTEGER,
+    started REAL,
+    ended REAL,
+    succeeded INTEGER,
+    PRIMARY KEY (run_id, proc)
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    run_id TEXT NOT NULL,
+    proc TEXT NOT NULL,
+    job_index INTEGER NOT NULL,
+    queued REAL,
+    submitted REAL,
+    started REAL,
+    ended REAL,
+    rc INTEGER,
+    retries INTEGER DEFAULT 0,
+    cached INTEGER DEFAULT 0,
+    status TEXT,
+    input_size INTEGER,
+    PRIMARY KEY (run_id, proc, job_index)
+);
+"""
+
+
+def _input_size(paths: Iterable[Any]) -> int | None:
+    """Get the total size of the local input files
+
+    Args:
+        paths: The input files
+
+    Returns:
+        The total size in bytes, or None if none of the files is local
+    """
+    size = None
+    for path in paths:
+        path = getattr(path, "spec", path)
+        if not isinstance(path, Path):
+            continue
+        try:
+            size = (size or 0) + path.stat().st_size
+        except OSError:
+            continue
+    return size
+
+
+def _job_input_files(job: Job) -> Tuple[Any, ...]:
+    """Get the input files (not directories) of a job
+
+    Args:
+        job: The job
+
+    Returns:
+        The input files
+    """
+    out = []
+    for inkey, intype in job.proc.input.type.items():
+        value = job.input[inkey]
+        if value is None:
+            continue
+        if intype == ProcInputType.FILE:
+            out.append(value)
+        elif intype == ProcInputType.FILES:
+            out.extend(value)
+    return tuple(out)
+
+
+class RunHistory:
+    """Record the timings of the processes and jobs of pipeline runs
+    in a SQLite database.
+
+    The records are written in a background thread, so that the event loop
+    is not blocked by the database.
+
+    Args:
+        path: The path to the database file
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.run_id = uuid.uuid4().hex
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._thread = threading.Thread(
+            target=self._write,
+            name="pipen-history",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _write(self) -> None:
+        """Write the records in the queue to the database until closed"""
+        conn = sqlite3.connect(self.path)
+        try:
+            conn.executescript(SCHEMA)
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    break
+                sql, params = item
+                try:
+                    conn.execute(
+                        sql,
+                        params() if callable(params) else params,
+                    )
+                except Exception as exc:  # pragma: no cover
+                    logger.debug("Failed to write run history: %s", exc)
+                    continue
+                if self._queue.empty():
+                    conn.commit()
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _put(self, sql: str, params: Tuple | Callable[[], Tuple]) -> None:
+        """Put a record to be written
+
+        Args:
+            sql: The sql statement
+            params: The parameters of the statement, or a function to get
+                them in the background thread (i.e. for file system queries)
+        """
+        self._queue.put((sql, params))
+
+    def _update_job(self, job: Job, **values: Any) -> None:
+        """Insert the job if not recorded yet and update its values
+
+        Args:
+            job: The job
+            **values: The column names and the values to update
+        """
+        key = (self.run_id, job.proc.name, job.index)
+        self._put(
+            "INSERT OR IGNORE INTO jobs (run_id, proc, job_index) "
+            "VALUES (?, ?, ?)",
+            key,
+        )
+        sets = ", ".join(f"{col} = ?" for col in values)
+        self._put(
+            f"UPDATE jobs SET {sets} "
+            "WHERE run_id = ? AND proc = ? AND job_index = ?",
+            tuple(values.values()) + key,
+        )
+
+    def pipeline_started(self, pipen: Pipen) -> None:
+        """Record the start of the pipeline"""
+        self._put(
+            "INSERT INTO runs (run_id, pipeline, profile, started) "
+            "VALUES (?, ?, ?, ?)",
+            (self.run_id, pipen.name, pipen.profile, time.time()),
+        )
+
+    def pipeline_done(self, succeeded: bool) -> None:
+        """Record the end of the pipeline"""
+        self._put(
+            "UPDATE runs SET ended = ?, succeeded = ? WHERE run_id = ?",
+            (time.time(), int(succeeded), self.run_id),
+        )
+
+    def proc_started(self, proc: Proc) -> None:
+        """Record the start of a process"""
+        self._put(
+            "INSERT OR REPLACE INTO procs (run_id, proc, size, started) "
+            "VALUES (?, ?, ?, ?)",
+            (self.run_id, proc.name, proc.size, time.time()),
+        )
+
+    def proc_done(self, proc: Proc, succeeded: bool | str) -> None:
+        """Record the end of a process"""
+        self._put(
+            "UPDATE procs SET ended = ?, succeeded = ? "
+            "WHERE run_id = ? AND proc = ?",
+            (time.time(), int(bool(succeeded)), self.run_id, proc.name),
+        )
+
+    def job_queued(self, job: Job) -> None:
+        """Record the queue time (of the first trial) of a job"""
+        files = _job_input_files(job)
+        key = (self.run_id, job.proc.name, job.index)
+        self._update_job(job, status="queued")
+        self._put(
+            "UPDATE jobs SET queued = COALESCE(queued, ?), input_size = ? "
+            "WHERE run_id = ? AND proc = ? AND job_index = ?",
+            lambda now=time.time(): (now, _input_size(files)) + key,
+        )
+
+    def job_submitted(self, job: Job) -> None:
+        """Record the submission time of a job"""
+        self._update_job(job, submitted=time.time(), status="submitted")
+
+    def job_started(self, job: Job) -> None:
+        """Record the start time of a job"""
+        self._update_job(job, started=time.time(), status="running")
+
+    def job_cached(self, job: Job) -> None:
+        """Record a cached job"""
+        files = _job_input_files(job)
+        key = (self.run_id, job.proc.name, job.index)
+        self._update_job(job, ended=time.time(), cached=1, status="cached")
+        self._put(
+            "UPDATE jobs SET input_size = ? "
+            "WHERE run_id = ? AND proc = ? AND job_index = ?",
+            lambda: (_input_size(files),) + key,
+        )
+
+    def job_done(self, job: Job, status: str) -> None:
+        """Record the end of a job (including a failed trial to be retried)
+
+        Args:
+            job: The job
+            status: The status of the job, succeeded, failed or retrying
+        """
+        key = (self.run_id, job.proc.name, job.index)
+        self._update_job(
+            job,
+            ended=time.time(),
+            retries=job.trial_count,
+            status=status,
+        )
+        # job.rc reads the rc file, not on the event loop
+        self._put(
+            "UPDATE jobs SET rc = ? "
+            "WHERE run_id = ? AND proc = ? AND job_index = ?",
+            lambda: (job.rc,) + key,
+        )
+
+    def close(self) -> None:
+        """Write the remaining records and close the database"""
+        self._queue.put(None)
+        self._thread.join()
@@ -1,18 +1,44 @@
 """Provide JobCaching class that implements caching for jobs"""
 
 from __future__ import annotations
-from typing import TYPE_CHECKING
 
-from diot import Diot
+import asyncio
+import hashlib
+import json
+import os
+from functools import partial
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+
 from simpleconf import Config
+from xqute import JobStatus
 
-from .defaults import ProcInputType, ProcOutputType
-from .utils import get_mtime, path_is_symlink
+from ._tracing import traced
+from .defaults import SIGNATURE_VERSION, ProcInputType, ProcOutputType
+from .utils import get_mtime, invalidate_mtime, path_exists, path_is_symlink
 
 if TYPE_CHECKING:
     from xqute.path import DualPath
 
 
+def _dir_has_entries(path: Any) -> bool:
+    """Check if a directory has any entries, stopping at the first one
+
+    Args:
+        path: The path to the directory
+
+    Returns:
+        True if the directory exists and is not empty
+    """
+    try:
+        if isinstance(path, Path):
+            with os.scandir(path) as entries:
+                return next(entries, None) is not None
+        return next(iter(path.iterdir()), None) is not None
+    except (FileNotFoundError, NotADirectoryError):
+        return False
+
+
 class JobCaching:
     """Provide caching functionality of jobs"""
 
@@ -23,21 +49,128 @@ class JobCaching:
         Returns:
             The path to the signature file
         """
+        return self.metadir / "job.signature.json"
+
+    @property
+    def _toml_signature_file(self) -> DualPath:
+        """Get the path to the signature file in TOML, written by the older
+        versions of pipen, which is migrated to JSON on the next write
+
+        Returns:
+            The path to the TOML signature file
+        """
         return self.metadir / "job.signature.toml"
 
-    async def cache(self) -> None:
-        """write signature to signature file"""
-        dirsig = (
+    @property
+    def _cache_option(self) -> bool | str:
+        """Get the cache option of the process, or of the pipeline if not set
+
+        Returns:
+            The cache option, True/False/"force"/"hash"
+        """
+        return (
+            self.proc.pipeline.config.cache
+            if self.proc.cache is None
+            else self.proc.cache
+        )
+
+    @property
+    def _dirsig(self) -> int:
+        """Get the dirsig option of the process, or of the pipeline if not set
+
+        Returns:
+            The depth to check the mtimes of the directories
+        """
+        return (
             self.proc.pipeline.config.dirsig
             if self.proc.dirsig is None
             else self.proc.dirsig
         )
+
+    def _check_outputs(
+        self,
+    ) -> Tuple[str | None, Dict[str, Dict[str, Any]]]:
+        """Check if the outputs are generated, and make the manifest of them,
+        supposed to be run in a thread
+
+        A directory output is generated if it has any entries, which stops
+        at the first entry. The sizes and modification times of the local
+        output files are recorded in the manifest, so that later cache checks
+        with `cache="hash"` can tell if they are unchanged with a single
+        `stat`, without looking up their digests. The mtimes of
+        the outputs are memoized (see `get_mtime()`) for `cache()`.
+
+        Returns:
+            The message if any output is not generated (otherwise None),
+            and the manifest, keyed by the output paths
+        """
+        dirsig = self._dirsig
+        manifest = {}
+        for outkey, outtype in self._output_types.items():
+            if outtype == ProcOutputType.VAR:
+                continue
+
+            path = self.output[outkey].spec
+            entry = {"size": None, "mtime": None}
+            if outtype == ProcOutputType.DIR:
+                generated = _dir_has_entries(path)
+            elif isinstance(path, Path):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    generated = False
+                else:
+                    generated = True
+                    entry = {"size": stat.st_size, "mtime": stat.st_mtime}
+            else:
+                generated = path_exists(path)
+
+            if not generated:
+                return f"Output {outtype} {outkey!r} is not generated.", manifest
+
+            get_mtime(path, dirsig)
+            manifest[str(path)] = entry
+
+        return None, manifest
+
+    def _output_unchanged(self, path: Any, entry: Dict[str, Any] | None) -> bool:
+        """Check if a local output file is unchanged since the manifest is made
+
+        Args:
+            path: The path to the output file
+            entry: The entry of the output in the manifest
+
+        Returns:
+            True if the size and the modification time of the file are the
+            same as recorded
+        """
+        if not entry or entry.get("mtime") is None or not isinstance(path, Path):
+            return False
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return False
+        return stat.st_size == entry["size"] and stat.st_mtime == entry["mtime"]
+
+    async def cache(
+        self,
+        manifest: Dict[str, Dict[str, Any]] | None = None,
+    ) -> None:
+        """write signature to signature file
+
+        Args:
+            manifest: The manifest of the outputs from `_check_outputs()`,
+                saved in the signature
+        """
+        dirsig = self._dirsig
         # Check if mtimes of input is greater than those of output
         try:
             max_mtime = get_mtime(self.script_file, 0)
         except Exception:  # pragma: no cover
             max_mtime = 0
 
+        # The files to record the content digests for, with cache="hash"
+        hashed = [self.script_file]
         # Make self.input serializable
         input_data = {}
         for inkey, intype in self.proc.input.type.items():
@@ -50,6 +183,7 @@ class JobCaching:
                     input_data[inkey] = None
                 else:
                     input_data[inkey] = str(self.input[inkey].spec)
+                    hashed.append(self.input[inkey].spec)
                     max_mtime = max(
                         max_mtime,
                         get_mtime(self.input[inkey].spec, dirsig),
@@ -62,6 +196,7 @@ class JobCaching:
                     input_data[inkey] = []
                     for file in self.input[inkey]:
                         input_data[inkey].append(str(file.spec))
+                        hashed.append(file.spec)
                         max_mtime = max(max_mtime, get_mtime(file.spec, dirsig))
 
         # Make self.output serializable
@@ -69,11 +204,13 @@ class JobCaching:
         for outkey, outval in self._output_types.items():
             if outval in (ProcOutputType.FILE, ProcInputType.DIR):
                 output_data[outkey] = str(self.output[outkey].spec)
+                hashed.append(self.output[outkey].spec)
                 max_mtime = max(max_mtime, get_mtime(self.output[outkey].spec, dirsig))
             else:
                 output_data[outkey] = self.output[outkey]
 
         signature = {
+            "version": SIGNATURE_VERSION,
             "input": {
                 "type": self.proc.input.type,
                 "data": input_data,
@@ -81,8 +218,242 @@ class JobCaching:
             "output": {"type": self._output_types, "data": output_data},
             "ctime": float("inf") if max_mtime == 0 else max_mtime,
         }
-        with self.signature_file.open("w") as f:
-            f.write(Diot(signature).to_toml())
+        if manifest:
+            signature["manifest"] = manifest
+        if self._cache_option == "hash":
+            signature["digests"] = await asyncio.get_running_loop().run_in_executor(
+                None,
+                self._file_digests,
+                hashed,
+            )
+        self._signature_ctime = signature["ctime"]
+        if self.proc._signatures is not None:
+            self.proc._signatures.put(self.index, signature)
+            # Not to be read when the signature store is disabled later
+            self.signature_file.unlink(missing_ok=True)
+        else:
+            with self.signature_file.open("w") as f:
+                json.dump(signature, f, separators=(",", ":"), default=str)
+
+        if self._toml_signature_file.exists():
+            self._toml_signature_file.unlink()
+
+    def _file_digest(self, path: Any) -> str | None:
+        """Get the content digest of a file from the hash cache
+
+        Args:
+            path: The path to the file
+
+        Returns:
+            The digest, or None if the path is not a local file
+        """
+        return self.proc.pipeline._hash_cache.digest(path)
+
+    def _file_digests(self, paths: List[Any]) -> Dict[str, str]:
+        """Get the content digests of the local files
+
+        Args:
+            paths: The paths to the files
+
+        Returns:
+            The digests keyed by the paths
+        """
+        out = {}
+        for path in paths:
+            digest = self._file_digest(path)
+            if digest is not None:
+                out[str(path)] = digest
+        return out
+
+    def _dir_digest(self, path: Path) -> str:
+        """Get the content digest of a local directory from the digests of
+        the files in it
+
+        Args:
+            path: The path to the directory
+
+        Returns:
+            The digest
+        """
+        hasher = hashlib.blake2b(digest_size=16)
+        for root, dirs, files in os.walk(path, followlinks=True):
+            dirs.sort()
+            for name in sorted(files):
+                file = Path(root, name)
+                hasher.update(str(file.relative_to(path)).encode())
+                hasher.update(b"\0")
+                hasher.update((self._file_digest(file) or "").encode())
+                hasher.update(b"\0")
+        return hasher.hexdigest()
+
+    def _result_outputs(self) -> Dict[str, Path] | None:
+        """Get the output files/directories of the job to save to or
+        materialize from the result cache
+
+        Returns:
+            The local output files/directories keyed by the output keys,
+            None if any of them is not local or not under the output
+            directory of the job (i.e. "..", which the result cache should
+            never replace)
+        """
+        outdir = self._outdir.path
+        if not isinstance(outdir, Path):
+            return None
+
+        outdir = Path(os.path.normpath(outdir))
+        out = {}
+        for outkey, outtype in self._output_types.items():
+            if outtype not in (ProcOutputType.FILE, ProcOutputType.DIR):
+                continue
+            path = self.output[outkey].spec
+            if (
+                not isinstance(path, Path)
+                or outdir not in Path(os.path.normpath(path)).parents
+            ):
+                return None
+            out[outkey] = path
+        return out
+
+    def _result_key(self) -> str | None:
+        """Get the key of the job in the result cache
+
+        It is the hash of the language, the input data with the contents of
+        the input files, the output names and the rendered script, with the
+        paths of the job replaced by placeholders, so that the identical
+        jobs in other workdirs or pipelines have the same key.
+
+        Returns:
+            The key, None if any input or output file is not local
+        """
+        if self._result_outputs() is None:
+            return None
+
+        # path => placeholder
+        placeholders = {}
+
+        def _placeholder(path: Any, name: str) -> None:
+            placeholders[str(path)] = name
+            placeholders[str(getattr(path, "spec", path))] = name
+
+        _placeholder(self._outdir.mounted, "{{job.outdir}}")
+        _placeholder(self._outdir.path, "{{job.outdir}}")
+        _placeholder(self.metadir.mounted, "{{job.metadir}}")
+        _placeholder(self.metadir.path, "{{job.metadir}}")
+
+        input_data = {}
+        for inkey, intype in self.proc.input.type.items():
+            value = self.input[inkey]
+            if intype == ProcInputType.VAR or value is None:
+                input_data[inkey] = value
+                continue
+
+            files = [value] if intype in (
+                ProcInputType.FILE,
+                ProcInputType.DIR,
+            ) else value
+            digests = []
+            for i, file in enumerate(files):
+                if not isinstance(file.spec, Path):
+                    return None
+                if file.spec.is_dir():
+                    digests.append(self._dir_digest(file.spec))
+                else:
+                    digests.append(self._file_digest(file.spec))
+                _placeholder(file, f"{{{{in.{inkey}[{i}]}}}}")
+            input_data[inkey] = digests
+
+        for outkey, outtype in self._output_types.items():
+            if outtype != ProcOutputType.VAR:
+                _placeholder(self.output[outkey], f"{{{{out.{outkey}}}}}")
+
+        def _normalize(text: str) -> str:
+            for path in sorted(placeholders, key=len, reverse=True):
+                text = text.replace(path, placeholders[path])
+            return text
+
+        output_data = {
+            outkey: _normalize(str(self.output[outkey].spec))
+            for outkey, outtype in self._output_types.items()
+            if outtype != ProcOutputType.VAR
+        }
+        content = [
+            # the same as the one to run the script with (see `Job._prepare`)
+            self.proc.lang or self.proc.pipeline.config.lang,
+            self.proc.input.type,
+            self._output_types,
+            input_data,
+            output_data,
+            _normalize(self.script_file.read_text()),
+        ]
+        return hashlib.sha256(
+            json.dumps(content, default=str, sort_keys=True).encode()
+        ).hexdigest()
+
+    async def _restore_result(self) -> bool:
+        """Materialize the outputs from the result cache of the pipeline,
+        if an identical job has been run
+
+        Returns:
+            True if the outputs are materialized
+        """
+        result_cache = self.proc.pipeline._result_cache
+        if result_cache is None or not self._cache_option:
+            return False
+
+        loop = asyncio.get_running_loop()
+        key = await loop.run_in_executor(None, self._result_key)
+        if key is None:
+            return False
+        try:
+            restored = await loop.run_in_executor(
+                None,
+                result_cache.get,
+                key,
+                self._result_outputs(),
+            )
+        except Exception as exc:
+            self.log("warning", "Failed to get from the result cache: %s", exc)
+            return False
+        if not restored:
+            return False
+
+        self.proc.pipeline._result_cache_hits += 1
+        self._invalidate_mtimes()
+        # As if the job has run and succeeded, so that it is cached by its
+        # signature in the later runs, instead of restored again
+        self.rc_file.write_text("0")
+        self.status_file.write_text(str(JobStatus.FINISHED))
+        await self.cache()
+        self.log("debug", "Outputs materialized from the result cache")
+        return True
+
+    async def _save_result(self) -> None:
+        """Save the outputs to the result cache of the pipeline"""
+        result_cache = self.proc.pipeline._result_cache
+        if result_cache is None or not self._cache_option:
+            return
+
+        loop = asyncio.get_running_loop()
+        key = await loop.run_in_executor(None, self._result_key)
+        if key is None:
+            return
+        try:
+            await loop.run_in_executor(
+                None,
+                result_cache.put,
+                key,
+                self._result_outputs(),
+            )
+        except Exception as exc:
+            self.log("warning", "Failed to save to the result cache: %s", exc)
+
+    def _invalidate_mtimes(self) -> None:
+        """Invalidate the memoized mtimes of the output directory and the
+        output files/directories, which are written by the job"""
+        invalidate_mtime(self._outdir)
+        for outkey, outtype in self._output_types.items():
+            if outtype in (ProcOutputType.FILE, ProcOutputType.DIR):
+                invalidate_mtime(self.output[outkey].spec)
 
     async def _clear_output(self) -> None:
         """Clear output if not cached"""
@@ -98,91 +469,119 @@ class JobCaching:
                 if not path.is_dir():
                     path.unlink()
                 else:
-                    path.rmtree(ignore_errors=True)
+                    # Move the directory into the trash to be deleted in the
+                    # background, or delete it without blocking the loop
+                    trash = self.proc.pipeline._trash
+                    if trash is None or not trash.remove(path):
+                        await asyncio.get_running_loop().run_in_executor(
+                            None,
+                            partial(path.rmtree, ignore_errors=True),
+                        )
                     path.mkdir()
 
-    async def _check_cached(self) -> bool:
-        """Check if the job is cached based on signature
+        self._invalidate_mtimes()
+
+    def _load_signature(self) -> Dict[str, Any] | None:
+        """Load the signature from the signature store of the process, or
+        from the signature file of the job
 
         Returns:
-            True if the job is cached otherwise False
+            The signature, or None if not found
         """
-        with self.signature_file.open("r") as sf:
-            signature = Config.load(sf, loader="toml")
+        if self.proc._signatures is not None:
+            signature = self.proc._signatures.get(self.index)
+            if signature is not None:
+                return signature
 
-        dirsig = (
-            self.proc.pipeline.config.dirsig
-            if self.proc.dirsig is None
-            else self.proc.dirsig
+        try:
+            with self.signature_file.open("r") as sf:
+                return json.load(sf)
+        except FileNotFoundError:
+            pass
+
+        if not self._toml_signature_file.is_file():
+            return None
+
+        with self._toml_signature_file.open("r") as sf:
+            return Config.load(sf, loader="toml")
+
+    def _has_signature(self) -> bool:
+        """Check if the signature of the job exists"""
+        if (
+            self.proc._signatures is not None
+            and self.proc._signatures.get(self.index) is not None
+        ):
+            return True
+        return (
+            self.signature_file.is_file() or self._toml_signature_file.is_file()
         )
 
+    def _signature_miss_reason(self, signature: Dict[str, Any]) -> str | None:
+        """Check if the job is cached based on signature
+
+        Args:
+            signature: The signature of the job
+
+        Returns:
+            The reason why the job is not cached, or None if it is cached
+        """
+        dirsig = self._dirsig
+
+        # The TOML signatures have no version
+        version = signature.get("version", 0)
+        if version > SIGNATURE_VERSION:
+            return f"signature version {version} is not supported"
+
+        # Content digests of the files, with cache="hash"
+        digests = signature.get("digests") or {}
+        manifest = signature.get("manifest") or {}
+        ctime = signature["ctime"]
+
+        def _is_newer(path: Any, depth: int) -> bool:
+            """Check if a file is newer than the signature, and its content
+            is changed if the digest is recorded"""
+            if get_mtime(path, depth) <= ctime + 1e-3:
+                return False
+            digest = digests.get(str(path))
+            return digest is None or self._file_digest(path) != digest
+
         try:
             # check if inputs/outputs are still the same
             if (
-                signature.input.type != self.proc.input.type
-                or signature.output.type != self._output_types
+                signature["input"]["type"] != self.proc.input.type
+                or signature["output"]["type"] != self._output_types
             ):
-                self.log("debug", "Not cached (input or output types are different)")
-                return False
+                return "input or output types are different"
 
             # check if any script file is newer
-            script_mtime = get_mtime(self.script_file, 0)
-            if script_mtime > signature.ctime + 1e-3:
-                self.log(
-                    "debug",
-                    "Not cached (script file is newer: %s > %s)",
-                    script_mtime,
-                    signature.ctime,
+            if _is_newer(self.script_file, 0):
+                return (
+                    "script file is newer: "
+                    f"{get_mtime(self.script_file, 0)} > {ctime}"
                 )
-                return False
 
             # Check if input is different
             for inkey, intype in self.proc.input.type.items():
-                sig_indata = signature.input.data.get(inkey)
+                sig_indata = signature["input"]["data"].get(inkey)
 
                 if intype == ProcInputType.VAR:
                     if sig_indata != self.input[inkey]:
-                        self.log(
-                            "debug",
-                            "Not cached (input %s:%s is different)",
-                            inkey,
-                            intype,
-                        )
-                        return False
+                        return f"input {inkey}:{intype} is different"
 
                 elif int(self.input[inkey] is None) + int(sig_indata is None) == 1:
                     # one is None, the other is not
-                    self.log(
-                        "debug",
-                        "Not cached (input %s:%s is different; "
-                        "it is <%s> in signature, but <%s> in data)",
-                        inkey,
-                        intype,
-                        type(sig_indata).__name__,
-                        type(self.input[inkey]).__name__,
+                    return (
+                        f"input {inkey}:{intype} is different; "
+                        f"it is <{type(sig_indata).__name__}> in signature, "
+                        f"but <{type(self.input[inkey]).__name__}> in data"
                     )
-                    return False
 
                 elif intype in (ProcInputType.FILE, ProcInputType.DIR):
                     if sig_indata != str(self.input[inkey].spec):
-                        self.log(
-                            "debug",
-                            "Not cached (input %s:%s is different)",
-                            inkey,
-                            intype,
-                        )
-                        return False
+                        return f"input {inkey}:{intype} is different"
 
-                    if (
-                        get_mtime(self.input[inkey].spec, dirsig)
-                        > signature.ctime + 1e-3
-                    ):
-                        self.log(
-                            "debug",
-                            "Not cached (Input file is newer: %s)",
-                            inkey,
-                        )
-                        return False
+                    if _is_newer(self.input[inkey].spec, dirsig):
+                        return f"Input file is newer: {inkey}"
 
                 # FILES/DIRS
 
@@ -191,113 +590,110 @@ class JobCaching:
                 #     continue
 
                 elif not isinstance(sig_indata, list):  # pragma: no cover
-                    self.log(
-                        "debug",
-                        "Not cached (input %s:%s is different, "
-                        "%s detected in signature)",
-                        inkey,
-                        intype,
-                        type(sig_indata).__name__,
+                    return (
+                        f"input {inkey}:{intype} is different, "
+                        f"{type(sig_indata).__name__} detected in signature"
                     )
-                    return False
 
                 else:  # both list
                     if len(sig_indata) != len(self.input[inkey]):  # pragma: no cover
-                        self.log(
-                            "debug",
-                            "Not cached (input %s:%s length is different)",
-                            inkey,
-                            intype,
-                        )
-                        return False
+                        return f"input {inkey}:{intype} length is different"
 
                     for i, file in enumerate(self.input[inkey]):
                         if sig_indata[i] != str(file.spec):  # pragma: no cover
-                            self.log(
-                                "debug",
-                                "Not cached (input %s:%s at index %s is different)",
-                                inkey,
-                                intype,
-                                i,
-                            )
-                            return False
-
-                        if get_mtime(file.spec, dirsig) > signature.ctime + 1e-3:
-                            self.log(
-                                "debug",
-                                "Not cached (input %s:%s at index %s is newer)",
-                                inkey,
-                                intype,
-                                i,
+                            return (
+                                f"input {inkey}:{intype} at index {i} "
+                                "is different"
                             )
-                            return False
+
+                        if _is_newer(file.spec, dirsig):
+                            return f"input {inkey}:{intype} at index {i} is newer"
 
             # Check if output is different
             for outkey, outtype in self._output_types.items():
-                sig_outdata = signature.output.data.get(outkey)
+                sig_outdata = signature["output"]["data"].get(outkey)
                 if outtype == ProcOutputType.VAR:
                     if sig_outdata != self.output[outkey]:  # pragma: no cover
-                        self.log(
-                            "debug",
-                            "Not cached (output %s:%s is different)",
-                            outkey,
-                            outtype,
-                        )
-                        return False
+                        return f"output {outkey}:{outtype} is different"
 
                 else:  # FILE/DIR
                     if sig_outdata != str(self.output[outkey].spec):  # pragma: no cover
-                        self.log(
-                            "debug",
-                            "Not cached (output %s:%s is different)",
-                            outkey,
-                            outtype,
-                        )
-                        return False
-
-                    if not self.output[outkey].spec.exists():
-                        self.log(
-                            "debug",
-                            "Not cached (output %s:%s was removed)",
-                            outkey,
-                            outtype,
-                        )
-                        return False
+                        return f"output {outkey}:{outtype} is different"
+
+                    digest = digests.get(sig_outdata)
+                    # Not to look up the digest if the file is unchanged,
+                    # which takes a stat and a query to the hash cache,
+                    # otherwise the existence is checked with a stat anyway
+                    if digest is not None and self._output_unchanged(
+                        self.output[outkey].spec,
+                        manifest.get(sig_outdata),
+                    ):
+                        continue
+
+                    if not path_exists(self.output[outkey].spec):
+                        return f"output {outkey}:{outtype} was removed"
+
+                    if (
+                        digest is not None
+                        and self._file_digest(self.output[outkey].spec) != digest
+                    ):
+                        return f"output {outkey}:{outtype} was modified"
 
         except Exception as exc:  # pragma: no cover
             # meaning signature is incomplete
             # or any file is deleted
-            self.log("debug", "Not cached (%s)", exc)
-            return False
+            return str(exc)
 
-        return True
+        return None
+
+    def _cache_miss_reason(self) -> str | None:
+        """Check if the job is cached, without writing anything
+
+        A job with `cache="force"` is treated as cached.
+
+        Returns:
+            The reason why the job is not cached, or None if it is cached
+        """
+        proc_cache = self._cache_option
+        if not proc_cache:
+            return "proc.cache is False"
+        if self.rc != 0:
+            return "job.rc != 0"
+        if proc_cache == "force":
+            return None
+        signature = self._load_signature()
+        if signature is None:
+            return "signature file not found"
+        reason = self._signature_miss_reason(signature)
+        if reason is None:
+            self._signature_ctime = signature["ctime"]
+        return reason
 
     @property
+    @traced(
+        "Job.cached",
+        lambda self: {"proc": self.proc.name, "job": self.index},
+    )
     async def cached(self) -> bool:
         """Check if a job is cached
 
+        The signature is checked in a thread of the default executor of the
+        event loop, as it only does blocking file system operations, so that
+        the jobs can be checked concurrently. A job that is not cached is
+        still treated as cached if its outputs are materialized from the
+        result cache.
+
         Returns:
             True if the job is cached otherwise False
         """
-        out = True
-        proc_cache = (
-            self.proc.pipeline.config.cache
-            if self.proc.cache is None
-            else self.proc.cache
+        reason = await asyncio.get_running_loop().run_in_executor(
+            None,
+            self._cache_miss_reason,
         )
-        if not proc_cache:
-            self.log(
-                "debug",
-                "Not cached (proc.cache is False)",
-            )
-            out = False
-        elif self.rc != 0:
-            self.log(
-                "debug",
-                "Not cached (job.rc != 0)",
-            )
-            out = False
-        elif proc_cache == "force":
+        if reason is not None:
+            self.log("debug", "Not cached (%s)", reason)
+            out = await self._restore_result()
+        elif self._cache_option == "force":
             try:
                 await self.cache()
             except Exception:  # pragma: no cover
@@ -305,14 +701,8 @@ class JobCaching:
                 out = False
             else:
                 out = True
-        elif not self.signature_file.is_file():
-            self.log(
-                "debug",
-                "Not cached (signature file not found)",
-            )
-            out = False
         else:
-            out = await self._check_cached()
+            out = True
 
         if not out:
             await self._clear_output()
@@ -0,0 +1,128 @@
+"""Provide SignatureStore class that keeps the signatures of the jobs of a
+process in a single file"""
+
+from __future__ import annotations
+
+import json
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List
+
+from .defaults import SIGNATURE_STORE_BATCH
+from .utils import logger
+
+if TYPE_CHECKING:  # pragma: no cover
+    from yunpath import CloudPath
+
+
+class SignatureStore:
+    """Keep the signatures of the jobs of a process in an append-only log
+
+    Each line of the log is a JSON object with the job index and the
+    signature, and the later lines override the earlier ones for the same
+    job. The log is read at once when the store is opened, and the new
+    signatures are appended in batches. For cloud paths, which can't be
+    appended, the whole log is rewritten with all the signatures.
+
+    Args:
+        path: The path to the log file
+        readonly: Only read the log, without compacting it
+    """
+
+    def __init__(self, path: Path | CloudPath, readonly: bool = False) -> None:
+        self.path = path
+        self.readonly = readonly
+        self._lock = threading.Lock()
+        self._pending: List[str] = []
+        self._signatures: Dict[int, Dict[str, Any]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        """Load the signatures from the log, and compact the log if it has
+        too many overridden records"""
+        try:
+            lines = self.path.read_text().splitlines()
+        except FileNotFoundError:
+            return
+
+        bad = False
+        for line in lines:
+            try:
+                record = json.loads(line)
+                self._signatures[record["index"]] = record["signature"]
+            except (ValueError, KeyError, TypeError):
+                # i.e. the last line is incomplete due to interruption
+                logger.debug("Ignoring bad signature record: %r", line)
+                bad = True
+
+        # Rewrite the log, so that new records are not appended to
+        # an incomplete line
+        if not self.readonly and (bad or len(lines) > 2 * len(self._signatures)):
+            self._write_all()
+
+    def _dumps(self, index: int, signature: Dict[str, Any]) -> str:
+        """Dump a record of the log"""
+        record = {"index": index, "signature": signature}
+        return json.dumps(record, default=str) + "\n"
+
+    def _write_all(self) -> None:
+        """Rewrite the log with all the signatures"""
+        self.path.write_text(
+            "".join(
+                self._dumps(index, signature)
+                for index, signature in self._signatures.items()
+            )
+        )
+
+    def get(self, index: int) -> Dict[str, Any] | None:
+        """Get the signature of a job
+
+        Args:
+            index: The index of the job
+
+        Returns:
+            The signature, or None if not recorded
+        """
+        return self._signatures.get(index)
+
+    def put(self, index: int, signature: Dict[str, Any]) -> None:
+        """Record the signature of a job, to be written in batches
+
+        Args:
+            index: The index of the job
+            signature: The signature
+        """
+        with self._lock:
+            self._signatures[index] = signature
+            self._pending.append(self._dumps(index, signature))
+            if len(self._pending) >= SIGNATURE_STORE_BATCH:
+                self._flush()
+
+    def _flush(self) -> None:
+        """Write the pending records, should be called with the lock held"""
+        if not self._pending:
+            return
+        if isinstance(self.path, Path):
+            with self.path.open("a") as fout:
+                fout.writelines(self._pending)
+        else:
+            self._write_all()
+        self._pending = []
+
+    def flush(self) -> None:
+        """Write the pending records"""
+        with self._lock:
+            self._flush()
+
+    def remove(self, indices: Iterable[int]) -> None:
+        """Remove the signatures of the jobs and rewrite the log, i.e. when
+        the outputs of the jobs are evicted
+
+        Args:
+            indices: The indices of the jobs
+        """
+        with self._lock:
+            self._pending = []
+            for index in indices:
+                self._signatures.pop(index, None)
+            self._write_all()
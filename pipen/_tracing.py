@@ -0,0 +1,471 @@
+"""Provide tracing of the pipeline internals
+
+The spans are saved as Chrome trace events (viewable in Perfetto or
+chrome://tracing), or as OTLP JSON if the file ends with `.otlp.json`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Tuple
+
+from .version import __version__
+
+# The tracer of the running pipeline, None if tracing is disabled
+_TRACER: Tracer | None = None
+# The id of the current span, used as the parent of the new spans
+_PARENT: ContextVar[int | None] = ContextVar("pipen_trace_parent", default=None)
+# The names and the start times of the hooks being called
+_HOOK_STARTS: ContextVar[Tuple[Tuple[str, int], ...]] = ContextVar(
+    "pipen_trace_hook_starts",
+    default=(),
+)
+# The names of the plugins to trace the calls of the plugin hooks, called
+# before and after the other plugins
+HOOK_TRACER_FIRST = "pipen-trace-first"
+HOOK_TRACER_LAST = "pipen-trace-last"
+
+
+class _Span:
+    """A finished span"""
+
+    __slots__ = ("name", "cat", "start", "end", "track", "span_id", "parent", "args")
+
+    def __init__(
+        self,
+        name: str,
+        cat: str,
+        start: int,
+        end: int,
+        track: int,
+        span_id: int,
+        parent: int | None,
+        args: Dict[str, Any],
+    ) -> None:
+        self.name = name
+        self.cat = cat
+        self.start = start
+        self.end = end
+        self.track = track
+        self.span_id = span_id
+        self.parent = parent
+        self.args = args
+
+
+class Tracer:
+    """Record the spans and save them to a file
+
+    Args:
+        path: The path to the trace file
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.spans: List[_Span] = []
+        # The names of the tracks (asyncio tasks or threads)
+        self.tracks: Dict[Any, Tuple[int, str]] = {}
+        self._ids = iter(range(1, 1 << 62))
+        self._lock = threading.Lock()
+        # (proc name, job index) => the start time of the running jobs
+        self._job_starts: Dict[Tuple[str, int], int] = {}
+        # perf_counter_ns() is precise but has no reference point
+        self._offset = time.time_ns() - time.perf_counter_ns()
+
+    def now(self) -> int:
+        """Get the current time in nanoseconds since the epoch"""
+        return time.perf_counter_ns() + self._offset
+
+    def _track(self) -> int:
+        """Get the id of the current track, the asyncio task if any,
+        otherwise the thread"""
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+
+        if task is not None:
+            key, name = task, task.get_name()
+        else:
+            thread = threading.current_thread()
+            key, name = thread, thread.name
+
+        with self._lock:
+            if key not in self.tracks:
+                self.tracks[key] = (len(self.tracks) + 1, name)
+            return self.tracks[key][0]
+
+    def job_started(self, proc: str, index: int) -> None:
+        """Start the run span of a job
+
+        Args:
+            proc: The name of the process
+            index: The index of the job
+        """
+        self._job_starts[(proc, index)] = self.now()
+
+    def job_done(self, proc: str, index: int) -> None:
+        """End the run span of a job, each job (or each trial of a retried
+        job) is on its own track
+
+        Args:
+            proc: The name of the process
+            index: The index of the job
+        """
+        start = self._job_starts.pop((proc, index), None)
+        if start is None:
+            return
+
+        key = ("job", proc, index)
+        with self._lock:
+            if key not in self.tracks:
+                self.tracks[key] = (len(self.tracks) + 1, f"{proc}#{index}")
+            track = self.tracks[key][0]
+            span_id = next(self._ids)
+        self.spans.append(
+            _Span(
+                "Job.run",
+                "job",
+                start,
+                self.now(),
+                track,
+                span_id,
+                None,
+                {"proc": proc, "job": index},
+            )
+        )
+
+    def add_span(
+        self,
+        name: str,
+        start: int,
+        end: int,
+        cat: str = "pipen",
+        **args: Any,
+    ) -> None:
+        """Add a span that has finished
+
+        Args:
+            name: The name of the span
+            start: The start time in nanoseconds since the epoch
+            end: The end time in nanoseconds since the epoch
+            cat: The category of the span
+            **args: The attributes of the span
+        """
+        with self._lock:
+            span_id = next(self._ids)
+        self.spans.append(
+            _Span(name, cat, start, end, self._track(), span_id, _PARENT.get(), args)
+        )
+
+    @contextmanager
+    def span(self, name: str, cat: str = "pipen", **args: Any) -> Iterator[None]:
+        """Record the span of the code in the context
+
+        Args:
+            name: The name of the span
+            cat: The category of the span
+            **args: The attributes of the span
+        """
+        with self._lock:
+            span_id = next(self._ids)
+        parent = _PARENT.get()
+        token = _PARENT.set(span_id)
+        start = self.now()
+        try:
+            yield
+        finally:
+            end = self.now()
+            _PARENT.reset(token)
+            self.spans.append(
+                _Span(name, cat, start, end, self._track(), span_id, parent, args)
+            )
+
+    def to_chrome(self) -> Dict[str, Any]:
+        """Convert the spans to Chrome trace events"""
+        pid = os.getpid()
+        events: List[Dict[str, Any]] = [
+            {
+                "name": "process_name",
+                "ph": "M",
+                "pid": pid,
+                "args": {"name": "pipen"},
+            }
+        ]
+        for tid, name in self.tracks.values():
+            events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "tid": tid,
+                    "args": {"name": name},
+                }
+            )
+        for span in self.spans:
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": span.cat,
+                    "ph": "X",
+                    "ts": span.start / 1000.0,
+                    "dur": (span.end - span.start) / 1000.0,
+                    "pid": pid,
+                    "tid": span.track,
+                    "args": {key: str(val) for key, val in span.args.items()},
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """Convert the spans to OTLP JSON (ExportTraceServiceRequest)"""
+        trace_id = os.urandom(16).hex()
+        spans = []
+        for span in self.spans:
+            otlp_span = {
+                "traceId": trace_id,
+                "spanId": f"{span.span_id:016x}",
+                "name": span.name,
+                "kind": 1,  # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(span.start),
+                "endTimeUnixNano": str(span.end),
+                "attributes": [
+                    {"key": key, "value": {"stringValue": str(val)}}
+                    for key, val in span.args.items()
+                ]
+                + [{"key": "pipen.category", "value": {"stringValue": span.cat}}],
+            }
+            if span.parent is not None:
+                otlp_span["parentSpanId"] = f"{span.parent:016x}"
+            spans.append(otlp_span)
+
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": {"stringValue": "pipen"},
+                            }
+                        ]
+                    },
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": "pipen", "version": __version__},
+                            "spans": spans,
+                        }
+                    ],
+                }
+            ]
+        }
+
+    def save(self) -> None:
+        """Save the spans to the trace file"""
+        if self.path.name.endswith(".otlp.json"):
+            data = self.to_otlp()
+        else:
+            data = self.to_chrome()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("w") as fout:
+            json.dump(data, fout)
+
+
+def _hook_started(name: str, args: Tuple[Any, ...]) -> None:
+    """Record the start of a hook call, and the start of the run span of a
+    job when it starts to run
+
+    Args:
+        name: The name of the hook
+        args: The arguments of the hook call
+    """
+    if _TRACER is None:
+        return
+
+    _HOOK_STARTS.set(_HOOK_STARTS.get() + ((name, _TRACER.now()),))
+    if name == "on_job_started":
+        _TRACER.job_started(args[0].proc.name, args[0].index)
+    elif name in ("on_job_succeeded", "on_job_failed"):
+        _TRACER.job_done(args[0].proc.name, args[0].index)
+
+
+def _hook_ended(name: str, args: Tuple[Any, ...]) -> None:
+    """Record the span of a hook call
+
+    Args:
+        name: The name of the hook
+        args: The arguments of the hook call
+    """
+    starts = _HOOK_STARTS.get()
+    for i in range(len(starts) - 1, -1, -1):
+        if starts[i][0] != name:
+            continue
+        # The starts of the nested calls that raised are dropped, too
+        _HOOK_STARTS.set(starts[:i])
+        if _TRACER is not None:
+            _TRACER.add_span(name, starts[i][1], _TRACER.now(), cat="hook")
+        return
+
+
+def _hook_impl(spec: Callable, record: Callable) -> Callable:
+    """Create an implementation of a hook to record its calls
+
+    Args:
+        spec: The specification of the hook
+        record: `_hook_started()` or `_hook_ended()`
+
+    Returns:
+        The implementation, with the same signature as the specification
+    """
+    name = spec.__name__
+    if asyncio.iscoroutinefunction(spec):
+
+        async def impl(*args: Any, **kwargs: Any) -> None:
+            record(name, args or tuple(kwargs.values()))
+
+    else:
+
+        def impl(*args: Any, **kwargs: Any) -> None:
+            record(name, args or tuple(kwargs.values()))
+
+    impl.__name__ = name
+    impl.__signature__ = inspect.signature(spec)  # type: ignore
+    return impl
+
+
+def hook_tracer(last: bool) -> type:
+    """Create the plugin to trace the calls of the hooks
+
+    The first plugin should be called before all the other implementations
+    of a hook and the last one after them, so that the span of a call
+    covers all of them. All the hooks are collected with `ALL*` results, so
+    both are always called. They do nothing if tracing is not started.
+
+    Since the plugins are only sorted by priority once, when a hook is
+    called the first time, the first plugin is registered when the hooks
+    are defined (see `pipen.pluginmgr`), and the last one when tracing
+    starts.
+
+    Args:
+        last: Whether to create the last plugin or the first one
+
+    Returns:
+        The plugin
+    """
+    from . import pluginmgr
+
+    name, priority, record = (
+        (HOOK_TRACER_LAST, sys.maxsize, _hook_ended)
+        if last
+        else (HOOK_TRACER_FIRST, -sys.maxsize, _hook_started)
+    )
+    attrs: Dict[str, Any] = {"name": name, "priority": priority}
+    for hook in dir(pluginmgr):
+        spec = getattr(pluginmgr, hook)
+        if hook.startswith("on_") and inspect.isfunction(spec):
+            attrs[hook] = pluginmgr.plugin.impl(_hook_impl(spec, record))
+    return type(name, (), attrs)
+
+
+def start_tracing(path: Path) -> Tracer:
+    """Start tracing, including the calls of the plugin hooks and the run
+    spans of the jobs
+
+    Args:
+        path: The path to the trace file
+
+    Returns:
+        The tracer
+    """
+    from .pluginmgr import plugin
+
+    global _TRACER
+    _TRACER = Tracer(path)
+    # Disabled when tracing stops, or by the plugins context of the pipeline
+    plugin.get_plugin(HOOK_TRACER_FIRST).enable()
+    if HOOK_TRACER_LAST in plugin.get_all_plugin_names():
+        plugin.get_plugin(HOOK_TRACER_LAST).enable()
+    else:
+        plugin.register(hook_tracer(last=True))
+    return _TRACER
+
+
+def stop_tracing() -> None:
+    """Stop tracing and save the spans to the trace file"""
+    from .pluginmgr import plugin
+
+    global _TRACER
+    tracer, _TRACER = _TRACER, None
+    if tracer is not None:
+        tracer.save()
+    for name in (HOOK_TRACER_FIRST, HOOK_TRACER_LAST):
+        if name in plugin.get_all_plugin_names():
+            plugin.get_plugin(name).disable()
+
+
+def trace_span(name: str, cat: str = "pipen", **args: Any) -> ContextManager:
+    """Record a span if tracing is enabled
+
+    Args:
+        name: The name of the span
+        cat: The category of the span
+        **args: The attributes of the span
+
+    Returns:
+        A context manager recording the span, or doing nothing if tracing
+        is disabled
+    """
+    if _TRACER is None:
+        return nullcontext()
+    return _TRACER.span(name, cat, **args)
+
+
+def traced(
+    name: str,
+    args: Callable[..., Dict[str, Any]] | None = None,
+) -> Callable[[Callable], Callable]:
+    """Decorator to record the calls of a function (sync or async) as spans
+
+    Args:
+        name: The name of the span
+        args: A function to get the attributes of the span from the
+            arguments of the decorated function
+
+    Returns:
+        The decorator
+    """
+
+    def decorator(func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*fargs: Any, **fkwargs: Any) -> Any:
+                if _TRACER is None:
+                    return await func(*fargs, **fkwargs)
+                attrs = args(*fargs, **fkwargs) if args else {}
+                with _TRACER.span(name, **attrs):
+                    return await func(*fargs, **fkwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*fargs: Any, **fkwargs: Any) -> Any:
+            if _TRACER is None:
+                return func(*fargs, **fkwargs)
+            attrs = args(*fargs, **fkwargs) if args else {}
+            with _TRACER.span(name, **attrs):
+                return func(*fargs, **fkwargs)
+
+        return wrapper
+
+    return decorator
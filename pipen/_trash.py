@@ -0,0 +1,82 @@
+"""Provide Trash class that deletes the stale outputs in the background"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+from uuid import uuid4
+
+from .defaults import TRASH_WORKERS
+from .utils import logger
+
+
+class Trash:
+    """Move the stale outputs into a trash directory, and delete them with
+    a pool of background threads
+
+    Renaming is atomic and cheap, so that the jobs can be submitted right
+    away, without waiting for large directories to be deleted. The items
+    left by the interrupted runs are deleted when the trash is opened.
+
+    Args:
+        path: The path to the trash directory, which should be on the same
+            filesystem as the outputs
+        workers: The number of threads to delete the items
+    """
+
+    def __init__(self, path: Path, workers: int = TRASH_WORKERS) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="pipen-trash",
+        )
+        if path.is_dir():
+            for item in path.iterdir():
+                self._executor.submit(self._delete, item)
+
+    @staticmethod
+    def _delete(item: Path) -> None:
+        """Delete an item in the trash"""
+        if item.is_dir() and not item.is_symlink():
+            shutil.rmtree(item, ignore_errors=True)
+        else:
+            item.unlink(missing_ok=True)
+
+    def remove(self, path: Any) -> bool:
+        """Move a path into the trash, to be deleted in the background
+
+        Args:
+            path: The path to remove
+
+        Returns:
+            True if the path is moved into the trash, False if it can't be
+            moved, i.e. it is a cloud path or on another filesystem, and
+            should be deleted by the caller
+        """
+        if not isinstance(path, Path):
+            return False
+
+        with self._lock:
+            self.path.mkdir(parents=True, exist_ok=True)
+        item = self.path / f"{uuid4().hex}-{path.name}"
+        try:
+            os.rename(path, item)
+        except OSError as exc:
+            logger.debug("Can't move %s to the trash: %s", path, exc)
+            return False
+
+        self._executor.submit(self._delete, item)
+        return True
+
+    def close(self) -> None:
+        """Wait for the items to be deleted, and remove the trash directory"""
+        self._executor.shutdown(wait=True)
+        try:
+            self.path.rmdir()
+        except OSError:
+            pass
@@ -0,0 +1,363 @@
+"""Benchmark the overhead of pipen"""
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple
+
+from rich import print
+from rich.table import Table
+
+from ._hooks import CLIPlugin
+
+if TYPE_CHECKING:
+    from argx import ArgumentParser
+    from argparse import Namespace
+
+__all__ = ("CLIBenchPlugin",)
+
+# The phases to report, and the names of the spans for them
+PHASES = {
+    "init": ("Proc.init",),
+    "prepare": ("Job.prepare",),
+    "cache check": ("Job.cached",),
+    "hooks": (),  # all spans with category "hook"
+    "submission": ("Job.submit",),
+}
+# The script of the jobs, doing nothing
+NOOP_SCRIPT = ":"
+
+
+def _input_data(intype: str, njobs: int, indir: Path) -> List[Any]:
+    """Generate the input data for the synthetic processes
+
+    Args:
+        intype: The input type, var, file or files
+        njobs: The number of jobs
+        indir: The directory to generate the input files in
+
+    Returns:
+        The input data
+    """
+    if intype == "var":
+        return list(range(njobs))
+
+    indir.mkdir(parents=True, exist_ok=True)
+    files = []
+    for i in range(njobs if intype == "file" else njobs * 3):
+        infile = indir / f"{i}.txt"
+        infile.write_text(str(i))
+        files.append(infile)
+
+    if intype == "file":
+        return files
+    return [files[i * 3:(i + 1) * 3] for i in range(njobs)]
+
+
+def _bench_signatures(
+    intype: str,
+    data: List[Any],
+    sigdir: Path,
+) -> Dict[str, Tuple[float, float]]:
+    """Benchmark writing and loading the signatures of the jobs, in the TOML
+    format of the older versions and in the JSON format
+
+    Args:
+        intype: The input type, var, file or files
+        data: The input data, one item for each job
+        sigdir: The directory to write the signature files in
+
+    Returns:
+        The time (in seconds) to write and to load a signature, per job,
+        keyed by the format
+    """
+    from diot import Diot
+    from simpleconf import Config
+
+    from ..defaults import SIGNATURE_VERSION
+
+    def _write_toml(path: Path, signature: Dict[str, Any]) -> None:
+        with path.open("w") as f:
+            f.write(Diot(signature).to_toml())
+
+    def _load_toml(path: Path) -> Any:
+        with path.open("r") as f:
+            return Config.load(f, loader="toml")
+
+    def _write_json(path: Path, signature: Dict[str, Any]) -> None:
+        with path.open("w") as f:
+            json.dump(signature, f, separators=(",", ":"), default=str)
+
+    def _load_json(path: Path) -> Any:
+        with path.open("r") as f:
+            return json.load(f)
+
+    signatures = [
+        {
+            "version": SIGNATURE_VERSION,
+            "input": {
+                "type": {"in": intype},
+                "data": {
+                    "in": [str(x) for x in value]
+                    if isinstance(value, list)
+                    else str(value)
+                },
+            },
+            "output": {
+                "type": {"out": "var"},
+                "data": {"out": str(i)},
+            },
+            "ctime": time.time(),
+        }
+        for i, value in enumerate(data)
+    ]
+    sigdir.mkdir(parents=True, exist_ok=True)
+    out = {}
+    for fmt, write, load in (
+        ("toml", _write_toml, _load_toml),
+        ("json", _write_json, _load_json),
+    ):
+        paths = [sigdir / f"{i}.signature.{fmt}" for i in range(len(data))]
+        start = time.perf_counter()
+        for path, signature in zip(paths, signatures):
+            write(path, signature)
+        written = time.perf_counter()
+        for path in paths:
+            load(path)
+        loaded = time.perf_counter()
+        out[fmt] = (
+            (written - start) / len(data),
+            (loaded - written) / len(data),
+        )
+    return out
+
+
+def _summarize(trace_file: Path) -> Dict[str, float]:
+    """Summarize the wall-clock time of each phase from the trace file
+
+    The spans of a phase overlap, as the jobs are handled concurrently,
+    i.e. the spans of the cache check include the time waiting for a
+    thread, so the time is the length of the union of the spans, instead
+    of the sum of their durations.
+
+    Args:
+        trace_file: The trace file in Chrome trace events format
+
+    Returns:
+        The wall-clock time (in seconds) of each phase
+    """
+    events = json.loads(trace_file.read_text())["traceEvents"]
+    intervals: Dict[str, List[Tuple[float, float]]] = {
+        phase: [] for phase in PHASES
+    }
+    for event in events:
+        if event["ph"] != "X":
+            continue
+        for phase, names in PHASES.items():
+            if event["name"] in names or (not names and event["cat"] == "hook"):
+                intervals[phase].append((event["ts"], event["ts"] + event["dur"]))
+
+    out = {}
+    for phase, spans in intervals.items():
+        total = 0.0
+        end = None
+        for start, stop in sorted(spans):
+            if end is None or start > end:
+                total += stop - start
+                end = stop
+            elif stop > end:
+                total += stop - end
+                end = stop
+        out[phase] = total / 1e6
+    return out
+
+
+class CLIBenchPlugin(CLIPlugin):
+    """Benchmark the overhead of pipen with synthetic pipelines
+
+    N processes with M jobs each are run with a no-op script on the local
+    scheduler, first without cache, then with all jobs cached. The process
+    fingerprints are removed before the cached run, so that the jobs are
+    checked one by one. The wall-clock time of each phase is collected by
+    tracing (see `trace` configuration), so the plugins enabled in the
+    configuration files are benchmarked as well. The hook time overlaps
+    the other phases, as the hooks are called inside them.
+
+    With `--signatures`, the pipeline is not run, but the signatures of the
+    jobs are written and loaded, in the TOML format of the older versions
+    and in the JSON format.
+    """
+
+    name = "bench"
+
+    def __init__(
+        self,
+        parser: ArgumentParser,
+        subparser: ArgumentParser,
+    ) -> None:
+        super().__init__(parser, subparser)
+        subparser.add_argument(
+            "-n",
+            "--procs",
+            type=int,
+            default=4,
+            help="The number of processes.",
+        )
+        subparser.add_argument(
+            "-m",
+            "--jobs",
+            type=int,
+            default=50,
+            help="The number of jobs of each process.",
+        )
+        subparser.add_argument(
+            "-i",
+            "--input-type",
+            choices=("var", "file", "files"),
+            default="var",
+            help="The type of the input of the processes.",
+        )
+        subparser.add_argument(
+            "--forks",
+            type=int,
+            default=4,
+            help="How many jobs to run simultaneously for each process.",
+        )
+        subparser.add_argument(
+            "--signatures",
+            action="store_true",
+            help=(
+                "Only benchmark writing and loading the signatures of the jobs, "
+                "in the TOML and JSON formats."
+            ),
+        )
+        subparser.add_argument(
+            "--workdir",
+            default=None,
+            help=(
+                "Where to create the temporary directory for the benchmark. "
+                "Use the system temporary directory if not provided."
+            ),
+        )
+
+    def _run(
+        self,
+        args: Namespace,
+        basedir: Path,
+        data: List[Any],
+        trace_file: Path,
+    ) -> float:
+        """Run the synthetic pipeline once
+
+        Args:
+            args: The parsed arguments
+            basedir: The base directory for the pipeline
+            data: The input data of the processes
+            trace_file: The trace file to save the spans
+
+        Returns:
+            The elapsed time of the run
+        """
+        from ..pipen import Pipen
+        from ..proc import Proc
+
+        class BenchProc(Proc):
+            """A process with a no-op script"""
+
+            input = f"in:{args.input_type}"
+            output = "out:var:{{job.index}}"
+            script = NOOP_SCRIPT
+
+        procs = [
+            Proc.from_proc(BenchProc, name=f"BenchProc{i}", input_data=data)
+            for i in range(args.procs)
+        ]
+        pipeline = Pipen(
+            name="PipenBench",
+            desc="Synthetic pipeline to benchmark pipen",
+            loglevel="warning",
+            forks=args.forks,
+            scheduler="local",
+            trace=trace_file,
+            workdir=basedir / ".pipen",
+            outdir=basedir / "output",
+        ).set_starts(procs)
+
+        start = time.perf_counter()
+        pipeline.run()
+        return time.perf_counter() - start
+
+    def _exec_signatures(self, args: Namespace) -> None:
+        """Benchmark the signatures of the jobs, see `_bench_signatures()`
+
+        Args:
+            args: The parsed arguments
+        """
+        table = Table(
+            title=(
+                f"pipen signatures: {args.jobs} jobs, {args.input_type} input"
+            ),
+        )
+        table.add_column("Format")
+        table.add_column("write per job (us)", justify="right")
+        table.add_column("load per job (us)", justify="right")
+
+        with TemporaryDirectory(prefix="pipen-bench-", dir=args.workdir) as tmpdir:
+            basedir = Path(tmpdir)
+            data = _input_data(args.input_type, args.jobs, basedir / "input")
+            timings = _bench_signatures(
+                args.input_type,
+                data,
+                basedir / "signatures",
+            )
+
+        for fmt, (write, load) in timings.items():
+            table.add_row(fmt, f"{write * 1e6:.1f}", f"{load * 1e6:.1f}")
+
+        print(table)
+
+    def exec_command(self, args: Namespace) -> None:
+        """Run the command"""
+        if args.signatures:
+            return self._exec_signatures(args)
+
+        njobs = args.procs * args.jobs
+        table = Table(
+            title=(
+                f"pipen overhead: {args.procs} processes x {args.jobs} jobs, "
+                f"{args.input_type} input"
+            ),
+        )
+        table.add_column("Phase")
+        for run in ("uncached", "cached"):
+            table.add_column(f"{run} total (s)", justify="right")
+            table.add_column(f"{run} per job (ms)", justify="right")
+
+        with TemporaryDirectory(prefix="pipen-bench-", dir=args.workdir) as tmpdir:
+            basedir = Path(tmpdir)
+            data = _input_data(args.input_type, args.jobs, basedir / "input")
+
+            summaries = []
+            for run in ("uncached", "cached"):
+                if run == "cached":
+                    # Otherwise the jobs are not checked at all
+                    for path in basedir.joinpath(".pipen").rglob(
+                        "proc.fingerprint.json"
+                    ):
+                        path.unlink()
+                trace_file = basedir / f"trace.{run}.json"
+                elapsed = self._run(args, basedir, data, trace_file)
+                summary = _summarize(trace_file)
+                summary["wall"] = elapsed
+                summaries.append(summary)
+
+        for phase in (*PHASES, "wall"):
+            row = [phase]
+            for summary in summaries:
+                row.append(f"{summary[phase]:.3f}")
+                row.append(f"{summary[phase] / njobs * 1000:.3f}")
+            table.add_row(*row)
+
+        print(table)
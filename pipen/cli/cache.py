@@ -0,0 +1,359 @@
+"""Report the space used by the workdir and evict the job outputs"""
+from __future__ import annotations
+
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from stat import S_ISDIR
+from typing import TYPE_CHECKING, Dict, Iterator, List, Tuple
+
+from rich import print
+from rich.table import Table
+
+from ._hooks import CLIPlugin
+from ..defaults import SIGNATURE_STORE_FILE
+
+if TYPE_CHECKING:
+    from argx import ArgumentParser
+    from argparse import Namespace
+
+__all__ = ("CLICachePlugin",)
+
+SIZE_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+AGE_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+# The files of a job that are read or written whenever the job is checked or
+# run, whose access/modification times tell when the job is last used
+USAGE_FILES = ("job.script", "job.signature.json", "job.rc")
+
+
+def _parse_size(size: str) -> int:
+    """Parse a size like 500M or 10G to bytes
+
+    Args:
+        size: The size
+
+    Returns:
+        The number of bytes
+    """
+    matched = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([KMGT]?)(?:i?B)?", size.upper())
+    if not matched:
+        raise ValueError(f"Invalid size: {size}")
+    return int(float(matched.group(1)) * SIZE_UNITS[matched.group(2)])
+
+
+def _parse_age(age: str) -> float:
+    """Parse an age like 12h or 7d to seconds
+
+    Args:
+        age: The age
+
+    Returns:
+        The number of seconds
+    """
+    matched = re.fullmatch(r"(\d+(?:\.\d+)?)\s*([smhdw]?)", age.lower())
+    if not matched:
+        raise ValueError(f"Invalid age: {age}")
+    return float(matched.group(1)) * AGE_UNITS[matched.group(2) or "s"]
+
+
+def _human_size(size: float) -> str:
+    """Format the number of bytes to be human readable"""
+    for unit in ("B", "K", "M", "G"):
+        if size < 1024:
+            return f"{size:.1f}{unit}" if unit != "B" else f"{size:.0f}B"
+        size /= 1024
+    return f"{size:.1f}T"
+
+
+def _du(path: str) -> int:
+    """Get the total size of the files under a path, without following
+    the symlinks
+
+    Args:
+        path: The path
+
+    Returns:
+        The total size
+    """
+    try:
+        stat = os.lstat(path)
+    except OSError:
+        return 0
+    if not S_ISDIR(stat.st_mode):
+        return stat.st_size
+
+    total = 0
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                total += _du(entry.path)
+            else:
+                total += entry.stat(follow_symlinks=False).st_size
+    return total
+
+
+class _JobUsage:
+    """The space used by a job and when it is last used
+
+    Args:
+        jobdir: The directory of the job
+    """
+
+    def __init__(self, jobdir: Path) -> None:
+        self.jobdir = jobdir
+        self.index = int(jobdir.name)
+        self.size = _du(str(jobdir))
+        # Only the outputs in the workdir are evicted, not the exported ones,
+        # which are symlinked from the workdir
+        output = jobdir / "output"
+        self.output_size = (
+            _du(str(output))
+            if output.is_dir() and not output.is_symlink()
+            else 0
+        )
+        self.last_used = 0.0
+        for name in USAGE_FILES:
+            try:
+                stat = (jobdir / name).stat()
+            except OSError:
+                continue
+            self.last_used = max(self.last_used, stat.st_atime, stat.st_mtime)
+
+    def evict(self) -> None:
+        """Remove the outputs, the signature and the return code, so that
+        the job reruns, even with `cache="force"`, which only checks the
+        return code"""
+        output = self.jobdir / "output"
+        shutil.rmtree(output, ignore_errors=True)
+        output.mkdir(exist_ok=True)
+        for name in ("job.signature.json", "job.signature.toml", "job.rc"):
+            (self.jobdir / name).unlink(missing_ok=True)
+
+
+def _is_proc_dir(path: Path) -> bool:
+    """Check if a directory is the workdir of a process, with job directories
+
+    Args:
+        path: The directory
+
+    Returns:
+        True if it has any job directories
+    """
+    return any(child.name.isdigit() and child.is_dir() for child in path.iterdir())
+
+
+def _proc_dirs(workdir: Path) -> Iterator[Tuple[str, Path]]:
+    """Get the workdirs of the processes
+
+    The workdir can be `<workdir>` with `<workdir>/<pipeline>/<proc>`, or
+    `<workdir>/<pipeline>` (the workdir passed to `Pipen` directly) with
+    `<workdir>/<proc>` for the processes.
+
+    Args:
+        workdir: The workdir
+
+    Yields:
+        The pipeline name and the workdir of each process
+    """
+    for child in sorted(workdir.iterdir()):
+        # i.e. the trash directory
+        if not child.is_dir() or child.name.startswith("."):
+            continue
+        if _is_proc_dir(child):
+            yield workdir.name, child
+            continue
+        for proc_dir in sorted(child.iterdir()):
+            if proc_dir.is_dir():
+                yield child.name, proc_dir
+
+
+def _scan(
+    workdir: Path,
+    pipelines: List[str] | None,
+    threads: int,
+) -> Dict[Tuple[str, str], Tuple[List[_JobUsage], int]]:
+    """Scan the workdir in parallel
+
+    Args:
+        workdir: The workdir
+        pipelines: The pipelines to scan, None for all
+        threads: The number of threads to scan the jobs
+
+    Returns:
+        The usages of the jobs and the size of the other files for each
+        process, keyed by the pipeline and process names
+    """
+    jobdirs = []
+    procfiles = {}
+    for pipeline, proc_dir in _proc_dirs(workdir):
+        if pipelines and pipeline not in pipelines:
+            continue
+        key = (pipeline, proc_dir.name)
+        procfiles[key] = 0
+        for path in proc_dir.iterdir():
+            if path.name.isdigit() and path.is_dir():
+                jobdirs.append((key, path))
+            else:
+                procfiles[key] += _du(str(path))
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        usages = executor.map(lambda item: _JobUsage(item[1]), jobdirs)
+        out = {key: ([], size) for key, size in procfiles.items()}
+        for (key, _), usage in zip(jobdirs, usages):
+            out[key][0].append(usage)
+    return out
+
+
+def _evict(
+    usages: Dict[Tuple[str, str], Tuple[List[_JobUsage], int]],
+    max_size: int | None,
+    max_age: float | None,
+) -> List[Tuple[Tuple[str, str], _JobUsage]]:
+    """Select the jobs to evict, least recently used first
+
+    Args:
+        usages: The usages from `_scan()`
+        max_size: The max total size to keep
+        max_age: Evict the jobs not used for this many seconds
+
+    Returns:
+        The jobs to evict, with the pipeline and process names
+    """
+    candidates = sorted(
+        (
+            (key, usage)
+            for key, (jobs, _) in usages.items()
+            for usage in jobs
+            if usage.output_size > 0
+        ),
+        key=lambda item: item[1].last_used,
+    )
+    total = sum(
+        size + sum(usage.size for usage in jobs)
+        for jobs, size in usages.values()
+    )
+    now = time.time()
+
+    out = []
+    for key, usage in candidates:
+        if (max_age is not None and now - usage.last_used > max_age) or (
+            max_size is not None and total > max_size
+        ):
+            out.append((key, usage))
+            total -= usage.output_size
+    return out
+
+
+class CLICachePlugin(CLIPlugin):
+    """Report the space used by the pipelines and processes in a workdir,
+    and evict the least recently used job outputs under a size or age budget
+
+    The outputs of the evicted jobs (not the exported ones) and their
+    signatures are removed, so that they rerun next time. Don't run it on
+    a workdir while the pipelines are running.
+    """
+
+    name = "cache"
+
+    def __init__(
+        self,
+        parser: ArgumentParser,
+        subparser: ArgumentParser,
+    ) -> None:
+        super().__init__(parser, subparser)
+        subparser.add_argument(
+            "workdir",
+            nargs="?",
+            default="./.pipen",
+            help="The workdir of the pipelines.",
+        )
+        subparser.add_argument(
+            "-p",
+            "--pipeline",
+            nargs="+",
+            default=None,
+            help="The pipelines to check. All pipelines if not provided.",
+        )
+        subparser.add_argument(
+            "--max-size",
+            type=_parse_size,
+            default=None,
+            help=(
+                "Evict the least recently used job outputs until the total "
+                "size is under this, i.e. 500M, 10G."
+            ),
+        )
+        subparser.add_argument(
+            "--max-age",
+            type=_parse_age,
+            default=None,
+            help=(
+                "Evict the job outputs not used for this long, "
+                "i.e. 12h, 7d, 2w."
+            ),
+        )
+        subparser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the jobs to evict, without evicting them.",
+        )
+        subparser.add_argument(
+            "--threads",
+            type=int,
+            default=8,
+            help="The number of threads to scan the workdir.",
+        )
+
+    def exec_command(self, args: Namespace) -> None:
+        """Run the command"""
+        workdir = Path(args.workdir)
+        if not workdir.is_dir():
+            print(f"[red]No such workdir: {workdir}[/red]")
+            return
+
+        usages = _scan(workdir, args.pipeline, args.threads)
+        table = Table(title=f"Space used by {workdir}")
+        table.add_column("Pipeline")
+        table.add_column("Process")
+        table.add_column("Jobs", justify="right")
+        table.add_column("Size", justify="right")
+        table.add_column("Job outputs", justify="right")
+        for (pipeline, proc), (jobs, size) in usages.items():
+            table.add_row(
+                pipeline,
+                proc,
+                str(len(jobs)),
+                _human_size(size + sum(usage.size for usage in jobs)),
+                _human_size(sum(usage.output_size for usage in jobs)),
+            )
+        print(table)
+
+        if args.max_size is None and args.max_age is None:
+            return
+
+        evicted = _evict(usages, args.max_size, args.max_age)
+        freed = _human_size(sum(usage.output_size for _, usage in evicted))
+        if args.dry_run:
+            print(f"Would evict {len(evicted)} jobs, freeing {freed}:")
+            for (pipeline, proc), usage in evicted:
+                print(f"- {pipeline}/{proc}/{usage.index}")
+            return
+
+        by_proc: Dict[Path, List[_JobUsage]] = {}
+        for _, usage in evicted:
+            usage.evict()
+            by_proc.setdefault(usage.jobdir.parent, []).append(usage)
+
+        for proc_dir, jobs in by_proc.items():
+            # Any job may rerun, the process fingerprint is no longer valid
+            (proc_dir / "proc.fingerprint.json").unlink(missing_ok=True)
+            store_file = proc_dir / SIGNATURE_STORE_FILE
+            if store_file.exists():
+                from .._signature_store import SignatureStore
+
+                SignatureStore(store_file).remove(usage.index for usage in jobs)
+
+        print(f"Evicted {len(evicted)} jobs, freed {freed}.")
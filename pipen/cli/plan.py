@@ -0,0 +1,53 @@
+"""Report which jobs of a pipeline would run"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from ._hooks import CLIPlugin
+
+if TYPE_CHECKING:
+    from argx import ArgumentParser
+    from argparse import Namespace
+
+__all__ = ("CLIPlanPlugin",)
+
+
+class CLIPlanPlugin(CLIPlugin):
+    """Report which jobs of a pipeline would run and why, without running them
+
+    The input and output of the jobs are computed and the caching is
+    checked, but no scripts are written and nothing is submitted.
+    """
+
+    name = "plan"
+
+    def __init__(
+        self,
+        parser: ArgumentParser,
+        subparser: ArgumentParser,
+    ) -> None:
+        super().__init__(parser, subparser)
+        subparser.add_argument(
+            "pipeline",
+            help=(
+                "The pipeline to plan, in the format of "
+                "`<module[.submodule]>:name` or `/path/to/script.py:name`, "
+                "where name is the pipeline, proc or procgroup."
+            ),
+        )
+        subparser.add_argument(
+            "--profile",
+            default="default",
+            help="The profile to use for the pipeline.",
+        )
+
+    def exec_command(self, args: Namespace) -> None:
+        """Run the command"""
+        import asyncio
+        from ..utils import load_pipeline
+
+        async def _plan() -> None:
+            pipeline = await load_pipeline(args.pipeline, argv1p=[])
+            await pipeline.async_run(args.profile, plan=True)
+
+        asyncio.run(_plan())
@@ -7,6 +7,7 @@ from rich import print
 from ._hooks import CLIPlugin
 from ..defaults import (
     CLI_ENTRY_GROUP,
+    RESULT_CACHE_ENTRY_GROUP,
     SCHEDULER_ENTRY_GROUP,
     TEMPLATE_ENTRY_GROUP,
 )
@@ -22,12 +23,14 @@ GROUPS = [
     "pipen",
     SCHEDULER_ENTRY_GROUP,
     TEMPLATE_ENTRY_GROUP,
+    RESULT_CACHE_ENTRY_GROUP,
     CLI_ENTRY_GROUP,
 ]
 GROUP_NAMES = {
     "pipen": "Pipen",
     SCHEDULER_ENTRY_GROUP: "Scheduler",
     TEMPLATE_ENTRY_GROUP: "Template",
+    RESULT_CACHE_ENTRY_GROUP: "Result cache",
     CLI_ENTRY_GROUP: "CLI",
 }
 
@@ -90,6 +93,11 @@ def _list_plugins(plugins: List[Tuple[str, str, Any]]) -> None:
         for group, name, plugin in plugins
         if group == TEMPLATE_ENTRY_GROUP
     ]
+    rcache_plugins = [
+        (name, plugin)
+        for group, name, plugin in plugins
+        if group == RESULT_CACHE_ENTRY_GROUP
+    ]
     cli_plugins = [
         (name, plugin)
         for group, name, plugin in plugins
@@ -98,6 +106,7 @@ def _list_plugins(plugins: List[Tuple[str, str, Any]]) -> None:
     _list_group_plugins("pipen", pipen_plugins)
     _list_group_plugins(SCHEDULER_ENTRY_GROUP, sched_plugins)
     _list_group_plugins(TEMPLATE_ENTRY_GROUP, tpl_plugins)
+    _list_group_plugins(RESULT_CACHE_ENTRY_GROUP, rcache_plugins)
     _list_group_plugins(CLI_ENTRY_GROUP, cli_plugins)
 
 
@@ -21,6 +21,52 @@ CONFIG_FILES = (
 CONFIG = Diot(
     # pipeline level: The logging level
     loglevel="info",
+    # pipeline level:
+    # How many processes to run simultaneously
+    # 1 to run the processes one by one, 0 for no limit.
+    # When it is not 1, a process starts as soon as all its required
+    # processes are done.
+    max_procs=1,
+    # pipeline level:
+    # How many jobs to run simultaneously across all the running processes
+    # 0 for no limit. `forks` still limits the jobs of each process.
+    max_jobs=0,
+    # pipeline level:
+    # Whether to record the timings of the processes and jobs in
+    # <workdir>/<pipeline>/history.db (SQLite), ignored for cloud workdir
+    history=False,
+    # pipeline level:
+    # The file to save the spans of the pipeline internals for tracing
+    # Chrome trace events (viewable in Perfetto), or OTLP JSON if the file
+    # ends with `.otlp.json`. None to disable tracing.
+    trace=None,
+    # pipeline level:
+    # The number of threads to prepare the jobs of a process (rendering the
+    # scripts, writing the script files and creating the output directories)
+    # 0 for the default of the thread pool, min(32, CPUs + 4)
+    prepare_workers=0,
+    # pipeline level:
+    # Whether to save the compiled templates (Jinja2 bytecode) of the builtin
+    # template engines in <workdir>/<pipeline>/.template_cache, so that they
+    # are not compiled again in the later runs. Ignored for cloud workdir.
+    template_cache=False,
+    # pipeline level:
+    # Whether to keep the signatures of the jobs of each process in a single
+    # file (<proc.workdir>/job.signatures.jsonl) instead of one file per job.
+    # The existing signature files of the jobs are still read if the jobs
+    # are not in the single file.
+    signature_store=False,
+    # pipeline level:
+    # The location (i.e. a directory) of the result cache shared by the
+    # pipelines and workdirs, where the outputs of the jobs are saved by the
+    # hash of the content of the jobs, and materialized for the identical
+    # jobs instead of running them. None to disable it.
+    result_cache=None,
+    # pipeline level:
+    # The backend of the result cache, "local" for a local (or mounted)
+    # directory, or the name of a backend plugin, or a subclass of
+    # `pipen.result_cache.ResultCache`
+    result_cache_backend="local",
     # process level: The cache option, True/False/export
     cache=True,
     # process level: Whether expand directory to check signature
@@ -42,6 +88,12 @@ CONFIG = Diot(
     # process level:
     # How many jobs to be submitted in a batch
     submission_batch=8,
+    # process level:
+    # Whether to submit a job as soon as the jobs with the same index of the
+    # required processes are done, instead of waiting for the whole required
+    # processes to finish. Only works when `max_procs` is not 1 and the
+    # process has the same number of jobs as each of its required processes.
+    streaming=False,
     # pipeline level:
     # The working directory for the pipeline
     workdir="./.pipen",
@@ -71,12 +123,42 @@ CONSOLE_DEFAULT_WIDTH = 2048
 # The markup code is included
 # Don't modify this unless the logger formatter is changed
 CONSOLE_WIDTH_SHIFT = 25
+# The max number of distinct reasons to show for the jobs to run in plan mode
+PLAN_MAX_REASONS = 5
+# The version of the format of the job signatures
+SIGNATURE_VERSION = 1
+# The file to keep the signatures of the jobs with `signature_store`
+SIGNATURE_STORE_FILE = "job.signatures.jsonl"
+# How many signatures to write at once with `signature_store`
+SIGNATURE_STORE_BATCH = 1000
+# The number of threads to walk the subdirectories for the mtimes of
+# local directories (dirsig)
+DIRSIG_WORKERS = 8
+# The max number of jobs of a process to check the outputs of at the same
+# time, once they are finished
+OUTPUT_CHECK_WORKERS = 8
+# Files larger than this can't be fake symlinks ("symlink:<url>")
+FAKE_SYMLINK_MAX_SIZE = 4096
+# The max number of objects to list under a cloud prefix at once, to answer
+# the modification times and existence of the cloud input/output files
+CLOUD_LISTING_MAX_OBJECTS = 100_000
+# The number of the concurrent requests to the cloud storage for the paths
+# that can't be answered from the listings
+CLOUD_REQUEST_WORKERS = 16
+# The directory in the workdir of a pipeline to move the stale outputs into,
+# and the number of threads to delete them in the background
+TRASH_DIR = ".trash"
+TRASH_WORKERS = 4
 # For pipen scheduler plugins
 SCHEDULER_ENTRY_GROUP = "pipen_sched"
 # For pipen template plugins
 TEMPLATE_ENTRY_GROUP = "pipen_tpl"
+# The directory in the workdir of a pipeline to save the compiled templates
+TEMPLATE_CACHE_DIR = ".template_cache"
 # For pipen template cli plugins
 CLI_ENTRY_GROUP = "pipen_cli"
+# For pipen result cache backend plugins
+RESULT_CACHE_ENTRY_GROUP = "pipen_rcache"
 
 
 class ProcInputType:
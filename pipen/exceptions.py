@@ -58,6 +58,14 @@ class WrongTemplateEnginTypeError(PipenException, TypeError):
     """When specified tempalte engine is not a subclass of Scheduler"""
 
 
+class NoSuchResultCacheBackendError(PipenException):
+    """When specified result cache backend cannot be found"""
+
+
+class WrongResultCacheBackendTypeError(PipenException, TypeError):
+    """When specified result cache backend is not a subclass of ResultCache"""
+
+
 class TemplateRenderingError(PipenException):
     """Failed to render a template"""
 
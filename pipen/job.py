@@ -2,60 +2,179 @@
 
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import logging
 import shlex
 from functools import cached_property
-from os import PathLike
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, Dict, Mapping
+from typing import TYPE_CHECKING, Any, Dict, Mapping, Set
 
 from yunpath import AnyPath, CloudPath
 from diot import OrderedDiot
 from xqute import Job as XquteJob
-from xqute.path import DualPath, MountedPath
+from xqute.path import DualPath
 
 from ._job_caching import JobCaching
+from ._tracing import traced
 from .defaults import ProcInputType, ProcOutputType
 from .exceptions import (
-    ProcInputTypeError,
     ProcOutputNameError,
     ProcOutputTypeError,
     ProcOutputValueError,
     TemplateRenderingError,
 )
 from .template import Template
-from .utils import logger, strsplit, path_is_symlink, path_symlink_to
+from .utils import (
+    invalidate_mtime,
+    logger,
+    path_is_symlink,
+    path_symlink_to,
+    strsplit,
+)
 
 if TYPE_CHECKING:  # pragma: no cover
     from .proc import Proc
 
 
+class _PlanningDir(DualPath):
+    """The metadir of a job that is only planned, not to be created"""
+
+    def mkdir(self, *args: Any, **kwargs: Any) -> None:
+        """Do not create the directory"""
+
+
+class _PlanningWorkdir(DualPath):
+    """The workdir of a process to create the jobs that are only planned
+
+    xqute creates the metadir of a job (`workdir / str(index)`) when the
+    job is constructed, which is not created for a planned job.
+    """
+
+    def __truediv__(self, other: Any) -> DualPath:
+        return _PlanningDir(self.path / other, mounted=self.mounted / other)
+
+
 class Job(XquteJob, JobCaching):
     """The job for pipen"""
 
-    __slots__ = XquteJob.__slots__ + ("proc", "_output_types", "_outdir")
+    __slots__ = XquteJob.__slots__ + (
+        "proc",
+        "_output_types",
+        "_outdir",
+        "_script_digest",
+        "_signature_ctime",
+        "_planning",
+    )
 
     def __init__(
         self,
-        *args: Any,
-        **kwargs: Any,
+        index: int,
+        cmd: Any,
+        workdir: DualPath,
+        error_retry: bool | None = None,
+        num_retries: int | None = None,
+        planning: bool = False,
     ) -> None:
-        super().__init__(*args, **kwargs)
+        """Construct a new Job
+
+        Args:
+            index: The index of the job
+            cmd: The command of the job
+            workdir: The workdir of the process. For a job that is only
+                planned, its metadir is not created (see `_PlanningWorkdir`)
+            error_retry: Whether we should retry if error happened
+            num_retries: Total number of retries
+            planning: Whether the job is only planned (see `plan()`), so that
+                nothing is written to the filesystem
+        """
+        if planning:
+            workdir = _PlanningWorkdir(workdir.path, mounted=workdir.mounted)
+        super().__init__(index, cmd, workdir, error_retry, num_retries)
+        self._planning = planning
         self.proc: Proc = None
         self._output_types: Dict[str, str] = {}
         # Where the real output directory is
         self._outdir: DualPath = None
-
+        # The digest of the rendered script, for the process fingerprint
+        self._script_digest: str = ""
+        # The ctime of the signature, once checked or written, for the
+        # process fingerprint
+        self._signature_ctime: float | None = None
+
+    @traced(
+        "Job.prepare",
+        lambda self, proc: {"proc": proc.name, "job": self.index},
+    )
     async def prepare(self, proc: Proc) -> None:
         """Prepare the job by given process
 
         Primarily prepare the script, and provide cmd to the job for xqute
-        to wrap and run
+        to wrap and run. It is done in the thread pool of the process when
+        the jobs are initialized, since it only does blocking work.
+
+        Args:
+            proc: the process object
+        """
+        executor = getattr(proc, "_prepare_executor", None)
+        if executor is None:
+            self._prepare(proc)
+        else:
+            await asyncio.get_running_loop().run_in_executor(
+                executor,
+                self._prepare,
+                proc,
+            )
+
+    def _prepare(self, proc: Proc) -> bool:
+        """Prepare the job by given process
+
+        When the job is only planned, the script is rendered and compared
+        with the existing one, without being written.
+
+        Args:
+            proc: the process object
+
+        Returns:
+            True if the script is new or updated, otherwise False
+        """
+        self._attach(proc)
+        if not proc.script:
+            return False
+
+        try:
+            script = proc.script.render(self.template_data)
+        except Exception as exc:
+            raise TemplateRenderingError(
+                f"[{self.proc.name}] Failed to render script."
+            ) from exc
+
+        self._script_digest = hashlib.sha256(script.encode()).hexdigest()
+        # Only needed to render the script, computed again if accessed later
+        self._release()
+        changed = True
+        if self.script_file.is_file() and self.script_file.read_text() != script:
+            if not self._planning:
+                self.log("debug", "Job script updated.")
+                self.script_file.write_text(script)
+        elif not self.script_file.is_file():
+            if not self._planning:
+                self.script_file.write_text(script)
+        else:
+            changed = False
+
+        if changed and not self._planning:
+            invalidate_mtime(self.script_file)
+
+        return changed
+
+    def _attach(self, proc: Proc) -> None:
+        """Attach the process, and compute the output directory and the
+        command of the job, without touching the filesystem
 
         Args:
             proc: the process object
         """
-        # Attach the process
         self.proc = proc
 
         # Where the jobs of "export" process should put their outputs
@@ -63,7 +182,7 @@ class Job(XquteJob, JobCaching):
 
         # Where the jobs of "export" process should put their outputs
         # (in the mounted filesystem)
-        mounted_outdir = getattr(proc.xqute.scheduler, "MOUNTED_OUTDIR", None)
+        mounted_outdir = getattr(proc.scheduler, "MOUNTED_OUTDIR", None)
         if mounted_outdir is not None:  # pragma: no cover
             mounted_outdir = Path(mounted_outdir) / proc.name
 
@@ -82,23 +201,44 @@ class Job(XquteJob, JobCaching):
 
         if not proc.script:
             self.cmd = []
-            return
+        else:
+            lang = proc.lang or proc.pipeline.config.lang
+            self.cmd = shlex.split(lang) + [self.script_file.mounted.fspath]
 
-        try:
-            script = proc.script.render(self.template_data)
-        except Exception as exc:
-            raise TemplateRenderingError(
-                f"[{self.proc.name}] Failed to render script."
-            ) from exc
+    @traced(
+        "Job.plan",
+        lambda self, proc, _: {"proc": proc.name, "job": self.index},
+    )
+    def plan(self, proc: Proc, stale_outputs: Set[str]) -> str | None:
+        """Check if the job would run, without writing the script,
+        clearing the outputs or submitting the job
 
-        if self.script_file.is_file() and self.script_file.read_text() != script:
-            self.log("debug", "Job script updated.")
-            self.script_file.write_text(script)
-        elif not self.script_file.is_file():
-            self.script_file.write_text(script)
+        Args:
+            proc: the process object
+            stale_outputs: The output files/directories of the jobs that
+                would run. The job would run if any of its input is one of them.
+
+        Returns:
+            The reason why the job would run, or None if it would be cached
+        """
+        script_changed = self._prepare(proc)
+        reason = self._cache_miss_reason()
+        if reason is not None:
+            return reason
+
+        if script_changed:
+            return "script file is updated"
+
+        for inkey, intype in proc.input.type.items():
+            value = self.input[inkey]
+            if value is None or intype == ProcInputType.VAR:
+                continue
+            if intype in (ProcInputType.FILE, ProcInputType.DIR):
+                value = [value]
+            if any(str(path.spec) in stale_outputs for path in value):
+                return f"input {inkey}:{intype} is to be regenerated"
 
-        lang = proc.lang or proc.pipeline.config.lang
-        self.cmd = shlex.split(lang) + [self.script_file.mounted.fspath]
+        return None
 
     @property
     def script_file(self) -> DualPath:
@@ -122,9 +262,15 @@ class Job(XquteJob, JobCaching):
 
         To access the real path, use self._outdir
 
+        When the job is only planned, the directory is not created, neither
+        is the symbolic link from the metadir.
+
         Returns:
             The path to the job output directory
         """
+        if self._planning:
+            return self._outdir
+
         # if ret is a dead link
         # when switching a proc from end/nonend to nonend/end
         if path_is_symlink(self._outdir) and not self._outdir.exists():
@@ -150,75 +296,8 @@ class Job(XquteJob, JobCaching):
         Returns:
             A key-value map, where keys are the input keys
         """
-        import pandas
-
-        ret = self.proc.input.data.iloc[self.index, :].to_dict()
-        # check types
-        for inkey, intype in self.proc.input.type.items():
-
-            if intype == ProcInputType.VAR or ret[inkey] is None:
-                continue  # pragma: no cover, covered actually
-
-            if intype in (ProcInputType.FILE, ProcInputType.DIR):
-                if not isinstance(ret[inkey], (str, PathLike, CloudPath, DualPath)):
-                    raise ProcInputTypeError(
-                        f"[{self.proc.name}] Got {type(ret[inkey])} instead of "
-                        f"PathLike object for input: {inkey + ':' + intype!r}"
-                    )
-
-                if isinstance(ret[inkey], DualPath):
-                    # if it is a dualpath, it means it is a mounted path
-                    # we should use the mounted path to access the file
-                    ret[inkey] = ret[inkey].mounted
-
-                elif not isinstance(ret[inkey], MountedPath):
-                    # str, Path, CloudPath
-                    path = AnyPath(ret[inkey])
-                    if isinstance(path, Path):
-                        # Same as:
-                        # p = MountedPath(path.expanduser().absolute())
-                        # p.spec = path.expanduser().absolute()
-                        ret[inkey] = DualPath(path.expanduser().absolute()).mounted
-                    else:
-                        ret[inkey] = DualPath(path).mounted
-
-                # already a MountedPath
-
-            if intype in (ProcInputType.FILES, ProcInputType.DIRS):
-                if isinstance(ret[inkey], pandas.DataFrame):
-                    # // todo: nested dataframe
-                    ret[inkey] = ret[inkey].iloc[0, 0]  # pragma: no cover
-
-                if not isinstance(ret[inkey], (list, tuple)):
-                    raise ProcInputTypeError(
-                        f"[{self.proc.name}] Expected a sequence for input: "
-                        f"{inkey + ':' + intype!r}, got {type(ret[inkey])}"
-                    )
-
-                for i, file in enumerate(ret[inkey]):
-                    if not isinstance(file, (str, PathLike, CloudPath, DualPath)):
-                        raise ProcInputTypeError(
-                            f"[{self.proc.name}] Got {type(file)} instead of "
-                            f"PathLike object for input: {inkey + ':' + intype!r} "
-                            f"at index {i}"
-                        )
-
-                    if isinstance(file, DualPath):
-                        # if it is a dualpath, it means it is a mounted path
-                        # we should use the mounted path to access the file
-                        ret[inkey][i] = file.mounted
-
-                    elif not isinstance(file, MountedPath):
-                        # str, Path, CloudPath
-                        path = AnyPath(file)
-                        if isinstance(path, Path):
-                            ret[inkey][i] = DualPath(
-                                path.expanduser().absolute()
-                            ).mounted
-                        else:
-                            ret[inkey][i] = DualPath(path).mounted
-
-        return ret
+        # Validated and normalized by the process for all jobs at once
+        return self.proc._input_records[self.index]
 
     @cached_property
     def output(self) -> Mapping[str, Any]:
@@ -288,7 +367,7 @@ class Job(XquteJob, JobCaching):
                     )
 
                 out = self.outdir / output_value
-                if output_type == ProcOutputType.DIR:
+                if output_type == ProcOutputType.DIR and not self._planning:
                     out.mkdir(parents=True, exist_ok=True)
 
                 ret[output_name] = out.mounted
@@ -318,6 +397,14 @@ class Job(XquteJob, JobCaching):
             "envs": self.proc.envs,
         }
 
+    def _release(self) -> None:
+        """Release the data that is only needed to render the script, to
+        save memory for the processes with many jobs
+
+        The data is computed again if accessed later (i.e. by plugins).
+        """
+        self.__dict__.pop("template_data", None)
+
     def log(
         self,
         level: int | str,
@@ -3,9 +3,27 @@
 from __future__ import annotations
 
 import asyncio
+import functools
+import signal
+import time
+from contextlib import contextmanager
+from heapq import heappop, heappush
+from itertools import count
 from os import PathLike
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, ClassVar, Iterable, List, Sequence, Type
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    ClassVar,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+)
 
 from diot import Diot
 from rich import box
@@ -15,7 +33,24 @@ from simpleconf import ProfileConfig
 from varname import varname, VarnameException
 from yunpath import AnyPath, CloudPath
 
-from .defaults import CONFIG, CONFIG_FILES
+from ._hash_cache import HashCache
+from ._history import RunHistory
+from ._tracing import (
+    HOOK_TRACER_FIRST,
+    HOOK_TRACER_LAST,
+    start_tracing,
+    stop_tracing,
+    trace_span,
+    traced,
+)
+from ._trash import Trash
+from .defaults import (
+    CONFIG,
+    CONFIG_FILES,
+    PLAN_MAX_REASONS,
+    TEMPLATE_CACHE_DIR,
+    TRASH_DIR,
+)
 from .exceptions import (
     PipenOrProcNameError,
     ProcDependencyError,
@@ -24,7 +59,10 @@ from .exceptions import (
 from .pluginmgr import plugin
 from .proc import Proc
 from .progressbar import PipelinePBar
+from .result_cache import ResultCache, get_result_cache_backend
+from .template import set_template_cache
 from .utils import (
+    brief_list,
     copy_dict,
     desc_from_docstring,
     get_logpanel_width,
@@ -32,11 +70,15 @@ from .utils import (
     log_rich_renderable,
     logger,
     pipen_banner,
+    start_mtime_cache,
+    stop_mtime_cache,
 )
 
 if TYPE_CHECKING:
     from xqute.path import PathType
 
+    from .job import Job
+
 
 class Pipen:
     """The Pipen class provides interface to assemble and run the pipeline
@@ -83,6 +125,21 @@ class Pipen:
         """Constructor"""
         self.procs: List[Proc] = None
         self.pbar: PipelinePBar = None
+        # The process objects that are currently running
+        self._running_procs: List[Proc] = []
+        # The jobs (process name and job index) submitted by xqute and not
+        # done yet in all the running processes, for `max_jobs`
+        self._active_jobs: Set[Tuple[str, int]] = set()
+        # The number of the slots of `max_jobs` reserved for the jobs being
+        # queued by xqute, which are not submitted yet, for each process
+        self._reserved_jobs: Dict[str, int] = {}
+        # The run history recorder, if `history` is enabled
+        self._history: RunHistory | None = None
+        self._hash_cache: HashCache | None = None
+        self._result_cache: ResultCache | None = None
+        self._trash: Trash | None = None
+        # The number of jobs with the outputs from the result cache
+        self._result_cache_hits = 0
         if name is not None:
             self.name = name
         elif self.__class__.name is not None:
@@ -114,6 +171,10 @@ class Pipen:
 
         self.workdir: PathType | None = None
         self.profile: str = "default"
+        # The profile that the pipeline is initialized with (see `_init()`),
+        # so that it is not initialized again to plan the run, i.e. when it
+        # is loaded by `utils.load_pipeline()`
+        self._initialized: str | None = None
 
         self.starts: List[Proc] = self.__class__.starts
         if self.starts and not isinstance(self.starts, (tuple, list)):
@@ -167,45 +228,64 @@ class Pipen:
     def __init_subclass__(cls) -> None:
         cls.PIPELINE_COUNT = 0
 
-    async def async_run(self, profile: str = "default") -> bool:
-        """Run the processes one by one
+    async def async_run(self, profile: str = "default", plan: bool = False) -> bool:
+        """Run the processes
+
+        The processes are run one by one, unless `max_procs` is not 1,
+        where a process is started once all its required processes are done.
 
         Args:
             profile: The default profile to use for the run
+            plan: Only report which jobs would run and why, without running
+                them. Nothing is written, including the workdir. Only the
+                plugin hooks to initialize the pipeline and to compute the
+                processes are called, the ones to start and complete the
+                pipeline, processes and jobs are not.
 
         Returns:
             True if the pipeline ends successfully else False
         """
-        self.profile = profile
-        self.workdir = AnyPath(str(self.config.workdir)) / self.name  # type: ignore
-        # self.workdir.mkdir(parents=True, exist_ok=True)
-
         succeeded = True
-        await self._init()
+        self._active_jobs = set()
+        self._reserved_jobs = {}
+        init_started = time.time_ns()
+        # Not to call on_init() again to plan the run if initialized by
+        # load_pipeline(). It is called again for a real run, where the
+        # plugins can tell that the pipeline is not only loaded.
+        if not plan or self._initialized != profile:
+            self.profile = profile
+            self.workdir = (
+                AnyPath(str(self.config.workdir)) / self.name  # type: ignore
+            )
+            await self._init(plan)
+        if self.config.trace:
+            # The trace file is only known after the configurations are loaded
+            start_tracing(Path(self.config.trace).absolute()).add_span(
+                "Pipen._init",
+                init_started,
+                time.time_ns(),
+                pipeline=self.name,
+            )
         logger.setLevel(self.config.loglevel.upper())
         log_rich_renderable(pipen_banner(), "magenta", logger.info)
+        start_mtime_cache()
         try:
             self.build_proc_relationships()
+            self._open_resources(plan)
             self._log_pipeline_info()
+            if plan:
+                with trace_span("Pipen.plan", pipeline=self.name):
+                    await self._plan_procs()
+                return succeeded
+
             logger.info("Initializing plugins ...")
             await plugin.hooks.on_start(self)
-            for proc in self.procs:
-                self.pbar.update_proc_running()
-                proc_obj = proc(self)  # type: ignore
-                if proc in self.starts and proc.input_data is None:
-                    proc_obj.log(
-                        "warning",
-                        "This is a start process, " "but no 'input_data' specified.",
-                    )
-                await proc_obj.init()
-                await proc_obj.run()
-                if proc_obj.succeeded:
-                    self.pbar.update_proc_done()
-                else:
-                    self.pbar.update_proc_error()
-                    succeeded = False
-                    break
-                proc_obj.gc()
+            with trace_span("Pipen.run", pipeline=self.name):
+                with self._handling_signals():
+                    if self.config.max_procs == 1:
+                        succeeded = await self._run_procs_in_order()
+                    else:
+                        succeeded = await self._run_procs_by_dependency()
 
             logger.info("")
         except Exception:
@@ -213,15 +293,337 @@ class Pipen:
         else:
             await plugin.hooks.on_complete(self, succeeded)
         finally:
+            # Initialize again for the next run
+            self._initialized = None
             self.plugin_context.__exit__()
             if self.pbar:
                 self.pbar.done()
+            self._close_resources(succeeded)
+            mtime_cache = stop_mtime_cache()
+            logger.debug(
+                "Mtime cache: %s hits, %s misses",
+                mtime_cache.hits,
+                mtime_cache.misses,
+            )
+            if self.config.trace:
+                stop_tracing()
+
+        return succeeded
+
+    def _open_resources(self, plan: bool) -> None:
+        """Open the resources used across the processes of a run, which are
+        closed by `_close_resources()`
+
+        Args:
+            plan: Whether the run is only planned, where nothing is written
+        """
+        local = not plan and isinstance(self.workdir, Path)
+        if local and self.config.template_cache:
+            set_template_cache(self.workdir / TEMPLATE_CACHE_DIR)
+        if local and self.config.history:
+            self._history = RunHistory(self.workdir / "history.db")
+            self._history.pipeline_started(self)
+        if not plan and self.config.result_cache:
+            self._result_cache = get_result_cache_backend(
+                self.config.result_cache_backend
+            )(str(self.config.result_cache))
+        # The digests of the input files are needed for the result cache
+        if self._result_cache or any(
+            (self.config.cache if proc.cache is None else proc.cache) == "hash"
+            for proc in self.procs
+        ):
+            # Only cached in memory in plan mode
+            self._hash_cache = HashCache(
+                self.workdir / "hash_cache.db" if local else None
+            )
+        if local:
+            self._trash = Trash(self.workdir / TRASH_DIR)
+
+    def _close_resources(self, succeeded: bool) -> None:
+        """Close the resources opened by `_open_resources()`
+
+        Args:
+            succeeded: Whether the run succeeded
+        """
+        if self._history:
+            self._history.pipeline_done(succeeded)
+            self._history.close()
+            self._history = None
+        if self._trash:
+            self._trash.close()
+            self._trash = None
+        if self._hash_cache:
+            self._hash_cache.close()
+            self._hash_cache = None
+        if self._result_cache:
+            self._result_cache.close()
+            self._result_cache = None
+            logger.debug("Result cache: %s hits", self._result_cache_hits)
+        set_template_cache(None)
+
+    @contextmanager
+    def _handling_signals(self) -> Iterator[None]:
+        """Cancel all the running processes on SIGTERM and SIGINT during the
+        run, instead of xqute of each process (see `Proc.init()`)"""
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(
+                sig,
+                functools.partial(self._cancel_running_procs, sig),
+            )
+        try:
+            yield
+        finally:
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                loop.remove_signal_handler(sig)
+
+    def reserve_job_slot(self, proc: Proc) -> bool:
+        """Reserve a slot of `max_jobs` for a job of a process to be queued
+
+        Args:
+            proc: The process
+
+        Returns:
+            False if all the slots are taken or reserved, otherwise True
+        """
+        if self.config.max_jobs and (
+            len(self._active_jobs) + sum(self._reserved_jobs.values())
+            >= self.config.max_jobs
+        ):
+            return False
+
+        self._reserved_jobs[proc.name] = self._reserved_jobs.get(proc.name, 0) + 1
+        return True
+
+    def take_job_slot(self, job: Job) -> None:
+        """Take the slot reserved for a job when it is submitted
+
+        A retried job keeps the slot it has taken.
+
+        Args:
+            job: The job
+        """
+        key = (job.proc.name, job.index)
+        if key in self._active_jobs:
+            return
+
+        reserved = self._reserved_jobs.get(job.proc.name, 0)
+        if reserved > 1:
+            self._reserved_jobs[job.proc.name] = reserved - 1
+        else:
+            self._reserved_jobs.pop(job.proc.name, None)
+        self._active_jobs.add(key)
+
+    def free_job_slot(self, job: Job) -> None:
+        """Free the slot of `max_jobs` taken by a job, if not freed yet
+
+        Args:
+            job: The job
+        """
+        self._active_jobs.discard((job.proc.name, job.index))
+
+    def release_job_slots(self, proc: Proc) -> None:
+        """Release the slots reserved for the jobs of a process that are
+        never submitted, i.e. cancelled while queued
+
+        Args:
+            proc: The process
+        """
+        self._reserved_jobs.pop(proc.name, None)
+
+    async def _plan_procs(self) -> None:
+        """Report which jobs of each process would run and why"""
+        stale_outputs: Set[str] = set()
+        for proc in self.procs:
+            proc_obj = proc(self)  # type: ignore
+            reasons = await proc_obj.plan(stale_outputs)
+            proc_obj.jobs = []
+
+            stale: Dict[str, List[int]] = {}
+            for i, reason in enumerate(reasons):
+                if reason is not None:
+                    # Group the reasons without the details
+                    # i.e. "script file is newer: <mtime> > <ctime>"
+                    stale.setdefault(reason.split(": ", 1)[0], []).append(i)
+
+            n_stale = sum(len(indices) for indices in stale.values())
+            proc_obj.log(
+                "info",
+                "Plan: %s cached, %s to run",
+                len(reasons) - n_stale,
+                n_stale,
+            )
+            # most common reasons first
+            stale_reasons = sorted(stale.items(), key=lambda item: -len(item[1]))
+            for reason, indices in stale_reasons[:PLAN_MAX_REASONS]:
+                proc_obj.log("info", "- %s: [%s]", reason, brief_list(indices))
+            if len(stale_reasons) > PLAN_MAX_REASONS:
+                proc_obj.log(
+                    "info",
+                    "- ... and %s more reasons",
+                    len(stale_reasons) - PLAN_MAX_REASONS,
+                )
+
+    async def _run_proc(
+        self,
+        proc: Type[Proc],
+        initialized: asyncio.Queue | None = None,
+    ) -> bool:
+        """Initialize and run a single process
+
+        Args:
+            proc: The process class
+            initialized: A queue to put the process in once it's initialized
+
+        Returns:
+            True if the process succeeded else False
+        """
+        self.pbar.update_proc_running()
+        proc_obj = proc(self)  # type: ignore
+        if proc in self.starts and proc.input_data is None:
+            proc_obj.log(
+                "warning",
+                "This is a start process, " "but no 'input_data' specified.",
+            )
+        await proc_obj.init()
+        self._running_procs.append(proc_obj)
+        if initialized is not None:
+            initialized.put_nowait(proc)
+        try:
+            await proc_obj.run()
+        finally:
+            self._running_procs.remove(proc_obj)
+
+        if not proc_obj.succeeded:
+            self.pbar.update_proc_error()
+            return False
+
+        self.pbar.update_proc_done()
+        proc_obj.gc()
+        return True
+
+    def _cancel_running_procs(self, sig: signal.Signals) -> None:
+        """Cancel all the running processes with the signal
+
+        Args:
+            sig: The signal
+        """
+        for proc_obj in self._running_procs:
+            proc_obj.xqute.cancel(sig)
+
+    async def _run_procs_in_order(self) -> bool:
+        """Run the processes one by one, in the order of `self.procs`
+
+        Returns:
+            True if all processes succeeded else False
+        """
+        for proc in self.procs:
+            if not await self._run_proc(proc):
+                return False
+        return True
+
+    def _proc_can_stream(self, proc: Type[Proc], initialized: set) -> bool:
+        """Check if a process can be started before its required processes
+        are done
+
+        Args:
+            proc: The process class
+            initialized: The initialized processes
+
+        Returns:
+            True if the process is streaming, the required processes are all
+            initialized and have the same number of jobs.
+        """
+        streaming = (
+            self.config.streaming if proc.streaming is None else proc.streaming
+        )
+        if not streaming or not proc.requires or callable(proc.input_data):
+            return False
+
+        if not all(req in initialized for req in proc.requires):
+            return False
+
+        return len({len(req.output_data) for req in proc.requires}) == 1
+
+    async def _run_procs_by_dependency(self) -> bool:
+        """Run the processes as soon as their required processes are done
+
+        At most `max_procs` processes are running at the same time. Once a
+        process fails, no new processes are started, but the running ones
+        are allowed to finish.
+
+        Streaming processes are started once their required processes are
+        initialized, and their jobs are submitted once the corresponding
+        jobs of the required processes are done.
+
+        Returns:
+            True if all processes succeeded else False
+        """
+        max_procs = self.config.max_procs
+        in_pipeline = set(self.procs)
+        pending = list(self.procs)
+        done = set()
+        initialized = set()
+        initialized_queue: asyncio.Queue = asyncio.Queue()
+        initialized_getter: asyncio.Future | None = None
+        running: Dict[asyncio.Future, Type[Proc]] = {}
+        succeeded = True
+
+        try:
+            while True:
+                for proc in pending[:] if succeeded else ():
+                    if max_procs and len(running) >= max_procs:
+                        break
+
+                    if all(
+                        req in done
+                        for req in proc.requires or ()
+                        if req in in_pipeline
+                    ) or self._proc_can_stream(proc, initialized):
+                        pending.remove(proc)
+                        task = asyncio.ensure_future(
+                            self._run_proc(proc, initialized_queue)
+                        )
+                        running[task] = proc
+
+                if not running:
+                    break
+
+                if initialized_getter is None:
+                    initialized_getter = asyncio.ensure_future(
+                        initialized_queue.get()
+                    )
+
+                finished, _ = await asyncio.wait(
+                    [*running, initialized_getter],
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if initialized_getter in finished:
+                    initialized.add(initialized_getter.result())
+                    initialized_getter = None
+
+                for task in finished:
+                    if task not in running:
+                        continue
+                    proc = running.pop(task)
+                    if task.result():
+                        done.add(proc)
+                    else:
+                        succeeded = False
+        except BaseException:
+            for task in running:
+                task.cancel()
+            raise
+        finally:
+            if initialized_getter is not None:
+                initialized_getter.cancel()
 
         return succeeded
 
     def run(
         self,
         profile: str = "default",
+        plan: bool = False,
     ) -> bool:
         """Run the pipeline with the given profile
         This is just a sync wrapper for the async `async_run` function using
@@ -229,11 +631,13 @@ class Pipen:
 
         Args:
             profile: The default profile to use for the run
+            plan: Only report which jobs would run and why, without running
+                them.
 
         Returns:
             True if the pipeline ends successfully else False
         """
-        return asyncio.run(self.async_run(profile))
+        return asyncio.run(self.async_run(profile, plan=plan))
 
     def set_data(self, *indata: Any) -> Pipen:
         """Set the input_data for start processes
@@ -324,7 +728,7 @@ class Pipen:
                 version=(f"v{plg.version}" if plg.version else ""),
             )
             for name, plg in plugin.get_enabled_plugins().items()
-            if name != "core"
+            if name not in ("core", HOOK_TRACER_FIRST, HOOK_TRACER_LAST)
         )
         for i, plug in enumerate(enabled_plugins):
             logger.info(fmt, "plugins" if i == 0 else "", plug)
@@ -335,12 +739,17 @@ class Pipen:
         logger.info(fmt, "dirsig", self.config.dirsig)
         logger.info(fmt, "error_strategy", self.config.error_strategy)
         logger.info(fmt, "forks", self.config.forks)
+        logger.info(fmt, "history", self.config.history)
         logger.info(fmt, "lang", self.config.lang)
         logger.info(fmt, "loglevel", self.config.loglevel)
+        logger.info(fmt, "max_jobs", self.config.max_jobs)
+        logger.info(fmt, "max_procs", self.config.max_procs)
         logger.info(fmt, "num_retries", self.config.num_retries)
         logger.info(fmt, "scheduler", self.config.scheduler)
+        logger.info(fmt, "streaming", self.config.streaming)
         logger.info(fmt, "submission_batch", self.config.submission_batch)
         logger.info(fmt, "template", self.config.template)
+        logger.info(fmt, "trace", self.config.trace)
         logger.info(fmt, "workdir", self.workdir)
         for i, (key, val) in enumerate(self.config.plugin_opts.items()):
             logger.info(fmt, "plugin_opts" if i == 0 else "", f"{key}={val}")
@@ -349,7 +758,7 @@ class Pipen:
         for i, (key, val) in enumerate(self.config.template_opts.items()):
             logger.info(fmt, "template_opts" if i == 0 else "", f"{key}={val}")
 
-    async def _init(self) -> None:
+    async def _init(self, plan: bool = False) -> None:
         """Compute the configurations for the pipeline based on the priorities
 
         Configurations (priority from low to high)
@@ -359,6 +768,10 @@ class Pipen:
         3. Configuration files
         4. **kwargs from Pipen(..., **kwargs)
         5. Those defined in each Proc class
+
+        Args:
+            plan: Whether the pipeline is initialized to plan the run,
+                where the workdir is not created
         """
         # Then load the configurations from config files
         config = ProfileConfig.load(
@@ -390,10 +803,18 @@ class Pipen:
                 "workdir and outdir should be both cloud paths or local paths."
             )
 
-        self.workdir.mkdir(parents=True, exist_ok=True)
+        if not plan:
+            self.workdir.mkdir(parents=True, exist_ok=True)
+        self._initialized = self.profile
 
+    @traced("Pipen.build_proc_relationships")
     def build_proc_relationships(self) -> None:
-        """Build the proc relationships for the pipeline"""
+        """Build the proc relationships for the pipeline
+
+        The start processes go first, and then the processes are added once
+        all their required processes are added. When multiple processes are
+        available, the one with smaller `(order, name)` goes first.
+        """
         if self.procs:
             return
 
@@ -406,40 +827,69 @@ class Pipen:
         # build proc relationships
         # Allow starts to be set as a tuple
         self.procs = list(self.starts)
-        nexts = set(sum((proc.nexts or [] for proc in self.procs), []))  # type: ignore
+        added = set(self.procs)
+        added_names = {proc.name for proc in self.procs}
+        # The processes with all their requires added, as a heap
+        available: List[Tuple[int, str, int, Type[Proc]]] = []
+        # The number of requires not yet added for the rest of the nexts
+        n_waiting: Dict[Type[Proc], int] = {}
+        counter = count()
+
+        def add_next(proc: Type[Proc]) -> None:
+            if proc in added:
+                raise ProcDependencyError(f"Cyclic dependency: {proc.name}")
+
+            if proc.name in added_names:
+                raise PipenOrProcNameError(
+                    f"'{proc.name}' is already used by another process."
+                )
+
+            if proc in n_waiting:
+                return
+
+            n_waiting[proc] = len(set(proc.requires or ()) - added)
+            if n_waiting[proc] == 0:
+                heappush(
+                    available,
+                    (proc.order or 0, proc.name, next(counter), proc),
+                )
+
         logger.debug("")
         logger.debug("Building process relationships:")
         logger.debug("- Start processes: %s", self.procs)
-        while nexts:
-            logger.debug("- Next processes: %s", nexts)
-            # pick up one that can be added to procs
-            for proc in sorted(nexts, key=lambda prc: (prc.order or 0, prc.name)):
-                if proc in self.procs:
-                    raise ProcDependencyError(f"Cyclic dependency: {proc.name}")
-
-                if proc.name in [p.name for p in self.procs]:
-                    raise PipenOrProcNameError(
-                        f"'{proc.name}' is already used by another process."
-                    )
+        for proc in self.procs:
+            for nxt in proc.nexts or ():
+                add_next(nxt)
+
+        while available:
+            proc = heappop(available)[-1]
+            if proc.name in added_names:
+                raise PipenOrProcNameError(
+                    f"'{proc.name}' is already used by another process."
+                )
 
-                # Add proc to self.procs if all their requires
-                # are added to self.procs
-                # Then remove proc from nexts
-                # If there are still procs in nexts
-                # meaning some requires of those procs cannot run before
-                # those procs.
-                if not set(proc.requires) - set(self.procs):  # type: ignore
-                    self.procs.append(proc)  # type: ignore
-                    nexts.remove(proc)
-                    nexts |= set(proc.nexts or ())
-                    break
-            else:
-                if nexts:
-                    raise ProcDependencyError(
-                        f"No available next processes for {nexts}. "
-                        "Did you forget to start with their "
-                        "required processes?"
-                    )
+            logger.debug("- Adding process: %s", proc)
+            del n_waiting[proc]
+            self.procs.append(proc)
+            added.add(proc)
+            added_names.add(proc.name)
+            for nxt in dict.fromkeys(proc.nexts or ()):
+                if nxt not in n_waiting:
+                    add_next(nxt)
+                elif proc in nxt.requires:
+                    n_waiting[nxt] -= 1
+                    if n_waiting[nxt] == 0:
+                        heappush(
+                            available,
+                            (nxt.order or 0, nxt.name, next(counter), nxt),
+                        )
+
+        if n_waiting:
+            raise ProcDependencyError(
+                f"No available next processes for {set(n_waiting)}. "
+                "Did you forget to start with their "
+                "required processes?"
+            )
 
         self.pbar = PipelinePBar(len(self.procs), self.name.upper())
 
@@ -7,7 +7,7 @@ from typing import Any, Dict, TYPE_CHECKING
 from simplug import Simplug, SimplugResult
 from xqute import JobStatus, Scheduler
 
-from .defaults import ProcOutputType
+from ._tracing import HOOK_TRACER_FIRST, hook_tracer
 
 
 if TYPE_CHECKING:  # pragma: no cover
@@ -350,15 +350,37 @@ class PipenMainPlugin:
                 sig.name,
             )
 
+    @plugin.impl
+    async def on_proc_start(self, proc: Proc):
+        """Record the start of the process"""
+        if proc.pipeline._history:
+            proc.pipeline._history.proc_started(proc)
+
+    @plugin.impl
+    async def on_proc_done(self, proc: Proc, succeeded: bool | str):
+        """Record the end of the process"""
+        if proc.pipeline._history:
+            proc.pipeline._history.proc_done(proc, succeeded)
+
+    @plugin.impl
+    async def on_job_queued(self, job: Job):
+        """Record the queue time of a job"""
+        if job.proc.pipeline._history:
+            job.proc.pipeline._history.job_queued(job)
+
     @plugin.impl
     async def on_job_submitted(self, job: Job):
         """Update the progress bar when a job is submitted"""
         job.proc.pbar.update_job_submitted()
+        if job.proc.pipeline._history:
+            job.proc.pipeline._history.job_submitted(job)
 
     @plugin.impl
     async def on_job_started(self, job: Job):
         """Update the progress bar when a job starts to run"""
         job.proc.pbar.update_job_running()
+        if job.proc.pipeline._history:
+            job.proc.pipeline._history.job_started(job)
 
     @plugin.impl
     async def on_job_cached(self, job: Job):
@@ -367,48 +389,54 @@ class PipenMainPlugin:
         job.proc.pbar.update_job_running()
         job.proc.pbar.update_job_succeeded()
         job.status = JobStatus.FINISHED
+        job.proc._set_job_done(job, True)
+        if job.proc.pipeline._history:
+            job.proc.pipeline._history.job_cached(job)
 
     @plugin.impl
     async def on_job_succeeded(self, job: Job):
-        """Cache the job and update the progress bar when a job is succeeded"""
-        # now the returncode is 0, however, we need to check if output files
-        # have been created or not, this makes sure job.cache not fail
-        for outkey, outtype in job._output_types.items():
-            if outtype == ProcOutputType.VAR:
-                continue
-
-            path = job.output[outkey].spec
-            output_exists = path.exists()
-            if outtype == ProcOutputType.DIR:
-                output_exists = len(list(path.iterdir())) > 0
-
-            if not output_exists:
-                job.status = JobStatus.FAILED
-                job.proc.pbar.update_job_failed()
-                stderr = job.stderr_file.read_text()
-                stderr = f"{stderr}\n\nOutput {outtype} {outkey!r} is not generated."
-                job.stderr_file.write_text(stderr)
-                break
-        else:
-            await job.cache()
-            job.proc.pbar.update_job_succeeded()
+        """Check the outputs, cache the job and update the progress bar when
+        a job is succeeded
+
+        xqute calls the hook for one job at a time, so the outputs are
+        checked in the background, together with those of the other jobs
+        finished around the same time (see `Proc._check_job_outputs()`).
+        """
+        job.proc.pipeline.free_job_slot(job)
+        job.proc._check_job_outputs(job)
 
     @plugin.impl
     async def on_job_failed(self, job: Job):
         """Update the progress bar when a job is failed"""
         job.proc.pbar.update_job_failed()
-        if job.status == JobStatus.RETRYING:
+        retrying = job.status == JobStatus.RETRYING
+        if retrying:
             job.log("debug", "Retrying #%s", job.trial_count + 1)
             job.proc.pbar.update_job_retrying()
+        else:
+            # Kept while retrying
+            job.proc.pipeline.free_job_slot(job)
+            job.proc._set_job_done(job, False)
+
+        if job.proc.pipeline._history:
+            job.proc.pipeline._history.job_done(
+                job,
+                "retrying" if retrying else "failed",
+            )
 
     @plugin.impl
     async def on_job_killed(self, job: Job):
         """Update the status of a killed job"""
+        job.proc.pipeline.free_job_slot(job)  # pragma: no cover
         # instead of FINISHED to force the whole pipeline to quit
         job.status = JobStatus.FAILED  # pragma: no cover
 
 
 plugin.register(PipenMainPlugin)
+# Registered before the hooks are called the first time, so that it is
+# sorted before the other plugins, and enabled when tracing starts
+plugin.register(hook_tracer(last=False))
+plugin.get_plugin(HOOK_TRACER_FIRST).disable()
 
 xqute_plugin = Simplug("xqute")
 
@@ -466,11 +494,13 @@ class XqutePipenPlugin:
     @xqute_plugin.impl
     async def on_job_succeeded(self, scheduler: Scheduler, job: Job):
         """When a job is succeeded"""
+        job._invalidate_mtimes()
         await plugin.hooks.on_job_succeeded(job)
 
     @xqute_plugin.impl
     async def on_job_failed(self, scheduler: Scheduler, job: Job):
         """When a job is failed"""
+        job._invalidate_mtimes()
         await plugin.hooks.on_job_failed(job)
 
     @xqute_plugin.impl
@@ -3,18 +3,24 @@
 from __future__ import annotations
 
 import asyncio
+import hashlib
 import inspect
+import json
 import logging
+import os
 from abc import ABC, ABCMeta
+from concurrent.futures import ThreadPoolExecutor
 from functools import cached_property
 from os import PathLike
 from pathlib import Path
 from typing import (
     Any,
     Dict,
+    Iterator,
     List,
     Mapping,
     Sequence,
+    Set,
     Type,
     TYPE_CHECKING,
 )
@@ -23,10 +29,18 @@ from diot import Diot
 from rich import box
 from rich.panel import Panel
 from varname import VarnameException, varname
-from yunpath import AnyPath
+from yunpath import AnyPath, CloudPath
 from xqute import JobStatus, Xqute
-
-from .defaults import ProcInputType
+from xqute.path import DualPath, MountedPath
+
+from ._signature_store import SignatureStore
+from ._tracing import traced
+from .defaults import (
+    OUTPUT_CHECK_WORKERS,
+    SIGNATURE_STORE_FILE,
+    ProcInputType,
+    ProcOutputType,
+)
 from .exceptions import (
     ProcInputKeyError,
     ProcInputTypeError,
@@ -51,13 +65,22 @@ from .utils import (
     update_dict,
     get_shebang,
     get_base,
+    get_mtime,
+    list_cloud_paths,
+    path_exists,
 )
+from .version import __version__
 
 if TYPE_CHECKING:  # pragma: no cover
+    from .job import Job
     from .pipen import Pipen
     from .scheduler import Scheduler
 
 
+def _no_signal_handler(sig: int, callback: Any, *args: Any) -> None:
+    """Not to register a signal handler, see `Proc.init()`"""
+
+
 class ProcMeta(ABCMeta):
     """Meta class for Proc"""
 
@@ -109,6 +132,8 @@ class Proc(ABC, metaclass=ProcMeta):
             across jobs.
         envs_depth: How deep to update the envs when subclassed.
         cache: Should we detect whether the jobs are cached?
+            Use `"hash"` to also compare the content digests of the files
+            when their mtimes are newer.
         dirsig: When checking the signature for caching, whether should we walk
             through the content of the directory? This is sometimes
             time-consuming if the directory is big.
@@ -148,6 +173,11 @@ class Proc(ABC, metaclass=ProcMeta):
         scheduler_opts: The options for the scheduler
         script: The script template for the process
         submission_batch: How many jobs to be submited simultaneously
+        streaming: Whether to submit a job as soon as the jobs with the same
+            index of the required processes are done, instead of waiting for
+            the required processes to finish. Only works when `max_procs` of
+            the pipeline is not 1, `input_data` is not a callback and the
+            required processes have the same number of jobs.
 
         nexts: Computed from `requires` to build the process relationships
         output_data: The output data (to pass to the next processes)
@@ -176,6 +206,7 @@ class Proc(ABC, metaclass=ProcMeta):
     scheduler_opts: Mapping[str, Any] = None
     script: str = None
     submission_batch: int = None
+    streaming: bool = None
 
     nexts: Sequence[Type[Proc]] = None
     output_data: Any = None
@@ -321,6 +352,7 @@ class Proc(ABC, metaclass=ProcMeta):
         )
         cls.__meta__ = {"procgroup": None}
 
+    @traced("Proc.__init__", lambda self, *_: {"proc": self.name})
     def __init__(self, pipeline: Pipen = None) -> None:
         """Constructor
 
@@ -335,6 +367,18 @@ class Proc(ABC, metaclass=ProcMeta):
         self.pbar = None
         self.jobs: List[Any] = []
         self.xqute = None
+        # Resolved when the jobs are done, with True for succeeded/cached
+        # and False for failed, so that streaming processes can proceed
+        self._job_done_futs: List[asyncio.Future] = []
+        # Checking the outputs of the finished jobs, see _check_job_outputs()
+        self._output_checks: List[asyncio.Task] = []
+        self._output_check_semaphore: asyncio.Semaphore | None = None
+        # The signature store of the jobs, with `signature_store` enabled
+        self._signatures: SignatureStore | None = None
+        # The input of the jobs, computed from the input data at once
+        self._input_records: List[Dict[str, Any]] = []
+        # The thread pool to prepare the jobs, when the jobs are initialized
+        self._prepare_executor: ThreadPoolExecutor | None = None
         self.__class__.workdir = (
             AnyPath(self.pipeline.workdir) / self.name  # type: ignore
         )
@@ -375,22 +419,57 @@ class Proc(ABC, metaclass=ProcMeta):
         )
         # script
         self.script = self._compute_script()  # type: ignore
-        self.workdir.mkdir(exist_ok=True)
 
         if self.submission_batch is None:
             self.submission_batch = self.pipeline.config.submission_batch
 
+        if self.streaming is None:
+            self.streaming = self.pipeline.config.streaming
+
+    @traced("Proc.init", lambda self: {"proc": self.name})
     async def init(self) -> None:
         """Init all other properties and jobs"""
         import pandas
 
+        self.workdir.mkdir(exist_ok=True)
+        # xqute registers the signal handlers to cancel itself, replacing the
+        # ones registered by the pipeline to cancel all the running processes
+        # (see `Pipen._handling_signals()`), which are kept instead
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler = _no_signal_handler  # type: ignore
+        try:
+            self.xqute = Xqute(
+                self.scheduler,
+                # The plugins are enabled once for the pipeline (see
+                # `Pipen.__init__()`). A plugins context of each process would
+                # restore the plugins when the process is done, under the
+                # other processes that are still running (`max_procs` is not 1)
+                plugins=None,
+                submission_batch=self.submission_batch,
+                **self._scheduler_args(),
+            )
+        finally:
+            del loop.add_signal_handler  # type: ignore
+        self.xqute.scheduler.post_init(self)
+        # for the plugin hooks to access
+        self.xqute.proc = self
+
+        await plugin.hooks.on_proc_init(self)
+        self._open_signature_store()
+        self._input_records = self._compute_input_records()
+        await self._init_jobs()
+        self.__class__.output_data = pandas.DataFrame((job.output for job in self.jobs))
+
+    def _scheduler_args(self) -> Dict[str, Any]:
+        """Get the arguments to create the scheduler by Xqute
+
+        Returns:
+            The arguments, with the scheduler options as `scheduler_opts`
+        """
         scheduler_opts = copy_dict(self.pipeline.config.scheduler_opts, 2) or {}
         scheduler_opts.update(self.scheduler_opts or {})
-
-        self.xqute = Xqute(
-            self.scheduler,
+        return dict(
             workdir=self.workdir,
-            submission_batch=self.submission_batch,
             error_strategy=self.error_strategy or self.pipeline.config.error_strategy,
             num_retries=(
                 self.pipeline.config.num_retries
@@ -401,13 +480,56 @@ class Proc(ABC, metaclass=ProcMeta):
             jobname_prefix=self.name,
             scheduler_opts=scheduler_opts,
         )
-        self.xqute.scheduler.post_init(self)
-        # for the plugin hooks to access
-        self.xqute.proc = self
 
-        await plugin.hooks.on_proc_init(self)
-        await self._init_jobs()
+    @traced("Proc.plan", lambda self, *_: {"proc": self.name})
+    async def plan(self, stale_outputs: Set[str]) -> List[str | None]:
+        """Check which jobs would run, without running them
+
+        The input and output of the jobs are computed, and the caching is
+        checked, but the scripts are not written, the outputs are not cleared
+        and nothing is submitted. The checks are done in threads.
+
+        Args:
+            stale_outputs: The output files/directories of the jobs (of the
+                required processes) that would run. The jobs using any of them
+                as input would run, too. The output files/directories of the
+                jobs of this process that would run are added to it.
+
+        Returns:
+            The reasons why the jobs would run, None for the cached jobs
+        """
+        import pandas
+
+        args = self._scheduler_args()
+        scheduler_opts = args.pop("scheduler_opts")
+        # Xqute is not used, since it starts the producer and consumers
+        scheduler = self.scheduler(**args, **scheduler_opts)
+        scheduler.post_init(self)
+        self._open_signature_store(readonly=True)
+        self._input_records = self._compute_input_records()
+        self.jobs = [
+            scheduler.job_class(i, "", scheduler.workdir, planning=True)
+            for i in range(self.input.data.shape[0])
+        ]
+
+        loop = asyncio.get_running_loop()
+        with ThreadPoolExecutor(max_workers=self._prepare_workers()) as executor:
+            reasons = await asyncio.gather(
+                *(
+                    loop.run_in_executor(executor, job.plan, self, stale_outputs)
+                    for job in self.jobs
+                )
+            )
+
         self.__class__.output_data = pandas.DataFrame((job.output for job in self.jobs))
+        for job, reason in zip(self.jobs, reasons):
+            if reason is None:
+                continue
+            for outkey, outtype in job._output_types.items():
+                if outtype != ProcOutputType.VAR:
+                    stale_outputs.add(str(job.output[outkey].spec))
+
+        return reasons
 
     def gc(self):
         """GC process for the process to save memory after it's done"""
@@ -419,6 +541,7 @@ class Proc(ABC, metaclass=ProcMeta):
 
         del self.jobs[:]
         self.jobs = []
+        self._input_records = []
 
         del self.pbar
         self.pbar = None
@@ -448,6 +571,7 @@ class Proc(ABC, metaclass=ProcMeta):
             msg,
         )
 
+    @traced("Proc.run", lambda self: {"proc": self.name})
     async def run(self) -> None:
         """Run the process"""
         # init pbar
@@ -456,16 +580,47 @@ class Proc(ABC, metaclass=ProcMeta):
         await plugin.hooks.on_proc_start(self)
 
         cached_jobs = []
-        for job in self.jobs:
-            if await job.cached:
+        upstream_futs = self._upstream_job_futures()
+        if any(len(futs) != self.size for futs in upstream_futs):
+            # Not row-aligned, wait for the required processes to finish
+            await asyncio.gather(*(fut for futs in upstream_futs for fut in futs))
+            upstream_futs = []
+
+        fingerprint = None
+        all_cached = False
+        if not upstream_futs:
+            # Lists/stats all the input/output files, not on the event loop
+            fingerprint, all_cached = await asyncio.get_running_loop(
+            ).run_in_executor(None, self._check_fingerprint)
+        if all_cached:
+            self.log("debug", "Process fingerprint matched, skip checking jobs")
+        else:
+            # Any job may be rerun, the saved fingerprint is no longer valid
+            self.fingerprint_file.unlink(missing_ok=True)
+
+        if all_cached:
+            for job in self.jobs:
                 cached_jobs.append(job.index)
                 await plugin.hooks.on_job_cached(job)
-            else:
-                await self.xqute.put(job)
+        else:
+            await self._feed_jobs(upstream_futs, cached_jobs)
         if cached_jobs:
-            self.log("info", "Cached jobs: [%s]", brief_list(cached_jobs))
-        await self.xqute.run_until_complete()
+            self.log("info", "Cached jobs: [%s]", brief_list(sorted(cached_jobs)))
+        try:
+            await self.xqute.run_until_complete()
+        finally:
+            self.pipeline.release_job_slots(self)
+        await asyncio.gather(*self._output_checks)
+        # Jobs that are not marked as done (i.e. outputs not generated),
+        # or never submitted (i.e. cancelled)
+        for fut in self._job_done_futs:
+            if not fut.done():
+                fut.set_result(False)
         self.pbar.done()
+        if self._signatures is not None:
+            self._signatures.flush()
+        if not all_cached:
+            self._save_fingerprint(fingerprint)
         await plugin.hooks.on_proc_done(
             self,
             (
@@ -475,6 +630,162 @@ class Proc(ABC, metaclass=ProcMeta):
             ),
         )
 
+    def _set_job_done(self, job: Any, succeeded: bool) -> None:
+        """Mark a job as done, so that the streaming processes can proceed,
+        and remove it from the jobs polled by xqute
+
+        Args:
+            job: The job
+            succeeded: Whether the job succeeded (or is cached)
+        """
+        job._release()
+        if job in self.xqute.jobs:
+            # Not to poll it any more
+            self.xqute.jobs.remove(job)
+        fut = self._job_done_futs[job.index]
+        if not fut.done():
+            fut.set_result(succeeded)
+
+    def _check_job_outputs(self, job: Job) -> None:
+        """Check the outputs of a finished job in the background, then cache
+        it, or mark it as failed if any output is not generated
+
+        The outputs of up to `OUTPUT_CHECK_WORKERS` jobs are checked at the
+        same time, in the threads of the default executor.
+
+        Args:
+            job: The job
+        """
+        self._output_checks.append(asyncio.create_task(self._finish_job(job)))
+
+    async def _finish_job(self, job: Job) -> None:
+        """Check the outputs of a finished job and cache it, see
+        `_check_job_outputs()`
+
+        Args:
+            job: The job
+        """
+        try:
+            async with self._output_check_semaphore:
+                missing, manifest = await asyncio.get_running_loop(
+                ).run_in_executor(None, job._check_outputs)
+            if missing is None:
+                await job.cache(manifest)
+                await job._save_result()
+        except Exception as exc:
+            # Only fail this job, not the other jobs and the pipeline
+            missing = f"Failed to check the outputs: {exc!r}"
+
+        if missing is not None:
+            job.status = JobStatus.FAILED
+            self.pbar.update_job_failed()
+            # The job may have exited before writing anything
+            stderr = job.stderr_file.read_text() if job.stderr_file.is_file() else ""
+            job.stderr_file.write_text(f"{stderr}\n\n{missing}")
+            self._set_job_done(job, False)
+        else:
+            self.pbar.update_job_succeeded()
+            self._set_job_done(job, True)
+
+        if self.pipeline._history:
+            self.pipeline._history.job_done(
+                job,
+                "failed" if missing is not None else "succeeded",
+            )
+
+    def _upstream_job_futures(self) -> List[List[asyncio.Future]]:
+        """Get the job-done futures of the required processes that are
+        still running
+
+        Returns:
+            A list of future lists, one for each running required process.
+            Empty when this process is not streaming or all required
+            processes are done.
+        """
+        if not self.streaming:
+            return []
+
+        upstream_futs = []
+        for req in self.requires or ():
+            req_obj = ProcMeta._INSTANCES.get(req)
+            if req_obj is None or all(
+                fut.done() for fut in req_obj._job_done_futs
+            ):
+                continue
+            upstream_futs.append(req_obj._job_done_futs)
+
+        return upstream_futs
+
+    async def _feed_job(
+        self,
+        job: Job,
+        upstream_futs: List[List[asyncio.Future]],
+        cached_jobs: List[int],
+    ) -> None:
+        """Check the caching of a job and put it to xqute if not cached, see
+        `_feed_jobs()`
+
+        Args:
+            job: The job
+            upstream_futs: The job-done futures of the required processes
+                to wait for, empty if not streaming
+            cached_jobs: The list to collect the indices of cached jobs
+        """
+        upstream_done = not upstream_futs or all(
+            await asyncio.gather(*(futs[job.index] for futs in upstream_futs))
+        )
+        if not upstream_done:
+            job.log("debug", "Not submitted (required job failed)")
+            job.status = JobStatus.FAILED
+            # Reported as the other failed jobs
+            await plugin.hooks.on_job_failed(job)
+        elif await job.cached:
+            cached_jobs.append(job.index)
+            await plugin.hooks.on_job_cached(job)
+        else:
+            await self.xqute.put(job)
+
+    async def _feed_jobs(
+        self,
+        upstream_futs: List[List[asyncio.Future]],
+        cached_jobs: List[int],
+    ) -> None:
+        """Check the caching of the jobs concurrently, and report the cached
+        jobs or put the others to xqute as the results arrive
+
+        For a streaming process, a job is checked as soon as the
+        corresponding jobs of the required processes are done.
+
+        Args:
+            upstream_futs: The job-done futures of the required processes
+                to wait for, empty if not streaming
+            cached_jobs: The list to collect the indices of cached jobs
+        """
+        feeding = asyncio.ensure_future(
+            asyncio.gather(
+                *(
+                    self._feed_job(job, upstream_futs, cached_jobs)
+                    for job in self.jobs
+                )
+            )
+        )
+        while not feeding.done():
+            await asyncio.wait([feeding], timeout=1.0)
+            if feeding.done():
+                break
+            if self.xqute.task.done():
+                # Cancelled, i.e. halted, no more jobs to run
+                feeding.cancel()
+                await asyncio.wait([feeding])
+                return
+            # xqute only polls the jobs when it has jobs to submit, or once
+            # it's done feeding, so we need to poll the jobs here to have the
+            # finished jobs reported, which the downstream processes wait
+            # for. The polling is serialized with xqute's (see
+            # `SchedulerPostInit`).
+            await self.xqute.scheduler.polling_jobs(self.xqute.jobs, "all_done")
+        await feeding
+
     # properties
     @cached_property
     def size(self) -> int:
@@ -486,7 +797,165 @@ class Proc(ABC, metaclass=ProcMeta):
         """Check if the process is succeeded (all jobs succeeded)"""
         return all(job.status == JobStatus.FINISHED for job in self.jobs)
 
+    @property
+    def fingerprint_file(self) -> Path:
+        """The file to save the fingerprint of the process"""
+        return self.workdir / "proc.fingerprint.json"
+
     # Private methods
+    def _open_signature_store(self, readonly: bool = False) -> None:
+        """Open the signature store of the jobs if `signature_store` is
+        enabled, reading all the recorded signatures
+
+        Args:
+            readonly: Not to compact the log when opening it (i.e. in plan mode)
+        """
+        self._signatures = (
+            SignatureStore(self.workdir / SIGNATURE_STORE_FILE, readonly=readonly)
+            if self.pipeline.config.signature_store
+            else None
+        )
+
+    def _fingerprint_paths(self) -> tuple[List[Any], List[Any], List[Any]]:
+        """Get the paths of all jobs to check against the fingerprint
+
+        Returns:
+            The input files/dirs, the output files/dirs and the script files
+            of the jobs
+        """
+        inputs, outputs, scripts = [], [], []
+        for job in self.jobs:
+            scripts.append(job.script_file)
+            for inkey, intype in self.input.type.items():
+                value = job.input[inkey]
+                if value is None or intype == ProcInputType.VAR:
+                    continue
+                if intype in (ProcInputType.FILE, ProcInputType.DIR):
+                    value = [value]
+                inputs.extend(path.spec for path in value)
+
+            for outkey, outtype in job._output_types.items():
+                if outtype in (ProcOutputType.FILE, ProcOutputType.DIR):
+                    outputs.append(job.output[outkey].spec)
+
+        return inputs, outputs, scripts
+
+    def _compute_fingerprint(self) -> str:
+        """Compute the fingerprint of the process from the input and output
+        of the jobs, the rendered scripts, the language and the envs
+
+        Returns:
+            The fingerprint
+        """
+        hasher = hashlib.sha256()
+
+        def _update(obj: Any) -> None:
+            hasher.update(json.dumps(obj, default=str, sort_keys=True).encode())
+            hasher.update(b"\0")
+
+        _update([__version__, self.lang, self.input.type, self.envs])
+        for job in self.jobs:
+            _update(
+                [
+                    {
+                        key: getattr(val, "spec", val)
+                        if not isinstance(val, list)
+                        else [getattr(v, "spec", v) for v in val]
+                        for key, val in job.input.items()
+                    },
+                    job._output_types,
+                    {
+                        key: getattr(val, "spec", val)
+                        for key, val in job.output.items()
+                    },
+                    job._script_digest,
+                ]
+            )
+        return hasher.hexdigest()
+
+    def _check_fingerprint(self) -> tuple[str, bool]:
+        """Compute the fingerprint of the process and check if all jobs are
+        cached by it
+
+        Returns:
+            The fingerprint and whether all jobs are cached
+        """
+        # List the cloud prefixes of the input/output files at once
+        inputs, outputs, _ = self._fingerprint_paths()
+        dirsig = self.pipeline.config.dirsig if self.dirsig is None else self.dirsig
+        nobjs = list_cloud_paths((*inputs, *outputs), dirsig)
+        if nobjs:
+            self.log("debug", "Listed %s cloud objects for caching", nobjs)
+
+        fingerprint = self._compute_fingerprint()
+        return fingerprint, self._fingerprint_cached(fingerprint)
+
+    def _fingerprint_cached(self, fingerprint: str) -> bool:
+        """Check if all jobs are cached by the fingerprint of the process
+
+        The fingerprint should match the saved one, all the output files
+        and the signature files should exist, and none of the input files
+        and the script files should be newer than the saved fingerprint.
+        Only used with `cache=True`, since the outputs are not checked
+        against their content digests here, which `cache="hash"` requires.
+
+        Args:
+            fingerprint: The fingerprint computed for this run
+
+        Returns:
+            True if all jobs are cached, otherwise False
+        """
+        cache = self.pipeline.config.cache if self.cache is None else self.cache
+        if cache is not True:
+            return False
+
+        try:
+            saved = json.loads(self.fingerprint_file.read_text())
+        except Exception:
+            return False
+
+        if saved.get("fingerprint") != fingerprint:
+            return False
+
+        dirsig = self.pipeline.config.dirsig if self.dirsig is None else self.dirsig
+        inputs, outputs, scripts = self._fingerprint_paths()
+        if not all(job._has_signature() for job in self.jobs) or not all(
+            path_exists(path) for path in outputs
+        ):
+            return False
+
+        ctime = saved["ctime"] + 1e-3
+        return all(get_mtime(path, 0) <= ctime for path in scripts) and all(
+            get_mtime(path, dirsig) <= ctime for path in inputs
+        )
+
+    def _save_fingerprint(self, fingerprint: str | None) -> None:
+        """Save the fingerprint of the process if it succeeded,
+        otherwise remove the saved one
+
+        Args:
+            fingerprint: The fingerprint computed for this run, None to
+                compute it now (i.e. for a streaming process)
+        """
+        if not self.succeeded:
+            self.fingerprint_file.unlink(missing_ok=True)
+            return
+
+        if fingerprint is None:
+            fingerprint = self._compute_fingerprint()
+
+        # The earliest ctime of the job signatures, recorded when they are
+        # checked or written, so that an input changed after any of the jobs
+        # finished is detected
+        ctimes = [job._signature_ctime for job in self.jobs]
+        if None in ctimes:
+            self.fingerprint_file.unlink(missing_ok=True)
+            return
+
+        self.fingerprint_file.write_text(
+            json.dumps({"fingerprint": fingerprint, "ctime": min(ctimes, default=0.0)})
+        )
+
     @classmethod
     def _compute_requires(
         cls,
@@ -521,28 +990,205 @@ class Proc(ABC, metaclass=ProcMeta):
 
         return requires  # type: ignore
 
-    async def _init_job(self, worker_id: int) -> None:
+    def _prepare_workers(self) -> int:
+        """Get the number of threads to prepare the jobs
+
+        Returns:
+            The `prepare_workers` of the pipeline, or the default of the
+            thread pool if it is 0
+        """
+        return self.pipeline.config.prepare_workers or min(
+            32,
+            (os.cpu_count() or 1) + 4,
+        )
+
+    async def _init_job(self, jobs: Iterator[Job]) -> None:
         """A worker to initialize jobs
 
         Args:
-            worker_id: The worker id
+            jobs: The jobs to initialize, shared by the workers
         """
-        for job in self.jobs:
-            if job.index % self.submission_batch != worker_id:
-                continue
+        for job in jobs:
             await job.prepare(self)
 
+    @traced("Proc._init_jobs", lambda self: {"proc": self.name})
     async def _init_jobs(self) -> None:
         """Initialize all jobs
 
-        Args:
-            config: The pipeline configuration
+        The jobs are prepared (rendering the scripts, writing the script
+        files and creating the output directories) in a thread pool with
+        `prepare_workers` threads.
+
+        All jobs are created and prepared up front, rather than in a window
+        before submission, since `proc.jobs` is a list of the `Job` objects
+        for the plugins, the rendered scripts are needed by the process
+        fingerprint and the cache check, and the outputs by the downstream
+        processes. Only the data to render a script is released once it is
+        rendered and again when the job is done (see `Job._release()`).
         """
+        loop = asyncio.get_running_loop()
+        # The process object is reused if the pipeline runs again
+        self._job_done_futs = []
+        self._output_checks = []
+        self._output_check_semaphore = asyncio.Semaphore(OUTPUT_CHECK_WORKERS)
         for i in range(self.input.data.shape[0]):
             job = self.xqute.scheduler.create_job(i, "")
             self.jobs.append(job)
+            self._job_done_futs.append(loop.create_future())
+
+        workers = self._prepare_workers()
+        with ThreadPoolExecutor(
+            max_workers=workers,
+            thread_name_prefix="pipen-prepare",
+        ) as executor:
+            self._prepare_executor = executor
+            jobs = iter(self.jobs)
+            try:
+                await asyncio.gather(*(self._init_job(jobs) for _ in range(workers)))
+            finally:
+                self._prepare_executor = None
+
+    def _mounted_input_paths(
+        self,
+        values: List[Any],
+        inkey: str,
+        intype: str,
+    ) -> List[Any]:
+        """Validate the paths of a column of the input data and turn them
+        into mounted paths
+
+        Same paths (i.e. a reference file for all jobs) are only turned
+        into mounted paths once.
+
+        Args:
+            values: The paths in the column, or in a cell of files/dirs input
+            inkey: The input key
+            intype: The input type
+
+        Returns:
+            The mounted paths
+        """
+        out = []
+        # str/Path => mounted path
+        mounted = {}
+        for i, value in enumerate(values):
+            if value is None:
+                out.append(value)
+                continue
+
+            if not isinstance(value, (str, PathLike, CloudPath, DualPath)):
+                at_index = (
+                    ""
+                    if intype in (ProcInputType.FILE, ProcInputType.DIR)
+                    else f" at index {i}"
+                )
+                raise ProcInputTypeError(
+                    f"[{self.name}] Got {type(value)} instead of "
+                    f"PathLike object for input: {inkey + ':' + intype!r}"
+                    f"{at_index}"
+                )
+
+            if isinstance(value, DualPath):
+                # if it is a dualpath, it means it is a mounted path
+                # we should use the mounted path to access the file
+                out.append(value.mounted)
+                continue
+
+            if isinstance(value, MountedPath):
+                out.append(value)
+                continue
 
-        await asyncio.gather(*(self._init_job(i) for i in range(self.submission_batch)))
+            # str, Path, CloudPath
+            key = value if isinstance(value, (str, Path)) else None
+            if key is not None and key in mounted:
+                out.append(mounted[key])
+                continue
+
+            path = AnyPath(value)
+            if isinstance(path, Path):
+                path = DualPath(path.expanduser().absolute()).mounted
+            else:
+                path = DualPath(path).mounted
+            if key is not None:
+                mounted[key] = path
+            out.append(path)
+
+        return out
+
+    @traced("Proc._compute_input_records", lambda self: {"proc": self.name})
+    def _compute_input_records(self) -> List[Dict[str, Any]]:
+        """Compute the input of all jobs from the input data
+
+        The input data is converted, validated and normalized column by
+        column, instead of accessing the rows of the data frame one by one.
+
+        Returns:
+            The input of each job, keyed by the input keys
+        """
+        import numpy
+        import pandas
+
+        data = self.input.data
+        # The same values as accessing the rows by `data.iloc[i, :]`, which
+        # upcasts the numbers to a common type (i.e. int to float when mixed
+        # with float columns), and keeps the other values as they are,
+        # i.e. Timestamp/Timedelta for datetime64/timedelta64 columns
+        if all(
+            isinstance(dtype, numpy.dtype) and dtype.kind in "biufc"
+            for dtype in data.dtypes
+        ):
+            columns = data.to_numpy().T.tolist()
+        else:
+            columns = [
+                data.iloc[:, i].astype(object).tolist()
+                for i in range(data.shape[1])
+            ]
+        colindex = {col: i for i, col in enumerate(data.columns)}
+        for i, dtype in enumerate(data.dtypes):
+            if isinstance(dtype, pandas.api.extensions.ExtensionDtype):
+                columns[i] = [
+                    None if value is pandas.NA else value for value in columns[i]
+                ]
+
+        for inkey, intype in self.input.type.items():
+            i = colindex[inkey]
+            if intype in (ProcInputType.FILE, ProcInputType.DIR):
+                columns[i] = self._mounted_input_paths(columns[i], inkey, intype)
+
+            elif intype in (ProcInputType.FILES, ProcInputType.DIRS):
+                column = []
+                for value in columns[i]:
+                    if value is None:
+                        column.append(value)
+                        continue
+
+                    if isinstance(value, pandas.DataFrame):
+                        # The paths in a single column, or a single cell
+                        # with the paths
+                        if value.shape[1] != 1:
+                            raise ProcInputTypeError(
+                                f"[{self.name}] Expected a data frame with a "
+                                "single column for input: "
+                                f"{inkey + ':' + intype!r}, "
+                                f"got {value.shape[1]} columns"
+                            )
+                        value = value.iloc[:, 0].tolist()
+                        if len(value) == 1 and isinstance(value[0], (list, tuple)):
+                            value = value[0]
+
+                    if not isinstance(value, (list, tuple)):
+                        raise ProcInputTypeError(
+                            f"[{self.name}] Expected a sequence for input: "
+                            f"{inkey + ':' + intype!r}, got {type(value)}"
+                        )
+
+                    column.append(
+                        self._mounted_input_paths(list(value), inkey, intype)
+                    )
+                columns[i] = column
+
+        keys = list(data.columns)
+        return [dict(zip(keys, row)) for row in zip(*columns)]
 
     def _compute_input(self) -> Mapping[str, Mapping[str, Any]]:
         """Calculate the input based on input and input data
@@ -0,0 +1,220 @@
+"""Provide the result cache backends that share the outputs of the
+identical jobs across workdirs and pipelines"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Type
+
+from .defaults import RESULT_CACHE_ENTRY_GROUP
+from .exceptions import (
+    NoSuchResultCacheBackendError,
+    WrongResultCacheBackendTypeError,
+)
+from .utils import is_subclass, load_entrypoints
+
+__all__ = [
+    "ResultCache",
+    "LocalResultCache",
+    "get_result_cache_backend",
+    "materialize",
+]
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+# The ioctl request to clone a file (reflink) on Linux (btrfs, xfs, etc)
+FICLONE = 0x40049409
+
+
+def _clone_file(src: str, dst: str) -> None:
+    """Make dst the same as src by reflink, or copy if reflink is not
+    supported
+
+    The files are never hardlinked, since a hardlinked output shares the
+    inode with the cache entry, and a job (or the user) modifying the output
+    in place would corrupt the entry for all the other pipelines.
+
+    Args:
+        src: The source file
+        dst: The destination file
+    """
+    if fcntl is not None:
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+            shutil.copystat(src, dst)
+            return
+        except OSError:
+            if os.path.lexists(dst):
+                os.unlink(dst)
+
+    shutil.copy2(src, dst)
+
+
+def materialize(src: Path, dst: Path) -> None:
+    """Materialize a file or directory at dst from src, with the files
+    reflinked or copied
+
+    Args:
+        src: The source file or directory
+        dst: The destination, which should not exist
+    """
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    if src.is_dir():
+        shutil.copytree(src, dst, symlinks=True, copy_function=_clone_file)
+    else:
+        _clone_file(str(src), str(dst))
+
+
+class ResultCache(ABC):
+    """Base class for the result cache backends
+
+    A backend keeps the outputs of the jobs keyed by the hash of the content
+    of the jobs (the rendered script and the input data and files, see
+    `JobCaching._result_key()`), so that an identical job from another
+    workdir or pipeline can have the outputs materialized instead of running.
+
+    The errors raised by `get()` and `put()` are logged as warnings, and the
+    jobs are run as if the outputs are not in the cache.
+
+    Args:
+        location: The location of the cache (`result_cache`)
+    """
+
+    def __init__(self, location: str) -> None:
+        self.location = location
+
+    @abstractmethod
+    def get(self, key: str, outputs: Dict[str, Path]) -> bool:
+        """Materialize the outputs of a job from the cache
+
+        Args:
+            key: The key of the job
+            outputs: The output files/directories of the job, keyed by the
+                output keys, which are all under the output directory of
+                the job. The existing ones are replaced.
+
+        Returns:
+            True if the outputs are materialized, False if not in the cache
+        """
+
+    @abstractmethod
+    def put(self, key: str, outputs: Dict[str, Path]) -> None:
+        """Save the outputs of a job to the cache
+
+        Args:
+            key: The key of the job
+            outputs: The output files/directories of the job, keyed by the
+                output keys
+        """
+
+    def close(self) -> None:
+        """Close the cache when the pipeline is done"""
+
+
+class LocalResultCache(ResultCache):
+    """The result cache in a local (or mounted) directory
+
+    The outputs of a job are saved at `<location>/<key[:2]>/<key>/<outkey>`,
+    and materialized by reflink or copy (see `_clone_file()`).
+
+    Args:
+        location: The directory of the cache, shared by the pipelines
+    """
+
+    def __init__(self, location: str) -> None:
+        super().__init__(location)
+        self.path = Path(location).expanduser()
+        self.path.mkdir(parents=True, exist_ok=True)
+
+    def _entry(self, key: str) -> Path:
+        """Get the directory of an entry"""
+        return self.path / key[:2] / key
+
+    def get(self, key: str, outputs: Dict[str, Path]) -> bool:
+        """Materialize the outputs of a job from its entry, see
+        `ResultCache.get()`"""
+        entry = self._entry(key)
+        if not entry.is_dir() or not all(
+            (entry / outkey).exists() for outkey in outputs
+        ):
+            return False
+
+        for outkey, path in outputs.items():
+            # i.e. the empty directory created for the directory outputs
+            if path.is_dir() and not path.is_symlink():
+                shutil.rmtree(path)
+            elif path.exists() or path.is_symlink():
+                path.unlink()
+            materialize(entry / outkey, path)
+        # Let the entry be recently used
+        os.utime(entry)
+        return True
+
+    def put(self, key: str, outputs: Dict[str, Path]) -> None:
+        """Save the outputs of a job to the cache
+
+        The outputs are saved in a temporary directory and then renamed, so
+        that others never see an incomplete entry.
+
+        Args:
+            key: The key of the job
+            outputs: The output files/directories of the job, keyed by the
+                output keys
+        """
+        entry = self._entry(key)
+        if entry.exists():
+            return
+
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        # Unique for each call, even from the threads of the same process
+        tmpdir = Path(tempfile.mkdtemp(prefix=f".{key}.", dir=entry.parent))
+        try:
+            for outkey, path in outputs.items():
+                materialize(path, tmpdir / outkey)
+            # i.e. saved by another pipeline at the same time, renaming
+            # would replace it if it is empty or fail if not
+            if not entry.exists():
+                tmpdir.rename(entry)
+        except OSError:
+            pass
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def get_result_cache_backend(
+    backend: str | Type[ResultCache],
+) -> Type[ResultCache]:
+    """Get the result cache backend by name or the backend itself
+
+    Args:
+        backend: The name of the backend or the backend itself
+
+    Returns:
+        The backend class
+    """
+    if is_subclass(backend, ResultCache):
+        return backend  # type: ignore
+
+    if backend == "local":
+        return LocalResultCache
+
+    for name, obj in load_entrypoints(
+        RESULT_CACHE_ENTRY_GROUP
+    ):  # pragma: no cover
+        if name == backend:
+            if not is_subclass(obj, ResultCache):
+                raise WrongResultCacheBackendTypeError(
+                    "Result cache backend should be a subclass of "
+                    "pipen.result_cache.ResultCache."
+                )
+            return obj
+
+    raise NoSuchResultCacheBackendError(str(backend))
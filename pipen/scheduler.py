@@ -2,7 +2,10 @@
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Type
+import asyncio
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Type
 
 from diot import Diot
 from xqute import Scheduler
@@ -13,6 +16,7 @@ from xqute.schedulers.ssh_scheduler import SshScheduler as XquteSshScheduler
 from xqute.schedulers.gbatch_scheduler import GbatchScheduler as XquteGbatchScheduler
 from xqute.path import DualPath
 
+from ._tracing import traced
 from .defaults import SCHEDULER_ENTRY_GROUP
 from .exceptions import NoSuchSchedulerError, WrongSchedulerTypeError
 from .job import Job
@@ -31,7 +35,101 @@ class SchedulerPostInit:
     MOUNTED_OUTDIR: str
 
     def post_init(self, proc: Proc) -> None:
-        ...
+        self.proc = proc
+        # Not to poll the jobs by the process (see `Proc._feed_jobs()`) and
+        # by xqute at the same time
+        self._polling_lock = asyncio.Lock()
+
+    @traced(
+        "Job.submit",
+        lambda self, job: {"proc": self.proc.name, "job": job.index},
+    )
+    async def submit_job_and_update_status(self, job: Job) -> None:
+        """Submit and update the status of a job
+
+        A job queued by xqute takes the slot of `max_jobs` reserved for it
+        when polled (see `polling_jobs()`), which is kept while it is
+        retried, until it is done (see `Pipen.free_job_slot()`). The slot is
+        freed right away if the job is not submitted, i.e. skipped as it is
+        already running, cancelled by `on_job_submitting()` or by halting.
+
+        Args:
+            job: The job
+        """
+        pipeline = self.proc.pipeline
+        # Not job.status, which is updated once queried and tracked by xqute
+        jid = job.jid
+        pipeline.take_job_slot(job)
+        try:
+            await super().submit_job_and_update_status(job)  # type: ignore
+        finally:
+            if job.jid == jid:
+                pipeline.free_job_slot(job)
+
+    def wrapped_job_script(self, job: Job) -> DualPath:
+        """Get the wrapped job script
+
+        xqute writes the script each time it is asked for, including right
+        after the job is submitted (to log its path), while the job may be
+        reading it, which could then exit early without running the command.
+        So a local script is not written again if unchanged, and otherwise
+        replaced atomically, so that a running job keeps reading the old one.
+
+        Args:
+            job: The job
+
+        Returns:
+            The path of the wrapped job script
+        """
+        wrapt_script = job.metadir / f"job.wrapped.{self.name}"  # type: ignore
+        path = wrapt_script.path
+        if not isinstance(path, Path):
+            return super().wrapped_job_script(job)  # type: ignore
+
+        script = self.wrap_job_script(job)  # type: ignore
+        try:
+            if path.read_text() == script:
+                return wrapt_script
+        except OSError:
+            pass
+
+        tmpfile = path.with_name(f"{path.name}.tmp")
+        tmpfile.write_text(script)
+        os.replace(tmpfile, path)
+        return wrapt_script
+
+    async def polling_jobs(self, jobs: List[Job], on: str) -> bool:
+        """Check if all jobs are done or new jobs can submit
+
+        When checking if new jobs can submit, `max_jobs` of the pipeline is
+        also checked, which limits the number of jobs across all running
+        processes. Once it says yes, xqute queues a job right away, so a slot
+        is reserved for it, and taken by the job once it is submitted (see
+        `submit_job_and_update_status()`). It is not checked if the
+        scheduler is not attached to a process (see `post_init()`).
+
+        The jobs are polled one call at a time, and a copy of the list is
+        polled, since the jobs that are done are removed from the list (see
+        `Proc._set_job_done()`) by the hooks called while polling.
+
+        Args:
+            jobs: The list of jobs
+            on: query on status: `submittable` or `all_done`
+
+        Returns:
+            True if yes otherwise False.
+        """
+        proc = getattr(self, "proc", None)
+        if proc is None:
+            return await super().polling_jobs(jobs, on)  # type: ignore
+
+        async with self._polling_lock:
+            out = await super().polling_jobs(list(jobs), on)  # type: ignore
+
+        if on != "submittable" or not out:
+            return out
+
+        return proc.pipeline.reserve_job_slot(proc)
 
 
 class LocalScheduler(SchedulerPostInit, XquteLocalScheduler):
@@ -1,8 +1,12 @@
 """Template adaptor for pipen"""
 from __future__ import annotations
 
+import hashlib
+import threading
 from abc import ABC, abstractmethod
-from typing import Any, Mapping, Type
+from collections import OrderedDict
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Mapping, Tuple, Type
 
 from liquid import Liquid
 
@@ -10,13 +14,144 @@ from .defaults import TEMPLATE_ENTRY_GROUP
 from .exceptions import NoSuchTemplateEngineError, WrongTemplateEnginTypeError
 from .utils import is_subclass, load_entrypoints
 
+if TYPE_CHECKING:  # pragma: no cover
+    import jinja2
+
 __all__ = [
     "Template",
     "TemplateLiquid",
     "TemplateJinja2",
     "get_template_engine",
+    "set_template_cache",
 ]
 
+# The directory to save the compiled templates, None to not save them
+_CACHE_DIR: Path | None = None
+# (engine, options) => (environment, sources by name), least recently used
+# first, not to grow without limit when the templates are created outside of
+# a pipeline run
+_ENVIRONMENTS: OrderedDict[
+    Tuple, Tuple[jinja2.Environment, OrderedDict[str, str]]
+] = OrderedDict()
+_ENVIRONMENTS_LOCK = threading.Lock()
+# The max number of environments to keep
+_MAX_ENVIRONMENTS = 64
+# The max number of sources to keep for an environment, the size of the cache
+# of the compiled templates of an environment by default
+_MAX_SOURCES = 400
+
+
+def set_template_cache(path: Path | None) -> None:
+    """Set the directory to save the compiled templates (Jinja2 bytecode)
+    of the builtin template engines, so that they are not compiled again
+    in the later runs
+
+    The environments shared by the templates are all released when the
+    directory is unset (i.e. when a pipeline is done).
+
+    Args:
+        path: The directory, None to not save the compiled templates
+    """
+    global _CACHE_DIR
+    if path is not None:
+        path.mkdir(parents=True, exist_ok=True)
+    else:
+        with _ENVIRONMENTS_LOCK:
+            _ENVIRONMENTS.clear()
+    _CACHE_DIR = path
+
+
+def _freeze(value: Any) -> Any:
+    """Make the template options hashable to look up the environments,
+    the unhashable values are compared by identity"""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(val)) for key, val in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(val) for val in value)
+    try:
+        hash(value)
+    except TypeError:
+        return ("__id__", id(value))
+    return value
+
+
+def _stable_repr(value: Any) -> str:
+    """Represent the template options the same way across runs, to name
+    the templates in the bytecode cache"""
+    if isinstance(value, dict):
+        items = sorted(value.items())
+        return "{%s}" % ",".join(f"{key!r}:{_stable_repr(val)}" for key, val in items)
+    if isinstance(value, (list, tuple)):
+        return "[%s]" % ",".join(_stable_repr(val) for val in value)
+    if callable(value):
+        module = getattr(value, "__module__", "")
+        return f"{module}.{getattr(value, '__qualname__', type(value).__name__)}"
+    return repr(value)
+
+
+def _get_template(
+    engine: str,
+    source: Any,
+    options: Mapping[str, Any],
+    create_env: Callable[[], jinja2.Environment],
+) -> jinja2.Template:
+    """Get a compiled template from the environment shared by the templates
+    with the same engine and options
+
+    The compiled templates are cached in memory by the environment, and
+    their bytecode is saved in the template cache directory if set (see
+    `set_template_cache()`). At most `_MAX_ENVIRONMENTS` environments, and
+    `_MAX_SOURCES` sources for each of them, are kept, the least recently
+    used ones are dropped first.
+
+    Args:
+        engine: The name (and version) of the template engine
+        source: The source of the template
+        options: The options of the template engine
+        create_env: The function to create the environment
+
+    Returns:
+        The compiled template
+    """
+    import jinja2
+
+    key = (engine, _freeze(options))
+    with _ENVIRONMENTS_LOCK:
+        if key not in _ENVIRONMENTS:
+            env = create_env()
+            sources: OrderedDict[str, str] = OrderedDict()
+            loader = jinja2.FunctionLoader(sources.get)
+            env.loader = (
+                loader
+                if env.loader is None
+                else jinja2.ChoiceLoader([loader, env.loader])
+            )
+            _ENVIRONMENTS[key] = (env, sources)
+            if len(_ENVIRONMENTS) > _MAX_ENVIRONMENTS:
+                _ENVIRONMENTS.popitem(last=False)
+        else:
+            _ENVIRONMENTS.move_to_end(key)
+        env, sources = _ENVIRONMENTS[key]
+
+        # The cache directory may be changed since the environment is created
+        cache_dir = getattr(env.bytecode_cache, "directory", None)
+        if _CACHE_DIR is None:
+            env.bytecode_cache = None
+        elif cache_dir != str(_CACHE_DIR):
+            env.bytecode_cache = jinja2.FileSystemBytecodeCache(str(_CACHE_DIR))
+
+        source = str(source)
+        name = hashlib.sha256(
+            f"{engine}\0{_stable_repr(options)}\0{source}".encode()
+        ).hexdigest()
+        sources[name] = source
+        sources.move_to_end(name)
+        if len(sources) > _MAX_SOURCES:
+            sources.popitem(last=False)
+
+        # Loaded under the lock, as the source may be dropped by another thread
+        return env.get_template(name)
+
 
 class Template(ABC):
     """Base class wrapper to wrap template for pipen"""
@@ -59,12 +194,15 @@ class TemplateLiquid(Template):
             envs: The env data
             **kwargs: Other arguments for Liquid
         """
+        import liquid
+
         super().__init__(source)
-        self.engine = Liquid(
+        # The environment is shared by the templates with the same options
+        self.engine = _get_template(
+            f"{self.name}-{liquid.__version__}",
             source,
-            from_file=False,
-            mode="wild",
-            **kwargs,
+            kwargs,
+            lambda: Liquid("", from_file=False, mode="wild", **kwargs).env,
         )
 
     def _render(self, data: Mapping[str, Any]) -> str:
@@ -99,12 +237,23 @@ class TemplateJinja2(Template):
         import jinja2
 
         super().__init__(source)
-        filters = kwargs.pop("filters", {})
-        envs = kwargs.pop("globals", {})
-        filters = kwargs.pop("filters", {})
-        self.engine = jinja2.Template(source, **kwargs)
-        self.engine.globals.update(envs)
-        self.engine.environment.filters.update(filters)
+
+        def create_env() -> jinja2.Environment:
+            env_args = kwargs.copy()
+            envs = env_args.pop("globals", {})
+            filters = env_args.pop("filters", {})
+            env = jinja2.Environment(**env_args)
+            env.globals.update(envs)
+            env.filters.update(filters)
+            return env
+
+        # The environment is shared by the templates with the same options
+        self.engine = _get_template(
+            f"{self.name}-{jinja2.__version__}",
+            source,
+            kwargs,
+            create_env,
+        )
 
     def _render(self, data: Mapping[str, Any]) -> str:
         """Render the template
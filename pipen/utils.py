@@ -2,14 +2,18 @@
 
 from __future__ import annotations
 
+import os
 import re
+import stat as statmod
 import sys
 import importlib
 import importlib.util
 import logging
 import shutil
 import textwrap
+import threading
 import typing
+from concurrent.futures import ThreadPoolExecutor
 from itertools import groupby
 from operator import itemgetter
 from io import StringIO
@@ -42,8 +46,13 @@ from .defaults import (
     CONSOLE_DEFAULT_WIDTH,
     CONSOLE_WIDTH_WITH_PANEL,
     CONSOLE_WIDTH_SHIFT,
+    CLOUD_LISTING_MAX_OBJECTS,
+    CLOUD_REQUEST_WORKERS,
+    DIRSIG_WORKERS,
+    FAKE_SYMLINK_MAX_SIZE,
     LOGGER_NAME,
 )
+from ._cloud_listing import CloudListing, cloud_prefixes
 from .version import __version__
 
 from importlib import metadata as importlib_metadata
@@ -419,6 +428,233 @@ def pipen_banner() -> RenderableType:
     return table
 
 
+class MtimeCache:
+    """Memoize the results of `get_mtime()` during a run
+
+    The results are kept in a tree of the path parts, so that the results
+    of a path, its ancestors (whose mtimes may be from the contents) and
+    its descendants can be invalidated at once when the path is written.
+
+    The cloud prefixes listed by `list_cloud_paths()` are kept as well, to
+    answer the mtimes and existence of the cloud paths under them.
+    """
+
+    # The key of the results of a node, keyed by the depth
+    _RESULTS = ""
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self._tree: dict = {}
+        self._lock = threading.Lock()
+        self._listings: List[CloudListing] = []
+
+    def get_mtime(self, path: Any, dir_depth: int) -> float:
+        """Get the modification time of a path from the cache, or compute it
+
+        Args:
+            path: The path
+            dir_depth: The depth of the directory to check the
+                last modification time
+
+        Returns:
+            The last modification time of path
+        """
+        parts = str(path).split("/")
+        with self._lock:
+            node = self._tree
+            for part in parts:
+                node = node.get(part)
+                if node is None:
+                    break
+            else:
+                results = node.get(self._RESULTS)
+                if results is not None and dir_depth in results:
+                    self.hits += 1
+                    return results[dir_depth]
+            self.misses += 1
+
+        mtime = _get_mtime(path, dir_depth)
+        with self._lock:
+            node = self._tree
+            for part in parts:
+                node = node.setdefault(part, {})
+            node.setdefault(self._RESULTS, {})[dir_depth] = mtime
+        return mtime
+
+    def invalidate(self, path: Any) -> None:
+        """Invalidate the results of a path, its ancestors and descendants
+
+        Args:
+            path: The path that is written
+        """
+        path = getattr(path, "path", path)
+        for listing in self._listings:
+            listing.invalidate(path)
+
+        parts = str(path).split("/")
+        with self._lock:
+            node = self._tree
+            for part in parts[:-1]:
+                node.pop(self._RESULTS, None)
+                node = node.get(part)
+                if node is None:
+                    return
+            node.pop(self._RESULTS, None)
+            node.pop(parts[-1], None)
+
+    def cloud_listing(self, path: CloudPath) -> CloudListing | None:
+        """Get the listing that can answer a cloud path
+
+        Args:
+            path: The cloud path
+
+        Returns:
+            The listing, or None if the path is not covered by any listing
+        """
+        for listing in self._listings:
+            if listing.covers(path):
+                return listing
+        return None
+
+    def list_cloud_paths(self, paths: Iterable[Any], dir_depth: int) -> int:
+        """List the prefixes of the cloud paths at once, and request the
+        paths that are not covered by the listings concurrently
+
+        Args:
+            paths: The paths, the local ones are ignored
+            dir_depth: The depth of the directories to get the mtimes of
+                for the paths that are not covered by the listings
+
+        Returns:
+            The number of the listed objects
+        """
+        cloud_paths = []
+        for path in paths:
+            path = getattr(path, "path", path)
+            if isinstance(path, CloudPath) and self.cloud_listing(path) is None:
+                cloud_paths.append(path)
+        if not cloud_paths:
+            return 0
+
+        prefixes = cloud_prefixes(cloud_paths)
+        with ThreadPoolExecutor(max_workers=CLOUD_REQUEST_WORKERS) as executor:
+            listings = list(
+                executor.map(
+                    lambda prefix: CloudListing(prefix, CLOUD_LISTING_MAX_OBJECTS),
+                    prefixes,
+                )
+            )
+
+        count = 0
+        for listing in listings:
+            if listing.complete:
+                count += len(listing)
+                listing.resolve_symlinks(
+                    cloud_paths,
+                    _cloud_is_fake_symlink,
+                    CLOUD_REQUEST_WORKERS,
+                )
+                with self._lock:
+                    self._listings.append(listing)
+
+        rest = [path for path in cloud_paths if self.cloud_listing(path) is None]
+        if rest:
+            with ThreadPoolExecutor(max_workers=CLOUD_REQUEST_WORKERS) as executor:
+                # memoize the mtimes
+                list(executor.map(lambda p: self.get_mtime(p, dir_depth), rest))
+        return count
+
+
+# The mtime cache of the running pipeline, None if not running
+_MTIME_CACHE: MtimeCache | None = None
+
+
+def start_mtime_cache() -> MtimeCache:
+    """Start memoizing the results of `get_mtime()`
+
+    Returns:
+        The mtime cache
+    """
+    global _MTIME_CACHE
+    _MTIME_CACHE = MtimeCache()
+    return _MTIME_CACHE
+
+
+def stop_mtime_cache() -> MtimeCache | None:
+    """Stop memoizing the results of `get_mtime()`
+
+    Returns:
+        The mtime cache, None if it is not started
+    """
+    global _MTIME_CACHE
+    cache, _MTIME_CACHE = _MTIME_CACHE, None
+    return cache
+
+
+def invalidate_mtime(path: str | PathLike | CloudPath | DualPath) -> None:
+    """Invalidate the memoized mtimes of a path that is written
+
+    Args:
+        path: The path
+    """
+    if _MTIME_CACHE is not None:
+        _MTIME_CACHE.invalidate(path)
+
+
+def list_cloud_paths(paths: Iterable[Any], dir_depth: int = 1) -> int:
+    """List the prefixes of the cloud paths at once, so that their
+    mtimes and existence are answered from the listings during the run,
+    instead of requesting the objects one by one. The mtimes of the paths
+    that are not covered by the listings are requested concurrently and
+    memoized.
+
+    Args:
+        paths: The paths, the local ones are ignored
+        dir_depth: The depth of the directories to get the mtimes of
+            for the paths that are not covered by the listings
+
+    Returns:
+        The number of the listed objects
+    """
+    if _MTIME_CACHE is None:
+        return 0
+    return _MTIME_CACHE.list_cloud_paths(paths, dir_depth)
+
+
+def _cloud_stat(path: CloudPath) -> Tuple[str, float, int] | None:
+    """Get the type, mtime and size of a cloud path from the listings
+
+    Args:
+        path: The cloud path
+
+    Returns:
+        The stat from `CloudListing.stat()`, None if not listed
+    """
+    if _MTIME_CACHE is None:
+        return None
+    listing = _MTIME_CACHE.cloud_listing(path)
+    return None if listing is None else listing.stat(path)
+
+
+def path_exists(path: str | PathLike | CloudPath | DualPath) -> bool:
+    """Check if a path exists, from the listings if it is a cloud path
+    that is listed (see `list_cloud_paths()`)
+
+    Args:
+        path: The path
+
+    Returns:
+        True if the path exists
+    """
+    path = getattr(path, "path", path)
+    if isinstance(path, CloudPath):
+        stat = _cloud_stat(path)
+        if stat is not None:
+            return stat[0] != "missing"
+    return path.exists()
+
+
 def get_mtime(
     path: str | PathLike | CloudPath | DualPath,
     dir_depth: int = 1,
@@ -426,6 +662,9 @@ def get_mtime(
     """Get the modification time of a path.
     If path is a directory, try to get the last modification time of the
     contents in the directory at given dir_depth
+
+    The results are memoized during a pipeline run (see `MtimeCache`).
+
     Args:
         dir_depth: The depth of the directory to check the
             last modification time
@@ -433,10 +672,50 @@ def get_mtime(
         The last modification time of path
     """
     path = getattr(path, "path", path)
+    if _MTIME_CACHE is not None:
+        return _MTIME_CACHE.get_mtime(path, dir_depth)
+    return _get_mtime(path, dir_depth)
+
+
+def _get_mtime(path: str | PathLike | CloudPath, dir_depth: int) -> float:
+    """Get the modification time of a path without the cache
+
+    Args:
+        path: The path
+        dir_depth: The depth of the directory to check the
+            last modification time
+
+    Returns:
+        The last modification time of path
+    """
+    if not isinstance(path, CloudPath):
+        path = AnyPath(path)
+    if isinstance(path, Path):
+        return _local_mtime(os.fspath(path), dir_depth)
+    return _anypath_mtime(path, dir_depth)
+
+
+def _anypath_mtime(path: Path | CloudPath, dir_depth: int) -> float:
+    """Get the modification time of a path with the path API, used for
+    cloud paths and fake symlinks
+
+    Args:
+        path: The path
+        dir_depth: The depth of the directory to check the
+            last modification time
+
+    Returns:
+        The last modification time of path
+    """
+    if isinstance(path, CloudPath) and _MTIME_CACHE is not None:
+        listing = _MTIME_CACHE.cloud_listing(path)
+        if listing is not None:
+            mtime = listing.get_mtime(path, dir_depth, path_is_symlink)
+            if mtime is not None:
+                return mtime
 
     mtime = 0.0
-    path = AnyPath(path)
-    if not path.exists():
+    if not path_exists(path):
         return mtime
 
     if not path_is_symlink(path):
@@ -472,6 +751,136 @@ def get_mtime(
     return mtime
 
 
+# The thread pool to walk the subdirectories of local directories
+_DIRSIG_EXECUTOR: ThreadPoolExecutor | None = None
+_DIRSIG_EXECUTOR_LOCK = threading.Lock()
+
+
+def _dirsig_executor() -> ThreadPoolExecutor:
+    """Get the thread pool to walk the subdirectories, create it if needed
+
+    Returns:
+        The thread pool
+    """
+    global _DIRSIG_EXECUTOR
+    with _DIRSIG_EXECUTOR_LOCK:
+        if _DIRSIG_EXECUTOR is None:
+            _DIRSIG_EXECUTOR = ThreadPoolExecutor(
+                max_workers=DIRSIG_WORKERS,
+                thread_name_prefix="pipen-dirsig",
+            )
+        return _DIRSIG_EXECUTOR
+
+
+def _is_fake_symlink(path: str, size: int) -> bool:
+    """Check if a local regular file is a fake symlink ("symlink:<url>")
+    by reading only the head of small files
+
+    Args:
+        path: The path to the file
+        size: The size of the file
+
+    Returns:
+        True if the file is a fake symlink
+    """
+    if size < 8 or size > FAKE_SYMLINK_MAX_SIZE:
+        return False
+    try:
+        with open(path, "rb") as fin:
+            return fin.read(8) == b"symlink:"
+    except OSError:  # pragma: no cover
+        return False
+
+
+def _local_mtime(path: str, dir_depth: int, parallel: bool = True) -> float:
+    """Get the modification time of a local path, the same as
+    `_anypath_mtime()`, but with `os.lstat()` and `os.scandir()`
+
+    Args:
+        path: The path
+        dir_depth: The depth of the directory to check the
+            last modification time
+        parallel: Whether to walk the subdirectories in the thread pool
+
+    Returns:
+        The last modification time of path
+    """
+    try:
+        lstat = os.lstat(path)
+    except OSError:
+        return 0.0
+
+    if statmod.S_ISLNK(lstat.st_mode):
+        try:
+            is_dir = statmod.S_ISDIR(os.stat(path).st_mode)
+        except OSError:  # dead link
+            return 0.0
+        if dir_depth == 0 or not is_dir:
+            return lstat.st_mtime
+        return _scandir_mtime(path, dir_depth, parallel)
+
+    if statmod.S_ISDIR(lstat.st_mode):
+        if dir_depth == 0:
+            return lstat.st_mtime
+        return _scandir_mtime(path, dir_depth, parallel)
+
+    if _is_fake_symlink(path, lstat.st_size):
+        return _anypath_mtime(Path(path), dir_depth)
+    return lstat.st_mtime
+
+
+def _scandir_mtime(path: str, dir_depth: int, parallel: bool) -> float:
+    """Get the last modification time of the contents of a local directory
+
+    The stats of the entries come from `os.scandir()`, and the
+    subdirectories are walked in the thread pool if parallel is True.
+    The walks in the thread pool are serial, so that the workers never
+    wait for each other.
+
+    Args:
+        path: The path to the directory
+        dir_depth: The depth (>= 1) of the directory to check the
+            last modification time
+        parallel: Whether to walk the subdirectories in the thread pool
+
+    Returns:
+        The last modification time of the contents
+    """
+    mtime = 0.0
+    subdirs = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_symlink():
+                mtime = max(mtime, _local_mtime(entry.path, dir_depth - 1, False))
+                continue
+
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if is_dir and dir_depth > 1:
+                subdirs.append(entry.path)
+                continue
+
+            stat = entry.stat(follow_symlinks=False)
+            if not is_dir and _is_fake_symlink(entry.path, stat.st_size):
+                mtime = max(
+                    mtime,
+                    _anypath_mtime(Path(entry.path), dir_depth - 1),
+                )
+            else:
+                mtime = max(mtime, stat.st_mtime)
+
+    if parallel and len(subdirs) > 1:
+        mtimes = _dirsig_executor().map(
+            lambda subdir: _scandir_mtime(subdir, dir_depth - 1, False),
+            subdirs,
+        )
+    else:
+        mtimes = (
+            _scandir_mtime(subdir, dir_depth - 1, parallel)
+            for subdir in subdirs
+        )
+    return max(mtime, max(mtimes, default=0.0))
+
+
 def is_subclass(obj: Any, cls: type) -> bool:
     """Tell if obj is a subclass of cls
     Differences with issubclass is that we don't raise Type error if obj
@@ -790,11 +1199,36 @@ def path_is_symlink(path: Path | CloudPath | DualPath) -> bool:
     if isinstance(path, Path):
         if path.is_symlink():
             return True
+        try:
+            stat = path.stat()
+        except OSError:
+            return False
+        return statmod.S_ISREG(stat.st_mode) and _is_fake_symlink(
+            os.fspath(path),
+            stat.st_size,
+        )
+
+    listing = None if _MTIME_CACHE is None else _MTIME_CACHE.cloud_listing(path)
+    if listing is not None:
+        symlink = listing.is_symlink(path)
+        if symlink is not None:
+            return symlink
 
-    if not path.exists():
+    if listing is None and not path.exists():
         return False
 
-    # Check if the path is a fake symlink file
+    return _cloud_is_fake_symlink(path)
+
+
+def _cloud_is_fake_symlink(path: CloudPath) -> bool:
+    """Check if an existing cloud file is a fake symlink by reading it
+
+    Args:
+        path: The cloud path
+
+    Returns:
+        True if the file is a fake symlink, otherwise False
+    """
     try:
         return path.read_text().startswith("symlink:")
     except Exception:
@@ -1,3 +1,4 @@
+import os
 import sys
 import pytest  # noqa: F401
 
@@ -56,3 +57,150 @@ def test_version():
     assert "pipen" in out
     assert "python" in out
     assert "liquidpy" in out
+
+
+def test_bench(tmp_path):
+    out = cmdoutput(
+        ["pipen", "bench", "-n", "1", "-m", "2", "-i", "file", "--workdir", tmp_path]
+    )
+    assert "1 processes x 2 jobs, file input" in out
+    for phase in ("init", "prepare", "cache check", "hooks", "submission", "wall"):
+        assert phase in out
+    # temporary directory cleaned
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_bench_signatures(tmp_path):
+    out = cmdoutput(
+        [
+            "pipen", "bench", "--signatures", "-m", "3", "-i", "files",
+            "--workdir", tmp_path,
+        ]
+    )
+    assert "pipen signatures: 3 jobs, files input" in out
+    assert "toml" in out
+    assert "json" in out
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_bench_summarize(tmp_path):
+    import json
+    from pipen.cli.bench import _summarize
+
+    trace_file = tmp_path / "trace.json"
+    trace_file.write_text(
+        json.dumps(
+            {
+                "traceEvents": [
+                    # overlapping cache checks, waiting for threads
+                    {"ph": "X", "name": "Job.cached", "cat": "pipen",
+                     "ts": 0, "dur": 2e6},
+                    {"ph": "X", "name": "Job.cached", "cat": "pipen",
+                     "ts": 1e6, "dur": 2e6},
+                    {"ph": "X", "name": "Job.cached", "cat": "pipen",
+                     "ts": 5e6, "dur": 1e6},
+                    {"ph": "i", "name": "Job.cached", "cat": "pipen", "ts": 0},
+                ]
+            }
+        )
+    )
+    summary = _summarize(trace_file)
+    assert summary["cache check"] == 4.0
+    assert summary["init"] == 0.0
+
+
+def test_plan(tmp_path):
+    pipeline_file = tmp_path / "pipeline.py"
+    pipeline_file.write_text(
+        "from pipen import Pipen, Proc\n"
+        "class PlanProc(Proc):\n"
+        "    input = 'a'\n"
+        "    input_data = [1, 2]\n"
+        "    output = 'b:var:{{in.a}}'\n"
+        "    script = 'echo {{in.a}}'\n"
+        "pipeline = Pipen(\n"
+        "    name='PlanPipeline',\n"
+        f"    workdir={str(tmp_path / '.pipen')!r},\n"
+        f"    outdir={str(tmp_path / 'outdir')!r},\n"
+        ").set_starts(PlanProc)\n"
+    )
+    out = cmdoutput(["pipen", "plan", f"{pipeline_file}:pipeline"])
+    assert "PlanProc: Plan: 0 cached, 2 to run" in out
+    assert not (tmp_path / ".pipen" / "PlanProc" / "0" / "job.script").exists()
+
+
+def test_cache(tmp_path):
+    pipeline_file = tmp_path / "pipeline.py"
+    pipeline_file.write_text(
+        "import os\n"
+        "from pipen import Pipen, Proc\n"
+        "class CacheProc1(Proc):\n"
+        "    input = 'a'\n"
+        "    input_data = [1, 2]\n"
+        "    output = 'b:file:{{in.a}}.txt'\n"
+        "    script = 'seq 1000 > {{out.b}}'\n"
+        "class CacheProc2(Proc):\n"
+        "    requires = CacheProc1\n"
+        "    input = 'a:file'\n"
+        "    output = 'b:file:{{in.a.name}}'\n"
+        "    script = 'cat {{in.a}} > {{out.b}}'\n"
+        "Pipen(\n"
+        "    name='CachePipeline',\n"
+        "    loglevel='debug',\n"
+        "    signature_store=True,\n"
+        "    cache=os.environ.get('PIPEN_TEST_CACHE', True),\n"
+        f"    workdir={str(tmp_path / '.pipen' / 'CachePipeline')!r},\n"
+        f"    outdir={str(tmp_path / 'outdir')!r},\n"
+        ").set_starts(CacheProc1).run()\n"
+    )
+    # pipen may not be installed, run it from the current directory
+    run_pipeline = [
+        sys.executable,
+        "-c",
+        f"import runpy; runpy.run_path({str(pipeline_file)!r})",
+    ]
+    workdir = tmp_path / ".pipen"
+    check_output(run_pipeline, stderr=STDOUT)
+
+    out = cmdoutput(["pipen", "cache", str(workdir)])
+    assert "CachePipeline" in out
+    assert "CacheProc1" in out
+    assert "CacheProc2" in out
+
+    # the workdir of the pipeline
+    out = cmdoutput(["pipen", "cache", str(workdir / "CachePipeline")])
+    assert "CachePipeline" in out
+    assert "CacheProc1" in out
+
+    out = cmdoutput(["pipen", "cache", str(workdir), "--max-size", "0", "--dry-run"])
+    assert "Would evict 2 jobs" in out
+    assert "CachePipeline/CacheProc1/0" in out
+
+    out = cmdoutput(["pipen", "cache", str(workdir), "--max-age", "1d"])
+    assert "Evicted 0 jobs" in out
+
+    out = cmdoutput(["pipen", "cache", str(workdir), "--max-size", "0"])
+    assert "Evicted 2 jobs" in out
+    proc1_dir = workdir / "CachePipeline" / "CacheProc1"
+    assert not (proc1_dir / "0" / "output" / "1.txt").exists()
+    # the exported outputs are kept
+    assert (tmp_path / "outdir" / "CacheProc2" / "0" / "1.txt").is_file()
+
+    # the evicted jobs rerun
+    out = check_output(run_pipeline, stderr=STDOUT, encoding="utf-8")
+    assert "CacheProc1: Cached jobs" not in out
+    assert (proc1_dir / "0" / "output" / "1.txt").is_file()
+
+    # the evicted jobs rerun even with cache="force"
+    out = cmdoutput(["pipen", "cache", str(workdir), "--max-size", "0"])
+    assert "Evicted 2 jobs" in out
+    assert not (proc1_dir / "0" / "job.rc").exists()
+    out = check_output(
+        run_pipeline,
+        stderr=STDOUT,
+        encoding="utf-8",
+        env={**os.environ, "PIPEN_TEST_CACHE": "force"},
+    )
+    assert "CacheProc1: Cached jobs" not in out
+    assert (proc1_dir / "0" / "output" / "1.txt").is_file()
+    assert (proc1_dir / "0" / "output" / "1.txt").stat().st_size > 0
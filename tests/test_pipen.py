@@ -1,6 +1,10 @@
+import os
+import sys
+import time
+
 import pytest
 from uuid import uuid4
-from pipen import Proc, Pipen, run
+from pipen import Proc, Pipen, plugin, run
 from pipen.exceptions import (
     ProcDependencyError,
     PipenSetDataError,
@@ -9,8 +13,11 @@ from pipen.proc import PipenOrProcNameError
 
 from .helpers import (  # noqa: F401
     ErrorProc,
+    In2Out1Proc,
     NormalProc,
+    RetryProc,
     SimpleProc,
+    SleepingProc,
     RelPathScriptProc,
     pipen,
     SimplePlugin,
@@ -267,3 +274,689 @@ def test_cloud_workdir_outdir(uid):
         workdir=f"{cloud_dir}/workdir",
         outdir=f"{cloud_dir}/outdir",
     )
+
+
+class ProcTimingPlugin:
+    """Record the start and end time of the processes"""
+
+    timings = {}
+
+    @plugin.impl
+    async def on_proc_start(proc):
+        ProcTimingPlugin.timings[proc.name] = [time.time(), None]
+
+    @plugin.impl
+    async def on_proc_done(proc, succeeded):
+        ProcTimingPlugin.timings[proc.name][1] = time.time()
+
+
+@pytest.mark.forked
+def test_run_by_dependency(tmp_path):
+    """
+    proc1 --> proc2 -->
+                        proc4
+    proc3 ------------>
+    """
+    proc1 = Proc.from_proc(SleepingProc, input_data=[2])
+    proc2 = Proc.from_proc(NormalProc, requires=proc1)
+    proc3 = Proc.from_proc(SleepingProc, input_data=[2])
+    proc4 = Proc.from_proc(In2Out1Proc, requires=[proc2, proc3])  # noqa: F841
+
+    pipeline = Pipen(
+        name="DagPipeline",
+        max_procs=2,
+        plugins=[ProcTimingPlugin],
+        workdir=tmp_path / ".pipen",
+        outdir=tmp_path / "outdir",
+    ).set_starts(proc1, proc3)
+    assert pipeline.run()
+
+    timings = ProcTimingPlugin.timings
+    # proc1 and proc3 are running at the same time
+    assert timings["proc3"][0] < timings["proc1"][1]
+    assert timings["proc1"][0] < timings["proc3"][1]
+    # proc2 and proc4 are waiting for their required processes
+    assert timings["proc2"][0] >= timings["proc1"][1]
+    assert timings["proc4"][0] >= timings["proc2"][1]
+    assert timings["proc4"][0] >= timings["proc3"][1]
+
+
+@pytest.mark.forked
+def test_run_by_dependency_error(tmp_path):
+    proc1 = Proc.from_proc(ErrorProc, input_data=[1])
+    proc2 = Proc.from_proc(NormalProc, requires=proc1)
+    proc3 = Proc.from_proc(NormalProc, input_data=[1])
+
+    pipeline = Pipen(
+        name="DagErrorPipeline",
+        max_procs=0,
+        workdir=tmp_path / ".pipen",
+        outdir=tmp_path / "outdir",
+    ).set_starts(proc1, proc3)
+    assert not pipeline.run()
+    assert proc2.output_data is None
+    assert proc3.output_data is not None
+
+
+class JobTimingPlugin:
+    """Record the submission time of the jobs"""
+
+    timings = {}
+
+    @plugin.impl
+    async def on_job_submitted(job):
+        JobTimingPlugin.timings[(job.proc.name, job.index)] = time.time()
+
+    @plugin.impl
+    async def on_proc_done(proc, succeeded):
+        JobTimingPlugin.timings[proc.name] = time.time()
+
+
+class SleepingOutputProc(Proc):
+    """Process to sleep for a certain time and pass the time to the output"""
+
+    input = "time"
+    output = "time:var:{{in.time}}"
+    script = "sleep {{in.time}}"
+
+
+@pytest.mark.forked
+def test_run_streaming(tmp_path):
+    proc1 = Proc.from_proc(SleepingOutputProc, input_data=[0.1, 6], forks=2)
+    proc2 = Proc.from_proc(SleepingOutputProc, requires=proc1)
+    proc2.streaming = True
+
+    pipeline = Pipen(
+        name="StreamingPipeline",
+        max_procs=0,
+        plugins=[JobTimingPlugin],
+        workdir=tmp_path / ".pipen",
+        outdir=tmp_path / "outdir",
+    ).set_starts(proc1)
+    assert pipeline.run()
+
+    timings = JobTimingPlugin.timings
+    # The first job of proc2 is submitted before proc1 is done
+    assert timings[("proc2", 0)] < timings["proc1"]
+    assert timings[("proc2", 1)] >= timings[("proc1", 1)]
+
+
+@pytest.mark.forked
+def test_run_streaming_error(tmp_path):
+    failed = []
+
+    class FailedJobsPlugin:
+        name = "failed_jobs_plugin"
+
+        @plugin.impl
+        async def on_job_failed(job):
+            failed.append((job.proc.name, job.index))
+
+    proc1 = Proc.from_proc(RetryProc, input_data=[time.time() + 600, 0])
+    proc1.num_retries = 0
+    proc1.output = "out:var:1"
+    proc2 = Proc.from_proc(NormalProc, requires=proc1)
+    proc2.streaming = True
+
+    pipeline = Pipen(
+        name="StreamingErrorPipeline",
+        max_procs=0,
+        plugins=[FailedJobsPlugin],
+        workdir=tmp_path / ".pipen",
+        outdir=tmp_path / "outdir",
+    ).set_starts(proc1)
+    assert not pipeline.run()
+    # job 0 of proc1 failed, so job 0 of proc2 is not submitted
+    assert not (tmp_path / ".pipen" / "proc2" / "0" / "job.rc").is_file()
+    assert (tmp_path / ".pipen" / "proc2" / "1" / "job.rc").is_file()
+    # but reported as failed
+    assert sorted(failed) == [("proc1", 0), ("proc2", 0)]
+
+
+@pytest.mark.forked
+def test_run_streaming_output_not_generated(tmp_path, caplog):
+    proc1 = Proc.from_proc(SleepingOutputProc, input_data=[0, 6], forks=2)
+    # job 0 does not generate the output
+    proc1.output = "out:file:{{in.time}}.txt"
+    proc1.script = (
+        "sleep {{in.time}}; if [ {{in.time}} != 0 ]; then touch {{out.out}}; fi"
+    )
+    proc2 = Proc.from_proc(NormalProc, requires=proc1)
+    proc2.streaming = True
+
+    pipeline = Pipen(
+        name="StreamingOutputPipeline",
+        loglevel="debug",
+        max_procs=0,
+        plugins=[JobTimingPlugin],
+        workdir=tmp_path / ".pipen",
+        outdir=tmp_path / "outdir",
+    ).set_starts(proc1)
+    assert not pipeline.run()
+    # job 0 of proc2 fails before proc1 is done
+    failed = [
+        record.created
+        for record in caplog.records
+        if "Not submitted (required job failed)" in record.getMessage()
+    ]
+    assert len(failed) == 1
+    assert failed[0] < JobTimingPlugin.timings["proc1"]
+
+
+@pytest.mark.forked
+def test_check_outputs_concurrently(tmp_path, monkeypatch):
+    from pipen.job import Job
+
+    intervals = []
+    check_outputs = Job._check_outputs
+
+    def slow_check_outputs(self):
+        start = time.time()
+        time.sleep(1)
+        out = check_outputs(self)
+        intervals.append((start, time.time()))
+        return out
+
+    monkeypatch.setattr(Job, "_check_outputs", slow_check_outputs)
+    proc = Proc.from_proc(NormalProc, input_data=[1, 2, 3, 4], forks=4)
+    pipeline = Pipen(
+        name="CheckOutputsPipeline",
+        workdir=tmp_path / ".pipen",
+        outdir=tmp_path / "outdir",
+    ).set_starts(proc)
+    assert pipeline.run()
+    assert len(intervals) == 4
+    # the outputs of the jobs finished in the same poll are checked together
+    assert max(start for start, _ in intervals) < min(end for _, end in intervals)
+
+
+@pytest.mark.forked
+def test_build_proc_relationships_10k(pipen, monkeypatch):
+    """Build the relationships of 10k processes with bounded heap operations"""
+    import heapq
+    import pipen.pipen as pipen_module
+
+    ops = {"push": 0, "pop": 0}
+
+    def heappush(heap, item):
+        ops["push"] += 1
+        heapq.heappush(heap, item)
+
+    def heappop(heap):
+        ops["pop"] += 1
+        # the available process with the smallest (order, name) goes first
+        smallest = min(heap)
+        item = heapq.heappop(heap)
+        assert item == smallest
+        return item
+
+    monkeypatch.setattr(pipen_module, "heappush", heappush)
+    monkeypatch.setattr(pipen_module, "heappop", heappop)
+
+    procs = [Proc.from_proc(NormalProc, name="P0", input_data=[1])]
+    for i in range(1, 10_000):
+        requires = [procs[i - 1]]
+        if i > 2:
+            requires.append(procs[i // 2])
+        procs.append(
+            Proc.from_proc(NormalProc, name=f"P{i}", requires=requires, order=i % 7)
+        )
+
+    pipen.set_starts(procs[0])
+    pipen.build_proc_relationships()
+
+    assert len(pipen.procs) == 10_000
+    indexes = {proc: i for i, proc in enumerate(pipen.procs)}
+    for proc in pipen.procs:
+        assert all(indexes[req] < indexes[proc] for req in proc.requires or ())
+    # Each process (but the start one) is pushed and popped exactly once
+    assert ops == {"push": 9_999, "pop": 9_999}
+
+
+class TimedProc(Proc):
+    """Process to record when the jobs are running"""
+
+    input = "i"
+    lang = sys.executable
+    script = """
+        import time
+        from pathlib import Path
+
+        start = time.time()
+        time.sleep(1)
+        Path("{{envs.logdir}}/{{proc.name}}.{{in.i}}").write_text(
+            f"{start} {time.time()}"
+        )
+    """
+
+
+@pytest.mark.forked
+def test_max_jobs(tmp_path):
+    logdir = tmp_path / "logs"
+    logdir.mkdir()
+    procs = [
+        Proc.from_proc(
+            TimedProc,
+            name=f"TimedProc{i}",
+            input_data=[0, 1],
+            envs={"logdir": str(logdir)},
+            forks=2,
+        )
+        for i in range(3)
+    ]
+
+    pipeline = Pipen(
+        name="MaxJobsPipeline",
+        max_procs=0,
+        max_jobs=2,
+        workdir=tmp_path / ".pipen",
+        outdir=tmp_path / "outdir",
+    ).set_starts(procs)
+    assert pipeline.run()
+
+    intervals = [
+        tuple(map(float, logfile.read_text().split()))
+        for logfile in logdir.iterdir()
+    ]
+    assert len(intervals) == 6
+    # At most 2 jobs are running at any time
+    for start, _ in intervals:
+        n_running = sum(1 for st, end in intervals if st <= start < end)
+        assert n_running <= 2
+    assert pipeline._active_jobs == set()
+    assert pipeline._reserved_jobs == {}
+
+
+@pytest.mark.forked
+def test_max_jobs_retried_and_failed(tmp_path):
+    # retried before it succeeds, the slot is kept while retrying
+    proc1 = Proc.from_proc(RetryProc, input_data=[time.time() - 2])
+    proc2 = Proc.from_proc(ErrorProc, input_data=[1, 2], error_strategy="ignore")
+
+    pipeline = Pipen(
+        name="MaxJobsRetryPipeline",
+        max_procs=0,
+        max_jobs=1,
+        workdir=tmp_path / ".pipen",
+        outdir=tmp_path / "outdir",
+    ).set_starts(proc1, proc2)
+    pipeline.run()
+    # each slot is freed exactly once
+    assert pipeline._active_jobs == set()
+    assert pipeline._reserved_jobs == {}
+
+
+@pytest.mark.forked
+@pytest.mark.asyncio
+async def test_max_jobs_submission_cancelled(tmp_path):
+
+    class CancelSubmissionPlugin:
+        name = "cancel_submission_plugin"
+
+        @plugin.impl
+        async def on_job_submitting(job):
+            return False
+
+    proc = Proc.from_proc(NormalProc, input_data=[1])
+    pipeline = Pipen(
+        name="MaxJobsCancelPipeline",
+        max_jobs=1,
+        plugins=[CancelSubmissionPlugin],
+        workdir=tmp_path / ".pipen",
+        outdir=tmp_path / "outdir",
+    ).set_starts(proc)
+    await pipeline._init()
+    proc_obj = proc(pipeline)
+    await proc_obj.init()
+
+    assert pipeline.reserve_job_slot(proc_obj)
+    await proc_obj.xqute.scheduler.submit_job_and_update_status(proc_obj.jobs[0])
+    # the slot is freed, not to stall the other jobs
+    assert pipeline._active_jobs == set()
+    assert pipeline._reserved_jobs == {}
+
+
+@pytest.mark.forked
+@pytest.mark.asyncio
+async def test_max_jobs_submission_skipped(tmp_path):
+    # already submitted or running, i.e. by another session
+    proc = Proc.from_proc(NormalProc, input_data=[1])
+    pipeline = Pipen(
+        name="MaxJobsSkipPipeline",
+        max_jobs=1,
+        workdir=tmp_path / ".pipen",
+        outdir=tmp_path / "outdir",
+    ).set_starts(proc)
+    await pipeline._init()
+    proc_obj = proc(pipeline)
+    await proc_obj.init()
+    job = proc_obj.jobs[0]
+
+    async def submitted_or_running(job):
+        return True
+
+    proc_obj.xqute.scheduler.job_is_submitted_or_running = submitted_or_running
+    assert pipeline.reserve_job_slot(proc_obj)
+    await proc_obj.xqute.scheduler.submit_job_and_update_status(job)
+    assert pipeline._active_jobs == set()
+    assert pipeline._reserved_jobs == {}
+    # a slot reserved but never taken, i.e. cancelled while queued
+    assert pipeline.reserve_job_slot(proc_obj)
+    assert not pipeline.reserve_job_slot(proc_obj)
+    pipeline.release_job_slots(proc_obj)
+    assert pipeline._reserved_jobs == {}
+
+
+@pytest.mark.forked
+def test_history(tmp_path):
+    import sqlite3
+    from .helpers import FileInputProc
+
+    infile = tmp_path / "infile.txt"
+    infile.write_text("12345")
+    proc1 = Proc.from_proc(FileInputProc, input_data=[infile])
+
+    class RetryOnceProc(RetryProc):
+        """Fail only the first time, leaving a marker file"""
+
+        input = "marker"
+        script = """
+            import sys
+            from pathlib import Path
+            marker = Path({{in.marker | repr}})
+            if not marker.exists():
+                marker.touch()
+                sys.exit(1)
+        """
+
+    # run first to get retried
+    proc2 = Proc.from_proc(
+        RetryOnceProc,
+        input_data=[str(tmp_path / "retried")],
+        order=-1,
+    )
+
+    pipeline = Pipen(
+        name="HistoryPipeline",
+        history=True,
+        workdir=tmp_path / ".pipen",
+        outdir=tmp_path / "outdir",
+    ).set_starts(proc1, proc2)
+    assert pipeline.run()
+    # run again to get the jobs cached
+    assert pipeline.run()
+
+    conn = sqlite3.connect(tmp_path / ".pipen" / "history.db")
+    runs = conn.execute("SELECT pipeline, succeeded FROM runs").fetchall()
+    assert runs == [("HistoryPipeline", 1)] * 2
+    procs = conn.execute(
+        "SELECT proc, size, ended >= started, succeeded FROM procs"
+    ).fetchall()
+    assert sorted(procs) == [("proc1", 1, 1, 1)] * 2 + [("proc2", 1, 1, 1)] * 2
+
+    jobs = conn.execute(
+        "SELECT j.proc, j.queued <= j.submitted, j.submitted <= j.started, "
+        "j.started <= j.ended, j.rc, j.retries, j.cached, j.status, j.input_size "
+        "FROM jobs j JOIN runs r ON j.run_id = r.run_id ORDER BY r.started, j.proc"
+    ).fetchall()
+    conn.close()
+    assert len(jobs) == 4
+    assert jobs[0] == ("proc1", 1, 1, 1, 0, 0, 0, "succeeded", 5)
+    assert jobs[1][:4] == ("proc2", 1, 1, 1)
+    assert jobs[1][4] == 0 and jobs[1][5] == 1
+    assert jobs[1][6:] == (0, "succeeded", None)
+    assert jobs[2] == ("proc1", None, None, None, None, 0, 1, "cached", 5)
+    assert jobs[3][-3:] == (1, "cached", None)
+
+
+@pytest.mark.forked
+def test_trace(tmp_path, caplog):
+    import asyncio
+    import json
+
+    class SlowPlugin:
+        @plugin.impl
+        async def on_proc_done(proc, succeeded):
+            await asyncio.sleep(0.1)
+
+    proc1 = Proc.from_proc(NormalProc, input_data=[1, 2])
+    Proc.from_proc(NormalProc, name="proc2", requires=proc1)
+    trace_file = tmp_path / "trace.json"
+    pipeline = Pipen(
+        name="TracePipeline",
+        trace=trace_file,
+        plugins=[SlowPlugin],
+        workdir=tmp_path / ".pipen",
+        outdir=tmp_path / "outdir",
+    ).set_starts(proc1)
+    assert pipeline.run()
+
+    events = json.loads(trace_file.read_text())["traceEvents"]
+    spans = [event for event in events if event["ph"] == "X"]
+    names = {span["name"] for span in spans}
+    assert {
+        "Pipen._init",
+        "Pipen.build_proc_relationships",
+        "Pipen.run",
+        "Proc.__init__",
+        "Proc.init",
+        "Proc._init_jobs",
+        "Proc.run",
+        "Job.prepare",
+        "Job.cached",
+        "Job.submit",
+        "on_start",
+        "on_job_succeeded",
+        "on_complete",
+    } <= names
+    assert all(span["dur"] >= 0 for span in spans)
+    # the hooks called by xqute are traced, too
+    assert "on_job_started" in names
+    # the jobs are run from when they are started to when they are done
+    runs = [span for span in spans if span["name"] == "Job.run"]
+    assert sorted((span["args"]["proc"], span["args"]["job"]) for span in runs) == [
+        ("proc1", "0"),
+        ("proc1", "1"),
+        ("proc2", "0"),
+        ("proc2", "1"),
+    ]
+    # the span of a hook call covers the implementations of all plugins
+    assert all(
+        span["dur"] >= 100_000  # us
+        for span in spans
+        if span["name"] == "on_proc_done"
+    )
+    prepares = [span for span in spans if span["name"] == "Job.prepare"]
+    assert sorted((span["args"]["proc"], span["args"]["job"]) for span in prepares) == [
+        ("proc1", "0"),
+        ("proc1", "1"),
+        ("proc2", "0"),
+        ("proc2", "1"),
+    ]
+
+    # tracing stopped
+    from pipen import _tracing
+    from pipen.pluginmgr import plugin as pipen_plugin
+
+    assert _tracing._TRACER is None
+    # the hooks are traced by the plugins, not patched
+    assert _tracing._HOOK_STARTS.get() == ()
+    assert _tracing.HOOK_TRACER_FIRST in pipen_plugin.get_all_plugin_names()
+    assert _tracing.HOOK_TRACER_FIRST not in pipen_plugin.get_enabled_plugins()
+    assert _tracing.HOOK_TRACER_LAST not in pipen_plugin.get_enabled_plugins()
+    # not listed as the plugins of the pipeline
+    assert "pipen-trace" not in caplog.text
+
+    # OTLP JSON
+    otlp_file = tmp_path / "trace.otlp.json"
+    pipeline.config.trace = otlp_file
+    pipeline._kwargs["trace"] = otlp_file
+    assert pipeline.run()
+
+    scope_spans = json.loads(otlp_file.read_text())["resourceSpans"][0]["scopeSpans"]
+    spans = {span["spanId"]: span for span in scope_spans[0]["spans"]}
+    run_span = next(span for span in spans.values() if span["name"] == "Proc.run")
+    # Proc.run is nested in Pipen.run
+    assert spans[run_span["parentSpanId"]]["name"] == "Pipen.run"
+    assert int(run_span["endTimeUnixNano"]) >= int(run_span["startTimeUnixNano"])
+
+
+@pytest.mark.forked
+def test_plan(tmp_path, caplog):
+    from .helpers import FileInputProc
+
+    infiles = []
+    for i in range(3):
+        infile = tmp_path / f"infile{i}.txt"
+        infile.write_text(str(i))
+        infiles.append(infile)
+
+    proc1 = Proc.from_proc(FileInputProc, input_data=infiles)
+    Proc.from_proc(FileInputProc, name="proc2", requires=proc1)
+    pipeline = Pipen(
+        name="PlanPipeline",
+        workdir=tmp_path / ".pipen",
+        outdir=tmp_path / "outdir",
+    ).set_starts(proc1)
+
+    assert pipeline.run(plan=True)
+    assert "proc1:[/cyan] Plan: 0 cached, 3 to run" in caplog.text
+    assert "proc2:[/cyan] Plan: 0 cached, 3 to run" in caplog.text
+    # nothing written or run
+    assert not (tmp_path / ".pipen" / "proc1" / "0" / "job.script").exists()
+    assert not (tmp_path / "outdir" / "proc2" / "0" / "infile0.txt").exists()
+
+    assert pipeline.run()
+    caplog.clear()
+    assert pipeline.run(plan=True)
+    assert "proc1:[/cyan] Plan: 3 cached, 0 to run" in caplog.text
+    assert "proc2:[/cyan] Plan: 3 cached, 0 to run" in caplog.text
+
+    # make job 1 of proc1 stale
+    time.sleep(0.1)
+    infiles[1].write_text("1")
+    script_file = tmp_path / ".pipen" / "proc1" / "2" / "job.script"
+    # the script to be updated, but not newer
+    mtime = script_file.stat().st_mtime
+    script_file.write_text("# modified")
+    os.utime(script_file, (mtime, mtime))
+    caplog.clear()
+    assert pipeline.run(plan=True)
+    assert "proc1:[/cyan] Plan: 1 cached, 2 to run" in caplog.text
+    assert "Input file is newer: [1]" in caplog.text
+    assert "script file is updated: [2]" in caplog.text
+    # the stale outputs are propagated
+    assert "proc2:[/cyan] Plan: 1 cached, 2 to run" in caplog.text
+    assert "input in:file is to be regenerated: [1-2]" in caplog.text
+    # the script is not overwritten
+    assert script_file.read_text() == "# modified"
+
+
+def test_plan_no_side_effects(tmp_path):
+    from .helpers import FileInputProc
+
+    def snapshot():
+        return {
+            str(path): (
+                path.is_symlink() and os.readlink(path),
+                path.lstat().st_size,
+                path.lstat().st_mtime_ns,
+            )
+            for path in tmp_path.rglob("*")
+        }
+
+    infiles = []
+    for i in range(3):
+        infile = tmp_path / f"infile{i}.txt"
+        infile.write_text(str(i))
+        infiles.append(infile)
+
+    proc1 = Proc.from_proc(FileInputProc, input_data=infiles, cache="hash")
+
+    class proc2(Proc):
+        requires = proc1
+        input = "in:file"
+        output = "out:file:{{in.in.name}}, outdir:dir:sub"
+        script = "cat {{in.in}} > {{out.out}}; touch {{out.outdir}}/file"
+
+    pipeline = Pipen(
+        name="PlanPipeline",
+        workdir=tmp_path / ".pipen",
+        outdir=tmp_path / "outdir",
+    ).set_starts(proc1)
+
+    assert pipeline.run(plan=True)
+    assert not (tmp_path / ".pipen").exists()
+    assert not (tmp_path / "outdir").exists()
+
+    assert pipeline.run()
+    time.sleep(0.1)
+    infiles[1].write_text("1")
+    before = snapshot()
+    assert pipeline.run(plan=True)
+    assert snapshot() == before
+
+
+@pytest.mark.forked
+@pytest.mark.asyncio
+async def test_plan_loaded_pipeline(tmp_path):
+    from pipen.utils import load_pipeline
+
+    inits = []
+
+    class InitPlugin:
+        name = "init_plugin"
+
+        @plugin.impl
+        async def on_init(pipen):
+            inits.append(pipen.name)
+
+    pipeline = Pipen(
+        name="PlanLoadedPipeline",
+        plugins=[InitPlugin],
+        workdir=tmp_path / ".pipen",
+        outdir=tmp_path / "outdir",
+    ).set_starts(SimpleProc)
+    pipeline = await load_pipeline(pipeline)
+    assert await pipeline.async_run(plan=True)
+    # not initialized again to plan the run
+    assert inits == ["PlanLoadedPipeline"]
+
+
+@pytest.mark.forked
+def test_signal_cancels_all_running_procs(tmp_path):
+    import asyncio
+    import signal
+
+    class SleepProc(Proc):
+        input = "a"
+        input_data = [1]
+        script = "sleep 30"
+
+    class SignalPlugin:
+        submitted = []
+
+        @plugin.impl
+        async def on_job_submitted(job):
+            SignalPlugin.submitted.append(job.proc.name)
+            if len(SignalPlugin.submitted) == 2:
+                asyncio.get_running_loop().call_later(
+                    0.5, os.kill, os.getpid(), signal.SIGTERM
+                )
+
+    proc1 = Proc.from_proc(SleepProc)
+    proc2 = Proc.from_proc(SleepProc)
+    pipeline = Pipen(
+        name="SignalPipeline",
+        max_procs=0,
+        plugins=[SignalPlugin],
+        workdir=tmp_path / ".pipen",
+        outdir=tmp_path / "outdir",
+    ).set_starts(proc1, proc2)
+    started = time.time()
+    assert not pipeline.run()
+    # both processes are cancelled, not only the one initialized last
+    assert time.time() - started < 20
+    assert sorted(SignalPlugin.submitted) == ["proc1", "proc2"]
+    # the handlers are removed after the run
+    assert signal.getsignal(signal.SIGTERM) == signal.SIG_DFL
@@ -2,7 +2,12 @@ import pytest
 
 from pipen import plugin, Pipen, Proc
 
-from .helpers import OutputNotGeneratedProc, SimpleProc, pipen  # noqa: F401
+from .helpers import (  # noqa: F401
+    OutputNotGeneratedProc,
+    SimpleProc,
+    SleepingProc,
+    pipen,
+)
 
 
 class Plugin:
@@ -107,3 +112,39 @@ def test_jobcmd_hooks(pipen):
     assert "# on_jobcmd_init from myjobcmdplugin" in content
     assert "# on_jobcmd_prep from myjobcmdplugin" in content
     assert "# on_jobcmd_end from myjobcmdplugin" in content
+
+
+@pytest.mark.forked
+def test_plugin_concurrent_procs(tmp_path):
+    class ConcurrentPlugin:
+        name = "concurrent"
+        succeeded = []
+        done = []
+
+        @plugin.impl
+        async def on_job_succeeded(job):
+            ConcurrentPlugin.succeeded.append((job.proc.name, job.index))
+
+        @plugin.impl
+        async def on_proc_done(proc, succeeded):
+            ConcurrentPlugin.done.append(proc.name)
+
+    fast = Proc.from_proc(SleepingProc, name="FastProc", input_data=[0])
+    slow = Proc.from_proc(SleepingProc, name="SlowProc", input_data=[2, 2])
+
+    pipeline = Pipen(
+        name="pipeline_plugin_concurrent_procs",
+        max_procs=0,
+        workdir=tmp_path / ".pipen",
+        outdir=tmp_path / "outdir",
+        plugins=[ConcurrentPlugin],
+    ).set_starts(fast, slow)
+    assert pipeline.run()
+    # The plugin is still enabled for the slow process after the fast one
+    # is done
+    assert ConcurrentPlugin.done == ["FastProc", "SlowProc"]
+    assert sorted(ConcurrentPlugin.succeeded) == [
+        ("FastProc", 0),
+        ("SlowProc", 0),
+        ("SlowProc", 1),
+    ]
@@ -12,6 +12,7 @@ from pipen.exceptions import (
 from datar.dplyr import mutate
 from .helpers import (  # noqa: F401
     In2Out1Proc,
+    FileInputsProc,
     NoInputProc,
     NormalProc,
     FileInputProc,
@@ -51,6 +52,94 @@ def test_proc_with_input_data(pipen):
     assert proc.output_data.equals(pandas.DataFrame({"output": ["1"]}))
 
 
+@pytest.mark.forked
+def test_proc_with_mixed_numeric_input_data(pipen):
+    class MixedNumericInputProc(Proc):
+        input = "a, b"
+        # upcast to float, as accessing the rows of the data
+        input_data = pandas.DataFrame([[1, 2.5]], columns=["a", "b"])
+        output = "out:var:{{in.a}} {{in.b}}"
+        script = "true"
+
+    pipen.set_starts(MixedNumericInputProc).run()
+    assert MixedNumericInputProc.output_data.equals(
+        pandas.DataFrame({"out": ["1.0 2.5"]})
+    )
+
+
+@pytest.mark.forked
+def test_proc_with_datetime_input_data(pipen):
+    class DatetimeInputProc(Proc):
+        input = "start, end"
+        input_data = pandas.DataFrame(
+            {
+                "start": pandas.to_datetime(["2024-01-02"]),
+                "end": pandas.to_datetime(["2024-01-05"]),
+            }
+        )
+        output = "out:var:{{in.start.date()}} {{(in.end - in.start).days}}"
+        template = "jinja2"
+        script = "true"
+
+    pipen.set_starts(DatetimeInputProc).run()
+    assert DatetimeInputProc.output_data.equals(
+        pandas.DataFrame({"out": ["2024-01-02 3"]})
+    )
+
+
+@pytest.mark.forked
+def test_proc_with_timedelta_input_data(pipen):
+    class TimedeltaInputProc(Proc):
+        input = "span"
+        input_data = pandas.DataFrame({"span": pandas.to_timedelta(["1 day"])})
+        output = "out:var:{{in.span.days}}"
+        template = "jinja2"
+        script = "true"
+
+    pipen.set_starts(TimedeltaInputProc).run()
+    assert TimedeltaInputProc.output_data.equals(pandas.DataFrame({"out": ["1"]}))
+
+
+@pytest.mark.forked
+def test_proc_with_nested_dataframe_input_data(pipen, tmp_path):
+    infiles = [tmp_path / "a.txt", tmp_path / "b.txt"]
+    for infile in infiles:
+        infile.write_text(infile.name)
+
+    proc = Proc.from_proc(
+        FileInputsProc,
+        input_data=pandas.DataFrame(
+            {
+                "in": pandas.Series(
+                    [
+                        pandas.DataFrame({"path": infiles}),
+                        pandas.DataFrame({"paths": [infiles[::-1]]}),
+                    ],
+                    dtype=object,
+                )
+            }
+        ),
+    )
+    pipen.set_starts(proc).run()
+    assert [
+        os.path.basename(out) for out in proc.output_data["out"]
+    ] == ["a.txt", "b.txt"]
+
+    proc = Proc.from_proc(
+        FileInputsProc,
+        input_data=pandas.DataFrame(
+            {
+                "in": pandas.Series(
+                    [pandas.DataFrame({"a": infiles, "b": infiles})],
+                    dtype=object,
+                )
+            }
+        ),
+    )
+    with pytest.raises(ProcInputTypeError, match="single column"):
+        pipen.set_starts(proc).run()
+
+
 @pytest.mark.forked
 def test_proc_with_symlink_input(pipen, tmp_path):
     infile_orig = tmp_path / "a.txt"
@@ -165,6 +254,182 @@ def test_cached_run(caplog, pipen):
     assert caplog.text.count("Cached jobs:") == 1
 
 
+@pytest.mark.forked
+def test_cached_run_partially(caplog, pipen):
+    proc = Proc.from_proc(NormalProc, input_data=[1, 2, 3, 4])
+    assert pipen.set_starts(proc).run()
+
+    # invalidate the fingerprint and the signatures of job 1 and 3
+    (proc.workdir / "proc.fingerprint.json").unlink()
+    (proc.workdir / "1" / "job.signature.json").unlink()
+    (proc.workdir / "3" / "job.signature.json").unlink()
+    caplog.clear()
+    assert pipen.set_starts(proc).run()
+    assert "Cached jobs: [0, 2]" in caplog.text
+    assert caplog.text.count("Not cached (signature file not found)") == 2
+
+
+@pytest.mark.forked
+def test_prepare_workers(tmp_path):
+    import threading
+    from pipen import Pipen
+
+    class PrepareWorkersProc(Proc):
+        input = "a"
+        input_data = list(range(8))
+        output = "b:file:{{in.a}}.txt"
+        envs = {"thread": lambda: threading.current_thread().name}
+        template = "jinja2"
+        script = "echo {{envs.thread()}} > {{out.b}}"
+
+    pipeline = Pipen(
+        name="pipeline_prepare_workers",
+        prepare_workers=2,
+        workdir=tmp_path / ".pipen",
+        outdir=tmp_path / "outdir",
+    )
+    assert pipeline.set_starts(PrepareWorkersProc).run()
+    threads = {
+        path.read_text().strip()
+        for path in (tmp_path / "outdir" / "PrepareWorkersProc").glob("*/*.txt")
+    }
+    assert len(threads) > 0
+    # rendered in the thread pool
+    assert all(thread.startswith("pipen-prepare_") for thread in threads)
+    assert len(threads) <= 2
+
+
+@pytest.mark.forked
+def test_jobs_kept_for_plugins(tmp_path, capsys):
+    from pipen import Pipen, plugin
+
+    class JobsPlugin:
+        name = "jobs_plugin"
+
+        @plugin.impl
+        async def on_job_started(job):
+            job.proc.plugin_opts.setdefault("started", []).append(job)
+
+        @plugin.impl
+        async def on_proc_done(proc, succeeded):
+            assert isinstance(proc.jobs, list)
+            # the same objects as the ones passed to the job-level hooks,
+            # which may start in any order
+            started = proc.plugin_opts["started"]
+            assert sorted(started, key=lambda job: job.index) == proc.jobs
+            assert all(job is proc.jobs[job.index] for job in started)
+            # removed from xqute once done
+            assert proc.xqute.jobs == []
+            print("<<<jobs checked>>>")
+
+    class JobsProc(Proc):
+        input = "a"
+        input_data = list(range(4))
+        output = "b:var:{{in.a}}"
+        script = "echo {{in.a}}"
+
+    plugin.register(JobsPlugin)
+    pipeline = Pipen(
+        name="pipeline_jobs_kept",
+        forks=1,
+        workdir=tmp_path / ".pipen",
+        outdir=tmp_path / "outdir",
+    )
+    assert pipeline.set_starts(JobsProc).run()
+    assert "<<<jobs checked>>>" in capsys.readouterr().out
+
+
+@pytest.mark.forked
+def test_fingerprint(caplog, pipen, tmp_path):
+    infile = tmp_path / "infile"
+    infile.write_text("in")
+    proc = Proc.from_proc(FileInputProc, input_data=[infile])
+    pipen.set_starts(proc).run()
+    assert (proc.workdir / "proc.fingerprint.json").is_file()
+    assert "Process fingerprint matched" not in caplog.text
+
+    caplog.clear()
+    fingerprint_mtime = (proc.workdir / "proc.fingerprint.json").stat().st_mtime_ns
+    pipen.set_starts(proc).run()
+    assert "Process fingerprint matched" in caplog.text
+    assert "Cached jobs: [0]" in caplog.text
+    assert "Not cached" not in caplog.text
+    # not saved again
+    assert (
+        proc.workdir / "proc.fingerprint.json"
+    ).stat().st_mtime_ns == fingerprint_mtime
+
+    # input file is newer
+    caplog.clear()
+    os.utime(infile, (infile.stat().st_mtime + 10,) * 2)
+    pipen.set_starts(proc).run()
+    assert "Process fingerprint matched" not in caplog.text
+    assert "Not cached (Input file is newer: in)" in caplog.text
+
+    # script changed
+    caplog.clear()
+
+    class Proc2(FileInputProc):
+        name = proc.name
+        input_data = [infile]
+        script = "cat {{in.in}} {{in.in}} > {{out.out}}"
+
+    pipen.set_starts(Proc2).run()
+    assert "Process fingerprint matched" not in caplog.text
+    assert "Job script updated." in caplog.text
+
+
+@pytest.mark.forked
+def test_fingerprint_input_changed_between_jobs(caplog, pipen, tmp_path):
+    infile0 = tmp_path / "infile0"
+    infile1 = tmp_path / "infile1"
+    infile0.write_text("in0")
+    infile1.write_text("in1")
+
+    outdir = pipen.outdir / "TouchInputProc"
+    signature0 = tmp_path / ".pipen" / "TouchInputProc" / "0" / "job.signature.json"
+
+    class TouchInputProc(FileInputProc):
+        input_data = [infile0, infile1]
+        forks = 2
+        # job 1 rewrites the input of job 0 after job 0 finished
+        script = (
+            "{% if job.index == 1 %}"
+            f"while [ ! -s {signature0} ]; do sleep .1; done; "
+            f"sleep .5; touch {infile0}; sleep .5; "
+            "{% endif %}"
+            "cat {{in.in}} > {{out.out}}"
+        )
+
+    pipen.set_starts(TouchInputProc).run()
+    mtime0 = (outdir / "0" / "infile0").stat().st_mtime
+    mtime1 = (outdir / "1" / "infile1").stat().st_mtime
+    assert mtime0 < infile0.stat().st_mtime < mtime1
+
+    caplog.clear()
+    pipen.set_starts(TouchInputProc).run()
+    assert "Process fingerprint matched" not in caplog.text
+    assert "Not cached (Input file is newer: in)" in caplog.text
+
+
+@pytest.mark.forked
+def test_fingerprint_hash_cache(caplog, pipen, tmp_path):
+    infile = tmp_path / "infile"
+    infile.write_text("in")
+    proc = Proc.from_proc(FileInputProc, input_data=[infile], cache="hash")
+    pipen.set_starts(proc).run()
+    assert (proc.workdir / "proc.fingerprint.json").is_file()
+
+    # tamper with the output while the fingerprint is in place
+    outfile = pipen.outdir / proc.name / "infile"
+    outfile.write_text("tampered")
+    caplog.clear()
+    pipen.set_starts(proc).run()
+    assert "Process fingerprint matched" not in caplog.text
+    assert "output out:file was modified" in caplog.text
+    assert outfile.read_text() == "in"
+
+
 def test_proc_is_singleton(pipen):
     pipen.workdir = ".pipen/"
     os.makedirs(pipen.workdir, exist_ok=True)
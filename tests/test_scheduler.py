@@ -81,3 +81,31 @@ def test_gbatch_scheduler_post_init():
         gbatch.config.taskGroups[0].taskSpec.volumes[-2].gcs.remotePath
         == "test-bucket/workdir"
     )
+
+
+@pytest.mark.asyncio
+async def test_polling_jobs_without_proc(tmp_path):
+    scheduler = LocalScheduler(workdir=tmp_path)
+    job = scheduler.create_job(0, ["echo", "1"])
+    # not attached to a process by post_init(), max_jobs is not checked
+    assert await scheduler.polling_jobs([job], "submittable")
+
+
+def test_wrapped_job_script_replaced_atomically(tmp_path):
+    scheduler = LocalScheduler(workdir=tmp_path)
+    job = scheduler.create_job(0, ["echo", "1"])
+    script = scheduler.wrapped_job_script(job).path
+    inode = script.stat().st_ino
+    # not written again if unchanged, i.e. when logged after submission
+    assert scheduler.wrapped_job_script(job).path == script
+    assert script.stat().st_ino == inode
+
+    # a running job keeps reading the old script
+    with script.open() as running:
+        old = script.read_text()
+        scheduler.prescript = "echo prescript"
+        scheduler.wrapped_job_script(job)
+        assert running.read() == old
+    assert "echo prescript" in script.read_text()
+    assert script.stat().st_ino != inode
+    assert not script.with_name(f"{script.name}.tmp").exists()
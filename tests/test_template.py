@@ -13,3 +13,62 @@ def test_update_envs():
 
     with pytest.raises(NoSuchTemplateEngineError):
         get_template_engine("nosuchtemplate")
+
+
+@pytest.mark.forked
+def test_shared_environment(tmp_path):
+    from pipen.template import _ENVIRONMENTS, set_template_cache
+
+    liquid = get_template_engine("liquid")
+    jinja = get_template_engine("jinja2")
+    # the same options share an environment, different ones don't
+    tpl1 = liquid("{{a | upper}}")
+    tpl2 = liquid("{{a}}!")
+    tpl3 = liquid("{{a}}", filters={"f": str})
+    assert tpl1.engine.environment is tpl2.engine.environment
+    assert tpl1.engine.environment is not tpl3.engine.environment
+    assert tpl1.render({"a": "x"}) == "X"
+    assert tpl2.render({"a": "x"}) == "x!"
+
+    tpl4 = jinja("{{a | double}}", filters={"double": lambda x: x * 2})
+    assert tpl4.render({"a": "x"}) == "xx"
+    # filters are not leaked to the other environments
+    assert "double" not in jinja("{{a}}").engine.environment.filters
+
+    set_template_cache(tmp_path / "cache")
+    assert liquid("{{a}}?").render({"a": 1}) == "1?"
+    assert jinja("{{a}}?").render({"a": 1}) == "1?"
+    assert len(list((tmp_path / "cache").glob("__jinja2_*.cache"))) == 2
+
+    # the environments are shared across the cache directories
+    nenvs = len(_ENVIRONMENTS)
+    set_template_cache(tmp_path / "cache2")
+    assert jinja("{{a}}??").render({"a": 1}) == "1??"
+    assert len(_ENVIRONMENTS) == nenvs
+    assert len(list((tmp_path / "cache2").glob("__jinja2_*.cache"))) == 1
+
+    # and released when the cache directory is unset
+    set_template_cache(None)
+    assert not _ENVIRONMENTS
+
+
+@pytest.mark.forked
+def test_environments_bounded(monkeypatch):
+    from pipen import template
+
+    monkeypatch.setattr(template, "_MAX_ENVIRONMENTS", 2)
+    monkeypatch.setattr(template, "_MAX_SOURCES", 2)
+    liquid = get_template_engine("liquid")
+    tpl1 = liquid("{{a}}", filters={"f1": str})
+    liquid("{{a}}", filters={"f2": str})
+    liquid("{{a}}", filters={"f3": str})
+    assert len(template._ENVIRONMENTS) == 2
+    # the least recently used one is dropped
+    assert tpl1.engine.environment not in [
+        env for env, _ in template._ENVIRONMENTS.values()
+    ]
+
+    for i in range(3):
+        assert liquid(f"{{{{a}}}}{i}").render({"a": 1}) == f"1{i}"
+    _, sources = next(reversed(template._ENVIRONMENTS.values()))
+    assert len(sources) == 2
@@ -19,8 +19,15 @@ from pipen.utils import (
     load_pipeline,
     path_is_symlink,
     path_symlink_to,
+    invalidate_mtime,
+    start_mtime_cache,
+    stop_mtime_cache,
+    list_cloud_paths,
+    path_exists,
+    _anypath_mtime,
 )
 from pipen.proc import Proc
+from pipen._cloud_listing import cloud_prefixes
 from pipen.procgroup import ProcGroup
 from pipen.exceptions import ConfigurationError
 
@@ -61,6 +68,206 @@ def test_get_mtime_symlink_dir(tmp_path):
     assert mtime > 0
 
 
+@pytest.mark.forked
+def test_get_mtime_scandir(tmp_path):
+    import os
+
+    # a/b/c/file, a/b/d/file, a/e/, a/file, a/link -> a/b, a/dead -> missing
+    # a/b/fake is a fake symlink to a/e
+    files = []
+    for i, sub in enumerate(("a/b/c", "a/b/d", "a/e", "a")):
+        dir = tmp_path.joinpath(sub)
+        dir.mkdir(parents=True, exist_ok=True)
+        if sub != "a/e":
+            files.append(dir / "file")
+            files[-1].write_text(str(i))
+    (tmp_path / "a" / "link").symlink_to(tmp_path / "a" / "b")
+    (tmp_path / "a" / "dead").symlink_to(tmp_path / "missing")
+    (tmp_path / "a" / "b" / "fake").write_text(f"symlink:{tmp_path}/a/e")
+    for i, path in enumerate(sorted(tmp_path.rglob("*"), reverse=True)):
+        os.utime(path, (100 + i, 100 + i), follow_symlinks=False)
+
+    for path in (*tmp_path.rglob("*"), tmp_path, tmp_path / "missing"):
+        for depth in range(4):
+            assert get_mtime(path, depth) == _anypath_mtime(path, depth)
+
+    assert path_is_symlink(tmp_path / "a" / "b" / "fake")
+    assert not path_is_symlink(files[0])
+    assert not path_is_symlink(tmp_path / "a")
+
+
+@pytest.mark.forked
+def test_mtime_cache(tmp_path):
+    import os
+
+    dir = tmp_path / "dir"
+    dir.mkdir()
+    file = dir / "file"
+    file.touch()
+    os.utime(file, (100, 100))
+    cache = start_mtime_cache()
+    try:
+        assert get_mtime(dir, 1) == 100
+        assert get_mtime(dir, 1) == 100
+        # the contents of local dirs are not memoized separately
+        assert (cache.hits, cache.misses) == (1, 1)
+        assert get_mtime(file, 0) == 100
+        assert get_mtime(file, 0) == 100
+        assert (cache.hits, cache.misses) == (2, 2)
+
+        # memoized
+        os.utime(file, (200, 200))
+        assert get_mtime(dir, 1) == 100
+
+        # the ancestors are invalidated
+        invalidate_mtime(file)
+        assert get_mtime(dir, 1) == 200
+        assert get_mtime(file, 0) == 200
+
+        # the descendants are invalidated
+        os.utime(file, (300, 300))
+        invalidate_mtime(dir)
+        assert get_mtime(file, 0) == 300
+        assert get_mtime(dir, 1) == 300
+    finally:
+        assert stop_mtime_cache() is cache
+
+    # not memoized
+    os.utime(file, (400, 400))
+    assert get_mtime(file, 0) == 400
+    invalidate_mtime(file)
+
+
+@pytest.mark.forked
+def test_cloud_listing(tmp_path):
+    import os
+    from cloudpathlib.local import LocalGSClient
+
+    class CountingClient(LocalGSClient):
+        """Count the requests to the storage"""
+
+        requests = 0
+
+    def _counted(name):
+        def method(self, *args, **kwargs):
+            self.requests += 1
+            return getattr(LocalGSClient, name)(self, *args, **kwargs)
+
+        return method
+
+    for name in (
+        "_list_dir",
+        "_exists",
+        "_is_dir",
+        "_is_file",
+        "_stat",
+        "_get_metadata",
+        "_download_file",
+    ):
+        setattr(CountingClient, name, _counted(name))
+
+    client = CountingClient(local_storage_dir=tmp_path)
+    root = client.CloudPath("gs://bucket/data")
+    files = [root / f"{i}" / "file.txt" for i in range(5)]
+    for i, file in enumerate(files):
+        # small files are read to check if they are fake symlinks
+        file.write_text("content" * 1000)
+        os.utime(client._cloud_path_to_local(file), (100 + i, 100 + i))
+    target = tmp_path / "target"
+    target.touch()
+    os.utime(target, (50, 50))
+    fake = root / "fake"
+    fake.write_text(f"symlink:{target}")
+    missing = root / "missing.txt"
+
+    expected = {
+        (path, depth): _anypath_mtime(path, depth)
+        for path in (*files, missing, fake, root / "0")
+        for depth in (0, 1)
+        if (path, depth) != (root / "0", 0)  # a dir can't be stat'ed
+    }
+    expected[(root, 2)] = _anypath_mtime(root, 2)
+    assert expected[(root, 2)] == 104
+
+    start_mtime_cache()
+    try:
+        client.requests = 0
+        assert list_cloud_paths([*files, missing, fake, tmp_path]) == 6
+        # one listing of gs://bucket/data, and only the small file is read
+        # to check if it is a fake symlink (3 requests with the local client)
+        assert client.requests == 4
+        client.requests = 0
+        for (path, depth), mtime in expected.items():
+            if path not in (fake, root):
+                assert get_mtime(path, depth) == mtime
+                assert client.requests == 0, (path, depth)
+        assert all(path_exists(file) for file in files)
+        assert not path_exists(missing)
+        assert not path_is_symlink(files[0])
+        assert client.requests == 0
+
+        assert path_is_symlink(fake)
+        assert client.requests == 0
+        # only the fake symlink is read for its target
+        assert get_mtime(fake, 0) == expected[(fake, 0)] == 50
+        assert client.requests > 0
+
+        # written paths are not answered from the listing
+        os.utime(client._cloud_path_to_local(files[0]), (200, 200))
+        invalidate_mtime(files[0])
+        client.requests = 0
+        assert get_mtime(files[0], 0) == 200
+        assert client.requests > 0
+        client.requests = 0
+        assert get_mtime(files[1], 0) == 101
+        assert client.requests == 0
+    finally:
+        stop_mtime_cache()
+
+
+@pytest.mark.forked
+def test_cloud_prefixes(tmp_path):
+    from cloudpathlib.local import LocalGSClient
+
+    client = LocalGSClient(local_storage_dir=tmp_path)
+    inputs = [client.CloudPath(f"gs://bucket/data/{i}/in.txt") for i in range(3)]
+    outputs = [
+        client.CloudPath(f"gs://bucket/out/Proc/{i}/out.txt") for i in range(3)
+    ]
+    single = client.CloudPath("gs://bucket/other/x/y.txt")
+    top = [client.CloudPath(f"gs://bucket/{i}.txt") for i in range(2)]
+    # not the bucket root, which is the common prefix of all of them
+    assert sorted(map(str, cloud_prefixes([*inputs, *outputs, single, *top]))) == [
+        "gs://bucket/data",
+        "gs://bucket/out/Proc",
+    ]
+    # the prefixes under the others are not listed
+    nested = client.CloudPath("gs://bucket/out/Proc/0/a/b.txt")
+    assert list(map(str, cloud_prefixes([*outputs, nested]))) == [
+        "gs://bucket/out/Proc"
+    ]
+
+
+@pytest.mark.forked
+def test_list_cloud_paths_not_listed(tmp_path):
+    import os
+    from cloudpathlib.local import LocalGSClient
+
+    client = LocalGSClient(local_storage_dir=tmp_path)
+    file = client.CloudPath("gs://bucket/data/0/file.txt")
+    file.write_text("content")
+    os.utime(client._cloud_path_to_local(file), (100, 100))
+
+    start_mtime_cache()
+    try:
+        # a single path is not listed, but its mtime is memoized
+        assert list_cloud_paths([file], 0) == 0
+        os.utime(client._cloud_path_to_local(file), (200, 200))
+        assert get_mtime(file, 0) == 100
+    finally:
+        stop_mtime_cache()
+
+
 @pytest.mark.forked
 def test_get_mtime_cloud_file():
     file = CloudPath(f"{BUCKET}/pipen-test/channel/test1.txt")